@@ -1,6 +1,13 @@
 import os
 import speech_recognition as sr
+import interpreter.channel as channel
 import interpreter.interpreter as interp
+import interpreter.listener as listener
+import interpreter.metrics as metrics
+import interpreter.nlp as nlp
+import interpreter.pump as pump
+import interpreter.reloader as reloader
+import interpreter.wakeword as wakeword
 from subprocess import call
 import sys
 import IPC
@@ -15,20 +22,56 @@ else:
     # Path for Mac
     vlc_path = "/Applications/VLC.app/Contents/MacOS/VLC"
 
-vm = IPC.process(True, ".\lili-interpreter\LILIExecutor.py")
+# With LILI_IPC=stdio, master control talks to the executor over its standard input and output, and messages are handled by an event-driven pump instead of the IPC module's polling loop
+use_pump = os.environ.get("LILI_IPC") == "stdio"
+vm = None
+msg_pump = None
+if not use_pump:
+    vm = IPC.process(True, ".\lili-interpreter\LILIExecutor.py")
+
+# Commands are queued on the channel and written by commands.pump(). Numbered, acknowledged commands are only used when LILI_COMMAND_ACKS=1, since master control has to answer each one with "ack <number>"
+commands = channel.CommandChannel(vm.write if vm else None, acks=os.environ.get("LILI_COMMAND_ACKS") == "1")
 
 started = False # Changes once it gets start command from master controller
 
+# Load the NLP models in the background while waiting to start, so the first command is not delayed by them
+nlp.warm_up()
+# Picks up edits to the known word files without restarting
+reloader.start()
+
 r = sr.Recognizer()
-def runRecognizer():
+# Listens in the background once the first command is expected, so background noise is only calibrated once instead of before every command
+background = None
+# Utterances that do not start with LILI's name are not sent to the recognizer, unless there are no recordings of her name in input_files/wake_word
+wake_word = wakeword.load()
 
-    # Comment out this with block to use standard input instead of speech recognition
-    with sr.Microphone() as source:
-        audio = r.adjust_for_ambient_noise(source, duration=1)
-        r.energy_threshold = 2146
-        sys.stderr.write("Speak now\n")
-        audio = r.listen(source)
-        sent = "" + r.recognize(audio)
+def to_audio_data(utterance):
+    # speech_recognition 3 takes the raw samples, earlier versions take FLAC data made by the recognizer
+    try:
+        return sr.AudioData(utterance.frames, utterance.sample_rate, utterance.sample_width)
+    except TypeError:
+        return sr.AudioData(utterance.sample_rate, r.samples_to_flac(background.source, utterance.frames))
+
+def runRecognizer():
+    # Returns the recognized sentence, or None if it was not recognized because it did not start with LILI's name
+    global background
+
+    # Comment out this block to use standard input instead of speech recognition
+    if background is None:
+        background = listener.BackgroundListener(sr.Microphone(), min_threshold=2146).start()
+    # Anything heard while the last command ran, e.g. a video's sound, is not a new command
+    background.drain()
+    sys.stderr.write("Speak now\n")
+    utterance = background.get()
+    if utterance is None:
+        raise IOError("The microphone stopped")
+    # A few rejected utterances are recognized anyway, to count how often LILI's name is missed
+    accepted = wake_word is None or wake_word.check(utterance)
+    if not accepted and not wake_word.audit_due():
+        return None
+    sent = "" + r.recognize(to_audio_data(utterance))
+    if wake_word is not None:
+        wake_word.record(accepted, sent.lower().startswith("lily"))
 
     # Uncomment this to use standard input instead of speech recognition
     """
@@ -39,10 +82,12 @@ def runRecognizer():
     sent = sent.encode('ascii', 'ignore').lower()
     return sent
 
-# Only used to receive start command
-def onReadLine():
+# Receives the start command, and acknowledgements of commands sent to master control
+def handle_line(message):
     global started
-    message = vm.line.strip()
+    message = message.strip()
+    if commands.on_line(message):
+        return
     if message == "start":
         sys.stderr.write("Got start signal\n")
         started = True
@@ -53,21 +98,21 @@ def process_result(res):
         if res['action'] == "move":
             if "direction" in res and (res["direction"] == "left" or res["direction"] == "right"):
                 command = res['direction'] + "Wave"
-                vm.write(command + "\n")
+                commands.send(command)
                 sys.stderr.write("Sending command to master control: " + command + "\n")
             else:
                 sys.stderr.write("Unknown direction\n")
         elif res["action"] == "turn":
             command = "turnAround"
-            vm.write(command + "\n")
+            commands.send(command)
             sys.stderr.write("Sending command to master control: " + command + "\n")
         elif res["action"] == "stop":
             command = "stop"
-            vm.write(command + "\n")
+            commands.send(command)
             sys.stderr.write("Sending command to master control: " + command + "\n")
         elif res["action"] == "follow":
             command = "follow"
-            vm.write(command + "\n")
+            commands.send(command)
             sys.stderr.write("Sending command to master control: " + command + "\n")
         elif res["action"] == "show":
 
@@ -126,12 +171,29 @@ def process_result(res):
 
         # LILI master control has no actual actions for talking to the user, so when that action is detected, nothing is sent to the master control
 
-vm.setOnReadLine(onReadLine)
+def onReadLine():
+    handle_line(vm.line)
+
+if use_pump:
+    # Sleeps until the start signal arrives, then keeps handling messages and sending commands on the pump's own thread
+    msg_pump = pump.MessagePump(sys.stdin, sys.stdout, handle_line, commands)
+    msg_pump.run_until(lambda: started)
+    msg_pump.start()
+else:
+    vm.setOnReadLine(onReadLine)
+
+    IPC.InitSync()
+    while not started:
+        vm.tryReadLine()
+        IPC.Sync()
 
-IPC.InitSync()
-while not started:
-    vm.tryReadLine()
-    IPC.Sync()
+# Stage latencies are exported when either of these is set, see the interpreter.metrics module
+metrics_file = os.environ.get("LILI_METRICS_FILE")
+if os.environ.get("LILI_METRICS_PORT"):
+    metrics.enable()
+    metrics.serve(int(os.environ["LILI_METRICS_PORT"]))
+elif metrics_file:
+    metrics.enable()
 
 # Checks if this is the first voice command to be checked
 first = True
@@ -145,9 +207,13 @@ while started:
         first = False
 
     try:
+        cmd_started = metrics.start()
         sent = runRecognizer()
-        sys.stderr.write("Recognized sentence: " + sent + "\n")
-        if sent.lower().startswith("lily") == "lily":
+        cmd_started = metrics.observe("recognize", cmd_started)
+        if sent is None:
+            sys.stderr.write("LILI did not hear her name, the speech was not recognized\n")
+        elif sent.lower().startswith("lily"):
+            sys.stderr.write("Recognized sentence: " + sent + "\n")
 
             # Trim 'lily' out of the sentence
             sent = sent[4:].strip()
@@ -160,14 +226,23 @@ while started:
                     res = interp.interpret_sent(sent)
                     sys.stderr.write("Result: " + str(res) +"\n")
                     process_result(res)
+                    commands.pump()
+                    # End-to-end latency of the command, from the recognized sentence to the action being sent
+                    metrics.observe("command", cmd_started)
+                    if metrics_file:
+                        metrics.write_file(metrics_file)
                 except Exception,e:
                     sys.stderr.write("Sentence could not be interpreted due to exception:\n")
                     sys.stderr.write(str(e) + "\n")
         else:
+            sys.stderr.write("Recognized sentence: " + sent + "\n")
             sys.stderr.write("LILI did not listen to your command, say her name first\n")
 
     except Exception,e:
         sys.stderr.write("Speech could not be recognized\n")
         sys.stderr.write(str(e) + "\n")
 
-    IPC.Sync()
\ No newline at end of file
+    if msg_pump is None:
+        IPC.Sync()
+        # Resends commands that were not acknowledged in time
+        commands.pump()
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""
+Measures the throughput and acknowledgement latency of the command channel to master control.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_channel --bursts 200 --burst-size 5 --delay 0.001 --interval 0.01
+
+Bursts of random commands, like the ones the executor sends, are queued ``--interval`` seconds apart on a :class:`~interpreter.channel.CommandChannel` and pumped to a :class:`~interpreter.channel.LocalMasterControl` that takes ``--delay`` seconds to carry out each command. The commands queued, coalesced and written, the number of writes, the throughput and the latency from queueing a command to its acknowledgement are reported as JSON.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The interpreter builds its tables from paths relative to the working directory when it is imported
+os.chdir(root)
+
+import interpreter.channel as channel
+
+# The commands the executor sends to master control
+commands = ["leftWave", "rightWave", "turnAround", "stop", "follow"]
+
+def measure(bursts, burst_size, delay, interval=0.01, seed=0, max_in_flight=16, drop_rate=0.0):
+    """
+    Sends bursts of commands through a channel to the local stand-in for master control.
+
+    Args:
+        bursts (int): The number of bursts
+        burst_size (int): The number of commands in each burst
+        delay (float): The number of seconds master control takes to carry out a command
+        interval (float): The number of seconds between bursts
+        seed (int): The seed used to pick the commands
+        max_in_flight (int): See :class:`~interpreter.channel.CommandChannel`
+        drop_rate (float): The share of acknowledgements master control loses
+
+    Returns:
+        dict: The channel's :meth:`~interpreter.channel.CommandChannel.stats` along with the ``seconds`` taken and the ``throughput`` in queued commands per second
+    """
+    rng = random.Random(seed)
+    drop_acks = [seq for seq in range(1, bursts * burst_size + 1) if rng.random() < drop_rate]
+    master = channel.LocalMasterControl(delay=delay, drop_acks=drop_acks)
+    chan = channel.CommandChannel(master.write, max_in_flight=max_in_flight, ack_timeout=max(0.05, delay * max_in_flight * 2))
+    master.attach(chan)
+
+    started = time.time()
+    for i in range(bursts):
+        for j in range(burst_size):
+            chan.send(rng.choice(commands))
+        chan.pump()
+        # Acknowledgements that arrive between bursts are handled, as the executor would while listening
+        time.sleep(interval)
+        chan.pump()
+    if not chan.flush(timeout=60):
+        sys.stderr.write("Not every command was acknowledged\n")
+    elapsed = time.time() - started
+    master.close()
+
+    results = chan.stats()
+    results.update({
+        "seconds": elapsed,
+        "throughput": chan.queued / elapsed,
+        "carried_out": len(master.commands),
+        "duplicates": master.duplicates,
+    })
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the throughput and acknowledgement latency of the command channel to master control")
+    parser.add_argument("--bursts", type=int, default=200, help="number of bursts of commands")
+    parser.add_argument("--burst-size", type=int, default=5, help="number of commands in each burst")
+    parser.add_argument("--delay", type=float, default=0.001, help="seconds master control takes to carry out a command")
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between bursts")
+    parser.add_argument("--max-in-flight", type=int, default=16, help="most commands waiting for an acknowledgement")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="share of acknowledgements that are lost")
+    parser.add_argument("--seed", type=int, default=0, help="seed used to pick the commands")
+    args = parser.parse_args(argv)
+
+    results = measure(args.bursts, args.burst_size, args.delay, args.interval, args.seed, args.max_in_flight, args.drop_rate)
+    results.update({
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "bursts": args.bursts,
+        "burst_size": args.burst_size,
+        "delay": args.delay,
+        "interval": args.interval,
+    })
+    sys.stdout.write(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Benchmarks the interpreter pipeline on synthetic command corpora.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_interpreter --size 2000 --output bench_interpreter.json
+    python -m benchmarks.bench_interpreter --compare bench_interpreter.json
+
+Cold start, per-stage latency and batch throughput are measured with both the small and the large lexicon. The results are written as JSON so that runs on different commits can be compared with ``--compare``.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import corpus
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+known_words_dir = os.path.join(root, "input_files", "known_words")
+
+# The interpreter builds its tables from paths relative to the working directory when it is imported
+os.chdir(root)
+
+import interpreter.interpreter as interp
+import interpreter.metrics as metrics
+
+lexicons = {
+    "small": {
+        "actions": os.path.join(known_words_dir, "known_actions_small.txt"),
+        "shown_actions": os.path.join(known_words_dir, "known_shown_actions_small.txt"),
+        "objects": os.path.join(known_words_dir, "shown_objects_small.txt"),
+    },
+    "large": {
+        "actions": os.path.join(known_words_dir, "known_actions_large.txt"),
+        "shown_actions": os.path.join(known_words_dir, "known_shown_actions_large.txt"),
+        # There is no large list of shown objects
+        "objects": os.path.join(known_words_dir, "shown_objects_small.txt"),
+    },
+}
+
+def use_lexicon(name):
+    """
+    Rebuilds the interpreter's tables from one of the lexicons in :data:`lexicons`.
+
+    Args:
+        name (str): ``"small"`` or ``"large"``
+
+    Returns:
+        float: The number of seconds it took to build the tables
+    """
+    paths = lexicons[name]
+    started = time.time()
+    interp.install_snapshot(interp.build_snapshot(paths["actions"], paths["shown_actions"], paths["objects"]))
+    return time.time() - started
+
+def measure_cold_start(repeat):
+    """
+    Measures how long it takes a new Python process to import the interpreter.
+
+    Args:
+        repeat (int): The number of processes to start
+
+    Returns:
+        dict: The ``min`` and ``median`` import time in seconds
+    """
+    code = "import time; started = time.time(); import interpreter.interpreter; print(time.time() - started)"
+    samples = []
+    for i in range(repeat):
+        out = subprocess.check_output([sys.executable, "-c", code], cwd=root)
+        samples.append(float(out.strip().splitlines()[-1]))
+    samples.sort()
+    return {"min": samples[0], "median": samples[len(samples) / 2]}
+
+def measure_pipeline(sents, warmup):
+    """
+    Interprets every sentence and collects the per-stage latencies and the batch throughput.
+
+    Args:
+        sents (list): The sentences to interpret
+        warmup (int): The number of sentences to interpret first without measuring, so lazily loaded models do not distort the results
+
+    Returns:
+        dict: ``throughput`` in sentences per second, ``errors`` (sentences without a known action) and ``stages`` with the latency summary of each stage
+    """
+    metrics.enable(False)
+    for sent in sents[:warmup]:
+        interp.interpret_sent(sent)
+
+    metrics.reset()
+    metrics.enable()
+    errors = 0
+    started = time.time()
+    for sent in sents:
+        if "error" in interp.interpret_sent(sent):
+            errors += 1
+    elapsed = time.time() - started
+    metrics.enable(False)
+
+    return {"sentences": len(sents), "seconds": elapsed, "throughput": len(sents) / elapsed, "errors": errors, "stages": metrics.summary()}
+
+def run(size, seed, warmup, cold_start_repeat, lexicon_names):
+    """
+    Runs the whole benchmark.
+
+    Args:
+        size (int): The number of sentences in each corpus
+        seed (int): The seed used to generate the corpora
+        warmup (int): The number of warm up sentences for each lexicon
+        cold_start_repeat (int): The number of processes started to measure cold start
+        lexicon_names (list): The lexicons to benchmark
+
+    Returns:
+        dict: The benchmark results
+    """
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "size": size,
+        "seed": seed,
+        "cold_start": measure_cold_start(cold_start_repeat),
+        "lexicons": {},
+    }
+    for name in lexicon_names:
+        paths = lexicons[name]
+        sents = corpus.generate_corpus(paths["actions"], paths["shown_actions"], paths["objects"], size, seed)
+        build_seconds = use_lexicon(name)
+        res = measure_pipeline(sents, warmup)
+        res["build_seconds"] = build_seconds
+        results["lexicons"][name] = res
+    use_lexicon("small")
+    return results
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=root).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(old, new):
+    """
+    Formats a comparison of two benchmark results, one line per measurement.
+
+    Args:
+        old (dict): The baseline results
+        new (dict): The results to compare against the baseline
+
+    Returns:
+        str: A table of old values, new values and their ratio; ratios above 1 are slower
+    """
+    rows = [("cold_start.median", old["cold_start"]["median"], new["cold_start"]["median"])]
+    for name in sorted(set(old["lexicons"]) & set(new["lexicons"])):
+        old_lex = old["lexicons"][name]
+        new_lex = new["lexicons"][name]
+        rows.append((name + ".seconds_per_sentence", 1.0 / old_lex["throughput"], 1.0 / new_lex["throughput"]))
+        for stage in sorted(set(old_lex["stages"]) & set(new_lex["stages"])):
+            for key in ("p50", "p95", "p99"):
+                rows.append(("%s.%s.%s" % (name, stage, key), old_lex["stages"][stage][key], new_lex["stages"][stage][key]))
+
+    lines = ["%-40s %12s %12s %8s" % ("measurement", old.get("commit"), new.get("commit"), "ratio")]
+    for label, old_value, new_value in rows:
+        ratio = new_value / old_value if old_value else float("inf")
+        lines.append("%-40s %12.6f %12.6f %8.2f" % (label, old_value, new_value, ratio))
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the LILI interpreter pipeline")
+    parser.add_argument("--size", type=int, default=1000, help="number of sentences in each corpus")
+    parser.add_argument("--seed", type=int, default=0, help="seed used to generate the corpora")
+    parser.add_argument("--warmup", type=int, default=20, help="sentences interpreted before measuring")
+    parser.add_argument("--cold-start-repeat", type=int, default=5, help="processes started to measure cold start")
+    parser.add_argument("--lexicon", action="append", choices=sorted(lexicons), help="lexicon to benchmark, may be repeated (default: all)")
+    parser.add_argument("--output", help="file to write the JSON results to")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--write-corpus", help="write the small lexicon corpus to this file and exit")
+    args = parser.parse_args(argv)
+
+    if args.write_corpus:
+        paths = lexicons["small"]
+        with open(args.write_corpus, "wb") as out_file:
+            for sent in corpus.generate_corpus(paths["actions"], paths["shown_actions"], paths["objects"], args.size, args.seed):
+                out_file.write(sent + "\n")
+        return
+
+    results = run(args.size, args.seed, args.warmup, args.cold_start_repeat, args.lexicon or sorted(lexicons))
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "wb") as out_file:
+            out_file.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+    if args.compare:
+        with open(args.compare, "rb") as old_file:
+            sys.stderr.write(compare(json.load(old_file), results) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Compares the memory use and lookup speed of the compact :class:`~interpreter.lexicon.Lexicon` with the sorted ``(str, int)`` tuple lists it replaced.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_lexicon
+    python -m benchmarks.bench_lexicon --workers 4
+
+With ``--workers``, that many processes load the large known actions lexicon at the same time, once built in memory and once mapped from a compiled file, and the private memory of each process is reported (Linux only).
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+known_words_dir = os.path.join(root, "input_files", "known_words")
+
+# The interpreter builds its tables from paths relative to the working directory when it is imported
+os.chdir(root)
+
+import interpreter.interpreter as interp
+import interpreter.extractor as extractor
+import interpreter.lexicon as lexicon
+
+def tuple_list_size(pairs):
+    """
+    Calculates the memory used by a list of ``(str, int)`` tuples, including the tuples and strings it holds.
+
+    Args:
+        pairs (list): The list of tuples
+
+    Returns:
+        int: The number of bytes used
+    """
+    # The set indices are small integers, which Python shares between all objects
+    return sys.getsizeof(pairs) + sum(sys.getsizeof(pair) + sys.getsizeof(pair[0]) for pair in pairs)
+
+def lexicon_size(lex):
+    """
+    Calculates the memory used by a lexicon, including the objects that hold its buffer and arrays.
+
+    Args:
+        lex (Lexicon): The lexicon
+
+    Returns:
+        int: The number of bytes used
+    """
+    return sum(sys.getsizeof(obj) for obj in (lex.buf, lex.offsets, lex.sets, lex.slots))
+
+def time_lookups(lookup, words, repeat=3):
+    best = None
+    for i in range(repeat):
+        started = time.time()
+        for word in words:
+            lookup(word)
+        elapsed = time.time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(words)
+
+def binary_search(target, pool):
+    # The lookup the lexicon replaced: a recursive binary search of a sorted list of (str, int) tuples
+    if len(pool) == 0:
+        return -1
+    mid = len(pool)/2
+    if target < pool[mid][0]:
+        return binary_search(target, pool[:mid])
+    elif target > pool[mid][0]:
+        return binary_search(target, pool[mid+1:])
+    return pool[mid][1]
+
+def measure(filename, rand):
+    """
+    Builds the tuple list and the lexicon of a known words file and measures both.
+
+    Args:
+        filename (str): The known words file
+        rand (random.Random): The random number generator used to pick the words to look up
+
+    Returns:
+        dict: The sizes in bytes and the average lookup times in seconds
+    """
+    pairs, first_words = extractor.build_shown_words(filename)
+    lex = lexicon.Lexicon(pairs, first_words)
+    words = [rand.choice(pairs)[0] for i in range(2000)] + ["notaword%d" % i for i in range(500)]
+    return {
+        "words": len(pairs),
+        "tuple_list_bytes": tuple_list_size(pairs),
+        "lexicon_bytes": lexicon_size(lex),
+        "tuple_list_lookup_seconds": time_lookups(lambda word: binary_search(word, pairs), words),
+        "lexicon_lookup_seconds": time_lookups(lex.lookup, words),
+    }
+
+# Run by each worker process: loads the lexicon, touches every page of its buffer, then waits to be measured
+worker_code = """
+import sys
+import interpreter.interpreter as interp
+lex = interp.build_action_structures(sys.argv[1])[0]
+for i in xrange(0, len(lex.buf), 4096):
+    lex.buf[i]
+sys.stdout.write("ready\\n")
+sys.stdout.flush()
+sys.stdin.read()
+"""
+
+def private_memory_kb(pid):
+    """
+    Reads the memory of a process that is not shared with any other process.
+
+    Args:
+        pid (int): The process id
+
+    Returns:
+        int: The private memory in kilobytes
+    """
+    total = 0
+    with open("/proc/%d/smaps_rollup" % pid, "rb") as smaps:
+        for line in smaps:
+            if line.startswith("Private_"):
+                total += int(line.split()[1])
+    return total
+
+def measure_workers(filename, workers, compiled_dir):
+    """
+    Starts worker processes that all hold the lexicon of a known actions file at once and measures their private memory.
+
+    Args:
+        filename (str): The known actions file
+        workers (int): The number of processes
+        compiled_dir (str): The directory of compiled lexicons, ``None`` to build the lexicon in each process
+
+    Returns:
+        list: The private memory of each worker in kilobytes
+    """
+    env = dict(os.environ)
+    env.pop("LILI_LEXICON_DIR", None)
+    if compiled_dir:
+        env["LILI_LEXICON_DIR"] = compiled_dir
+    procs = []
+    try:
+        for i in range(workers):
+            proc = subprocess.Popen([sys.executable, "-c", worker_code, filename], cwd=root, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            proc.stdout.readline()
+            procs.append(proc)
+        return [private_memory_kb(proc.pid) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the lexicon with the tuple lists it replaced")
+    parser.add_argument("--workers", type=int, default=0, help="also measure the private memory of this many worker processes")
+    args = parser.parse_args(argv)
+
+    rand = random.Random(0)
+    results = {}
+    if args.workers:
+        filename = os.path.join(known_words_dir, "known_actions_large.txt")
+        compiled_dir = tempfile.mkdtemp(prefix="bench_lexicon")
+        try:
+            # The first load compiles the file, so every worker maps the same compiled copy
+            interp.lexicon.load(filename, interp.build_action_lexicon, "actions", compiled_dir)
+            results["workers"] = {
+                "built_private_kb": measure_workers(filename, args.workers, None),
+                "mapped_private_kb": measure_workers(filename, args.workers, compiled_dir),
+            }
+        finally:
+            shutil.rmtree(compiled_dir)
+    for name in sorted(os.listdir(known_words_dir)):
+        if name.endswith(".txt"):
+            results[name] = measure(os.path.join(known_words_dir, name), rand)
+            results[name]["reduction"] = 1.0 - float(results[name]["lexicon_bytes"]) / results[name]["tuple_list_bytes"]
+    sys.stdout.write(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+if __name__ == "__main__":
+    main()
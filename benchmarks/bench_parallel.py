@@ -0,0 +1,89 @@
+"""
+Measures how batch interpretation scales with the number of worker processes.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_parallel --size 5000
+    python -m benchmarks.bench_parallel --workers 1 --workers 2 --workers 4 --chunk-size 64
+
+The same synthetic corpus is interpreted with :meth:`~interpreter.parallel.imap_ordered` at every worker count, and the throughput, the speedup over one worker and the parallel efficiency (speedup per worker) of each run are reported as JSON. Each run includes starting the pool and loading the models in every worker, as an offline replay would.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+import corpus
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+known_words_dir = os.path.join(root, "input_files", "known_words")
+
+# The interpreter builds its tables from paths relative to the working directory when it is imported
+os.chdir(root)
+
+import interpreter.batch as batch
+import interpreter.parallel as parallel
+
+def measure(items, workers, chunk_size):
+    """
+    Interprets every item on a pool of worker processes.
+
+    Args:
+        items (list): The items, as returned by :meth:`~interpreter.batch.parse_line`
+        workers (int): The number of worker processes
+        chunk_size (int): The number of items sent to a worker at once
+
+    Returns:
+        dict: The ``seconds`` taken, the ``throughput`` in sentences per second and the number of ``errors``
+    """
+    started = time.time()
+    errors = 0
+    for res in parallel.imap_ordered(batch.interpret_line, items, workers, chunk_size):
+        if "exception" in res or "error" in res.get("result", {}):
+            errors += 1
+    elapsed = time.time() - started
+    return {"workers": workers, "seconds": elapsed, "throughput": len(items) / elapsed, "errors": errors}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how batch interpretation scales with the number of worker processes")
+    parser.add_argument("--size", type=int, default=2000, help="number of sentences in the corpus")
+    parser.add_argument("--seed", type=int, default=0, help="seed used to generate the corpus")
+    parser.add_argument("--workers", type=int, action="append", help="worker count to measure, may be repeated (default: 1, 2, 4, ... up to the number of cores)")
+    parser.add_argument("--chunk-size", type=int, default=32, help="sentences sent to a worker at once")
+    args = parser.parse_args(argv)
+
+    worker_counts = args.workers
+    if not worker_counts:
+        cores = multiprocessing.cpu_count()
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= cores:
+            worker_counts.append(worker_counts[-1] * 2)
+        if worker_counts[-1] != cores:
+            worker_counts.append(cores)
+
+    sents = corpus.generate_corpus(os.path.join(known_words_dir, "known_actions_small.txt"),
+                                   os.path.join(known_words_dir, "known_shown_actions_small.txt"),
+                                   os.path.join(known_words_dir, "shown_objects_small.txt"), args.size, args.seed)
+    items = [(sent, None) for sent in sents]
+
+    runs = [measure(items, workers, args.chunk_size) for workers in worker_counts]
+    base = next((res for res in runs if res["workers"] == 1), runs[0])
+    for res in runs:
+        res["speedup"] = res["throughput"] / base["throughput"] * base["workers"]
+        res["efficiency"] = res["speedup"] / res["workers"]
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cores": multiprocessing.cpu_count(),
+        "size": args.size,
+        "chunk_size": args.chunk_size,
+        "runs": runs,
+    }
+    sys.stdout.write(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Compares the CPU use and message latency of the event-driven message pump with a polling loop like the executor's old ``tryReadLine``/``Sync`` loop.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_pump --idle 2 --messages 200
+
+Both loops talk to a :class:`~interpreter.pump.PipePeer` over pipes. For each loop, the CPU time used per second while no messages arrive, the latency of lines sent by the peer (each line carries the time it was sent) and the time from queueing a command to its acknowledgement are reported as JSON. ``--poll-sleep`` adds a sleep to each turn of the polling loop, which trades CPU for latency.
+"""
+import argparse
+import json
+import os
+import platform
+import select
+import sys
+import threading
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The interpreter builds its tables from paths relative to the working directory when it is imported
+os.chdir(root)
+
+import interpreter.channel as channel
+import interpreter.metrics as metrics
+import interpreter.pump as pump
+
+def cpu_time():
+    # User and system CPU seconds used by this process
+    times = os.times()
+    return times[0] + times[1]
+
+class PollingLoop:
+    """ The executor's old loop: check for a line without waiting, write any queued commands, and go around again. """
+    def __init__(self, peer, on_line, poll_sleep=0.0):
+        self.peer = peer
+        self.on_line = on_line
+        self.poll_sleep = poll_sleep
+        self.channel = channel.CommandChannel(self.write)
+        self._buffer = ""
+
+    def write(self, data):
+        os.write(self.peer.executor_out, data)
+
+    def run_until(self, condition, timeout):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            if select.select([self.peer.executor_in], [], [], 0)[0]:
+                self._buffer += os.read(self.peer.executor_in, 65536)
+                lines = self._buffer.split("\n")
+                self._buffer = lines.pop()
+                for line in lines:
+                    if not self.channel.on_line(line):
+                        self.on_line(line)
+            self.channel.pump()
+            if self.poll_sleep:
+                time.sleep(self.poll_sleep)
+
+class PumpLoop:
+    """ The event-driven loop of :class:`~interpreter.pump.MessagePump`. """
+    def __init__(self, peer, on_line):
+        self.pump = pump.MessagePump(peer.executor_in, peer.executor_out, on_line, channel.CommandChannel(None))
+        self.channel = self.pump.channel
+
+    def run_until(self, condition, timeout):
+        self.pump.run_until(condition, timeout)
+
+def measure(make_loop, idle, messages, interval):
+    """
+    Measures one loop.
+
+    Args:
+        make_loop (function): Creates the loop, given the peer and the function to call with each line
+        idle (float): The number of seconds to measure the CPU use while idle for
+        messages (int): The number of lines sent by the peer, and the number of commands sent to the peer
+        interval (float): The number of seconds between lines sent by the peer
+
+    Returns:
+        dict: The ``idle_cpu`` (CPU seconds per second), the median and 95th percentile latency of the peer's lines and of the commands' acknowledgements
+    """
+    peer = pump.PipePeer()
+    latency = metrics.Histogram()
+    received = []
+
+    def on_line(line):
+        latency.observe(time.time() - float(line.split()[1]))
+        received.append(line)
+
+    loop = make_loop(peer, on_line)
+
+    cpu_started = cpu_time()
+    wall_started = time.time()
+    loop.run_until(lambda: False, idle)
+    idle_cpu = (cpu_time() - cpu_started) / (time.time() - wall_started)
+
+    # The peer's lines are sent from its own thread while the loop runs
+    def send_lines():
+        for i in range(messages):
+            time.sleep(interval)
+            peer.send_line("ping %.6f" % time.time())
+    sender = threading.Thread(target=send_lines)
+    sender.start()
+    loop.run_until(lambda: len(received) >= messages, messages * interval + 10)
+    sender.join()
+
+    for i in range(messages):
+        loop.channel.send("turnAround" if i % 2 else "follow")
+        loop.run_until(lambda: loop.channel.pending() == 0, 10)
+
+    p50, p95 = latency.quantiles((0.5, 0.95))
+    ack_p50, ack_p95 = loop.channel.latency.quantiles((0.5, 0.95))
+    peer.close()
+    return {
+        "idle_cpu": idle_cpu,
+        "line_latency_p50": p50,
+        "line_latency_p95": p95,
+        "ack_latency_p50": ack_p50,
+        "ack_latency_p95": ack_p95,
+        "lines": len(received),
+        "acked": loop.channel.acked,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the CPU use and message latency of the message pump with a polling loop")
+    parser.add_argument("--idle", type=float, default=2.0, help="seconds to measure CPU use while idle")
+    parser.add_argument("--messages", type=int, default=200, help="number of lines and commands to send")
+    parser.add_argument("--interval", type=float, default=0.005, help="seconds between lines sent by the peer")
+    parser.add_argument("--poll-sleep", type=float, default=0.0, help="seconds the polling loop sleeps on each turn")
+    args = parser.parse_args(argv)
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "messages": args.messages,
+        "poll_sleep": args.poll_sleep,
+        "polling": measure(lambda peer, on_line: PollingLoop(peer, on_line, args.poll_sleep), args.idle, args.messages, args.interval),
+        "pump": measure(PumpLoop, args.idle, args.messages, args.interval),
+    }
+    sys.stdout.write(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+if __name__ == "__main__":
+    main()
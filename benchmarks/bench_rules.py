@@ -0,0 +1,77 @@
+"""
+Compares the object extractors compiled from ``input_files/extractor_rules.txt`` with the ``object_dict_`` functions they replace.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_rules --repeat 20000
+
+Each extractor is run on part of speech tagged sentences like the ones it gets from the interpreter, which does not encode them, so the ``object_dict_`` functions' time includes encoding their sentence. The sentences are tagged by hand, so the benchmark does not depend on the tagger. The results of both extractors are checked to be the same before they are timed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The interpreter builds its tables from paths relative to the working directory when it is imported
+os.chdir(root)
+
+import interpreter.extractor as extractor
+import interpreter.rules as rules
+
+# Tagged sentences of each action, with the action trimmed off
+tagged_sents = {
+    "follow": [[("me", "PRP")], [("Jonathan", "NNP"), ("to", "TO"), ("the", "DT"), ("kitchen", "NN")]],
+    "move": [[("to", "TO"), ("the", "DT"), ("bathroom", "NN")], [("left", "VBD")], [("forward", "RB"), ("to", "TO"), ("the", "DT"), ("garage", "NN")]],
+    "turn": [[("right", "NN")], [("around", "RB")]],
+    "stop": [[], [("now", "RB")]],
+    "talk": [[("to", "TO"), ("Jonathan", "NNP")], [("about", "IN"), ("movies", "NNS")],
+             [("with", "IN"), ("Brandon", "NNP"), ("about", "IN"), ("computers", "NNS")]],
+    "start": [[("the", "DT"), ("story", "NN")], [("story", "NN"), ("mode", "NN")]],
+}
+
+def time_extractor(func, sents, repeat):
+    """
+    Times an extractor over a list of sentences.
+
+    Args:
+        func (function): The extractor
+        sents (list): The tagged sentences
+        repeat (int): The number of times to run through the sentences
+
+    Returns:
+        float: The average number of seconds per sentence
+    """
+    started = time.time()
+    for i in xrange(repeat):
+        for sent in sents:
+            func(sent)
+    return (time.time() - started) / (repeat * len(sents))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the compiled extractor rules with the object_dict_ functions")
+    parser.add_argument("--repeat", type=int, default=10000, help="times to run through the sentences of each action")
+    args = parser.parse_args(argv)
+
+    extractors = rules.load(rules.rules_path)
+    results = {}
+    for action in sorted(extractors):
+        func = getattr(extractor, "object_dict_" + action)
+        # The interpreter passes the tagged sentence as it is, see interpreter.generate_object_dict
+        sents = tagged_sents.get(action, [[]])
+        for sent in sents:
+            if extractors[action](sent) != func(sent):
+                sys.exit("The rules of %s give %r for %r, the function gives %r" % (action, extractors[action](sent), sent, func(sent)))
+        function_seconds = time_extractor(func, sents, args.repeat)
+        rules_seconds = time_extractor(extractors[action], sents, args.repeat)
+        results[action] = {
+            "function_seconds": function_seconds,
+            "rules_seconds": rules_seconds,
+            "ratio": rules_seconds / function_seconds,
+        }
+    sys.stdout.write(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Benchmarks and profiles the semsim WordNet mappers.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_semsim --suite verbs --slice 0:200
+    python -m benchmarks.bench_semsim --suite nouns --function sem_sim_test2 --profile semsim.prof
+    python -m benchmarks.bench_semsim --suite verbs --slice 0: --verify
+    python -m benchmarks.bench_semsim --suite verbs --slice 0:2000 --cache semsim.sqlite
+
+Both :meth:`~semsim.wntest.build_known_file` and :meth:`~semsim.wntest.sem_sim_test2` can be run over a slice of a word list. Words per second, the time spent in ``wn.synsets`` and ``path_similarity``, the share of words matched through the lemma index, the pairs of synsets pruned from the search and the peak memory of the process are reported as JSON. ``--exhaustive`` scores every pair of synsets instead of pruning the search, and ``--verify`` runs the mapper a second time with an exhaustive search and reports whether the results are the same. ``--cache`` answers WordNet queries from a :class:`~semsim.cache.CachedWordNet` database, so running the same command twice compares a cold cache with a warm one; the timings of ``wn.synsets`` and ``path_similarity`` then only count the queries that reached WordNet.
+"""
+import argparse
+import cProfile
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError: # Not available on Windows
+    resource = None
+
+import semsim.cache as cache
+import semsim.wntest as wntest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+input_dir = os.path.join(root, "input_files")
+
+# Each suite maps a word list onto the known words of one synset file
+suites = {
+    "verbs": {"wordlist": "verbs.txt", "synsets": "known-verbs.csv", "pos": "verb"},
+    "shown_actions": {"wordlist": "verbs.txt", "synsets": "known_shown_actions.csv", "pos": "verb"},
+    "nouns": {"wordlist": "nouns.txt", "synsets": "shown_objects.csv", "pos": "noun"},
+}
+
+class CallTimer:
+    """ Accumulates the number of calls to a function and the time spent in them.
+
+    Attributes:
+        calls (int): The number of calls made
+        seconds (float): The total time spent in the calls
+    """
+    def __init__(self, func):
+        """ Constructor for the :class:`CallTimer` class
+
+        Args:
+            func (function): The function to time
+        """
+        self.func = func
+        self.calls = 0
+        self.seconds = 0.0
+
+    def __call__(self, *args, **kwargs):
+        started = time.time()
+        try:
+            return self.func(*args, **kwargs)
+        finally:
+            self.seconds += time.time() - started
+            self.calls += 1
+
+class TimedWordNet:
+    """ Stands in for the ``wn`` corpus reader in :mod:`semsim.wntest`, timing ``synsets`` and ``synset`` lookups and passing everything else through.
+    """
+    def __init__(self, wordnet):
+        self.wordnet = wordnet
+        self.synsets = CallTimer(wordnet.synsets)
+        self.synset = CallTimer(wordnet.synset)
+
+    def __getattr__(self, name):
+        return getattr(self.wordnet, name)
+
+def peak_memory_kb():
+    """
+    Gets the peak resident memory of this process.
+
+    Returns:
+        int: The peak resident memory in kilobytes, ``None`` where it cannot be measured
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports kilobytes
+    if sys.platform == "darwin":
+        peak /= 1024
+    return peak
+
+def write_slice(wordlist_filename, start, end, out_filename):
+    """
+    Writes a slice of a word list to its own file, since the mappers read their unknown words from a file.
+
+    Args:
+        wordlist_filename (str): The word list to take words from
+        start (int): The index of the first word
+        end (int): The index after the last word, ``None`` for the end of the list
+        out_filename (str): The file to write the slice to
+
+    Returns:
+        int: The number of words in the slice
+    """
+    with open(wordlist_filename, "rb") as inp_file:
+        words = [line.strip() for line in inp_file if line.strip()][start:end]
+    with open(out_filename, "wb") as out_file:
+        out_file.write("\n".join(words) + "\n")
+    return len(words)
+
+def write_known_words(synset_csv_filename, out_filename):
+    """
+    Writes a known words file with one line for each word in a synset CSV file, which is the input :meth:`~semsim.wntest.build_known_file` expects.
+
+    Args:
+        synset_csv_filename (str): The synset CSV file
+        out_filename (str): The known words file to write
+    """
+    with open(synset_csv_filename, "rb") as inp_file:
+        rows = [line.strip().split(",") for line in inp_file][1:]
+    with open(out_filename, "wb") as out_file:
+        out_file.write("\n".join(row[0] for row in rows if row[0]) + "\n")
+
+def read_output(function, results, output_filename):
+    # What a mapper produced, in a form that can be compared between runs
+    if function == "build_known_file":
+        with open(output_filename, "rb") as out_file:
+            return out_file.read()
+    return [vars(res) for res in results]
+
+def run(suite_name, function, start, end, profile_filename=None, exhaustive=False, verify=False, cache_filename=None):
+    """
+    Runs one mapper over a slice of a suite's word list and measures it.
+
+    Args:
+        suite_name (str): One of the names in :data:`suites`
+        function (str): ``"build_known_file"`` or ``"sem_sim_test2"``
+        start (int): The index of the first word in the word list
+        end (int): The index after the last word, ``None`` for the end of the list
+        profile_filename (str): If given, the run is profiled with cProfile and the stats are dumped to this file
+        exhaustive (bool): If ``True``, every pair of synsets is scored instead of pruning the search
+        verify (bool): If ``True``, the mapper is run again, untimed, with the other kind of search, and the results are compared
+        cache_filename (str): If given, WordNet queries are answered from this query cache database first, see :class:`~semsim.cache.CachedWordNet`
+
+    Returns:
+        dict: The measurements of the run
+    """
+    # Imported here so the suites and helpers can be used without loading NLTK, see bench_snapshot
+    from nltk.corpus.reader.wordnet import Synset
+
+    suite = suites[suite_name]
+    synset_csv_filename = os.path.join(input_dir, "synsets", suite["synsets"])
+    work_dir = tempfile.mkdtemp(prefix="bench_semsim")
+    try:
+        unknown_filename = os.path.join(work_dir, "unknown.txt")
+        known_filename = os.path.join(work_dir, "known.txt")
+        output_filename = os.path.join(work_dir, "output.txt")
+        words = write_slice(os.path.join(input_dir, "wordlists", suite["wordlist"]), start, end, unknown_filename)
+        write_known_words(synset_csv_filename, known_filename)
+
+        stats = wntest.MappingStats()
+        def mapper(stats, exhaustive):
+            if function == "build_known_file":
+                return wntest.build_known_file(known_filename, unknown_filename, synset_csv_filename, output_filename, pos=suite["pos"], stats=stats, exhaustive=exhaustive)
+            return wntest.sem_sim_test2(synset_csv_filename, unknown_filename, pos=suite["pos"], stats=stats, exhaustive=exhaustive)
+        call = lambda: mapper(stats, exhaustive)
+
+        # Load WordNet before timing so the corpus load is reported on its own
+        started = time.time()
+        wntest.wn.get_version()
+        load_seconds = time.time() - started
+
+        timed_wn = TimedWordNet(wntest.wn)
+        path_similarity = Synset.__dict__["path_similarity"]
+        path_timer = CallTimer(path_similarity)
+        wntest.wn = timed_wn
+        cached_wn = None
+        if cache_filename:
+            cached_wn = wntest.wn = cache.CachedWordNet(cache_filename, timed_wn)
+        Synset.path_similarity = lambda self, *args, **kwargs: path_timer(self, *args, **kwargs)
+        # The mappers print a line per word, which is not part of what is being measured
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, "wb")
+        profiler = cProfile.Profile() if profile_filename else None
+        try:
+            started = time.time()
+            if profiler:
+                results = profiler.runcall(call)
+            else:
+                results = call()
+            elapsed = time.time() - started
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+            wntest.wn = timed_wn.wordnet
+            Synset.path_similarity = path_similarity
+            if cached_wn:
+                cached_wn.close()
+
+        matches = None
+        if verify:
+            output = read_output(function, results, output_filename)
+            sys.stdout = open(os.devnull, "wb")
+            try:
+                other_results = mapper(wntest.MappingStats(), not exhaustive)
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+            matches = output == read_output(function, other_results, output_filename)
+
+        if profiler:
+            # The dump can be viewed with pstats, snakeviz or turned into a flamegraph with flameprof
+            profiler.dump_stats(profile_filename)
+
+        return {
+            "suite": suite_name,
+            "function": function,
+            "slice": [start, end],
+            "words": words,
+            "seconds": elapsed,
+            "words_per_second": words / elapsed if elapsed else None,
+            "wordnet_load_seconds": load_seconds,
+            "synsets_calls": timed_wn.synsets.calls,
+            "synsets_seconds": timed_wn.synsets.seconds,
+            "synset_calls": timed_wn.synset.calls,
+            "synset_seconds": timed_wn.synset.seconds,
+            "path_similarity_calls": path_timer.calls,
+            "path_similarity_seconds": path_timer.seconds,
+            "lemma_hits": stats.lemma_hits,
+            "lemma_hit_rate": stats.hit_rate(),
+            "search": "exhaustive" if exhaustive else "pruned",
+            "pairs_pruned": stats.pairs_pruned,
+            "early_exits": stats.early_exits,
+            "matches_other_search": matches,
+            "cache": cached_wn.stats() if cached_wn else None,
+            "peak_memory_kb": peak_memory_kb(),
+            "python": platform.python_version(),
+        }
+    finally:
+        shutil.rmtree(work_dir)
+
+def parse_slice(text):
+    """
+    Parses a ``start:end`` slice, where either side may be left out.
+
+    Args:
+        text (str): The slice, e.g. ``"0:500"`` or ``"1000:"``
+
+    Returns:
+        (int, int): The start and end of the slice; the end is ``None`` if it was left out
+    """
+    start, sep, end = text.partition(":")
+    return (int(start) if start else 0, int(end) if end else None)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the semsim WordNet mappers")
+    parser.add_argument("--suite", choices=sorted(suites), default="verbs", help="word list and known synsets to map")
+    parser.add_argument("--function", choices=["build_known_file", "sem_sim_test2"], default="build_known_file", help="mapper to run")
+    parser.add_argument("--slice", default="0:100", help="start:end slice of the word list (default 0:100)")
+    parser.add_argument("--profile", help="dump cProfile stats of the run to this file")
+    parser.add_argument("--output", help="file to write the JSON results to")
+    parser.add_argument("--exhaustive", action="store_true", help="score every pair of synsets instead of pruning the search")
+    parser.add_argument("--verify", action="store_true", help="check the results against a run with the other kind of search")
+    parser.add_argument("--cache", help="query cache database to answer WordNet queries from, created if it does not exist")
+    args = parser.parse_args(argv)
+
+    start, end = parse_slice(args.slice)
+    results = run(args.suite, args.function, start, end, args.profile, args.exhaustive, args.verify, args.cache)
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "wb") as out_file:
+            out_file.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+    if results["matches_other_search"] is False:
+        sys.exit("The pruned and exhaustive searches found different matches")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Compares the load time, memory and mapping speed of semsim on a WordNet snapshot with semsim on the WordNet corpus.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_snapshot --snapshot wordnet.snapshot --suite verbs --slice 0:500
+
+The snapshot is built with :meth:`~semsim.snapshot.build` first if the file does not exist yet. Each backend is measured in a process of its own, so its load time and peak memory are not affected by the other: the time to import :mod:`semsim.wntest` and load WordNet, the peak memory after loading, the time :meth:`~semsim.wntest.sem_sim_test2` takes over a slice of a suite's word list and the peak memory after that. Whether both backends gave the same results and whether the snapshot's process imported NLTK are reported along with the measurements as JSON.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure(suite_name, start, end):
+    """
+    Measures the backend :mod:`semsim.wntest` is set to use in this process. Called in a process of its own for each backend.
+
+    Args:
+        suite_name (str): One of the names in :data:`benchmarks.bench_semsim.suites`
+        start (int): The index of the first word in the word list
+        end (int): The index after the last word, ``None`` for the end of the list
+
+    Returns:
+        dict: The measurements and a ``digest`` of the results
+    """
+    started = time.time()
+    # Importing the benchmark helpers imports semsim.wntest, which loads the snapshot if LILI_WORDNET_SNAPSHOT is set
+    from benchmarks import bench_semsim
+    wntest = bench_semsim.wntest
+    wntest.wn.get_version()
+    load_seconds = time.time() - started
+    load_memory = bench_semsim.peak_memory_kb()
+
+    suite = bench_semsim.suites[suite_name]
+    work_dir = tempfile.mkdtemp(prefix="bench_snapshot")
+    unknown_filename = os.path.join(work_dir, "unknown.txt")
+    words = bench_semsim.write_slice(os.path.join(bench_semsim.input_dir, "wordlists", suite["wordlist"]), start, end, unknown_filename)
+    # The mapper prints a line per word, which is not part of what is being measured
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "wb")
+    try:
+        started = time.time()
+        results = wntest.sem_sim_test2(os.path.join(bench_semsim.input_dir, "synsets", suite["synsets"]), unknown_filename, pos=suite["pos"])
+        elapsed = time.time() - started
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+        os.remove(unknown_filename)
+        os.rmdir(work_dir)
+
+    return {
+        "load_seconds": load_seconds,
+        "load_peak_memory_kb": load_memory,
+        "words": words,
+        "seconds": elapsed,
+        "words_per_second": words / elapsed if elapsed else None,
+        "peak_memory_kb": bench_semsim.peak_memory_kb(),
+        "nltk_imported": "nltk" in sys.modules,
+        "digest": hashlib.sha1(json.dumps([sorted(vars(res).items()) for res in results])).hexdigest(),
+    }
+
+def run_backend(backend, snapshot_filename, suite_name, slice_text):
+    """
+    Measures one backend in a new process.
+
+    Args:
+        backend (str): ``"wordnet"`` or ``"snapshot"``
+        snapshot_filename (str): The snapshot file
+        suite_name (str): The suite to map
+        slice_text (str): The ``start:end`` slice of the word list
+
+    Returns:
+        dict: The measurements of :meth:`measure`
+    """
+    env = dict(os.environ)
+    env.pop("LILI_WORDNET_SNAPSHOT", None)
+    if backend == "snapshot":
+        env["LILI_WORDNET_SNAPSHOT"] = snapshot_filename
+    output = subprocess.check_output([sys.executable, "-m", "benchmarks.bench_snapshot", "--child", "--suite", suite_name, "--slice", slice_text], cwd=root, env=env)
+    return json.loads(output)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare semsim on a WordNet snapshot with semsim on the WordNet corpus")
+    parser.add_argument("--snapshot", default="wordnet.snapshot", help="snapshot file, built first if it does not exist")
+    parser.add_argument("--suite", choices=["verbs", "shown_actions", "nouns"], default="verbs", help="word list and known synsets to map")
+    parser.add_argument("--slice", default="0:100", help="start:end slice of the word list (default 0:100)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    start, sep, end = args.slice.partition(":")
+    if args.child:
+        sys.stdout.write(json.dumps(measure(args.suite, int(start) if start else 0, int(end) if end else None)) + "\n")
+        return
+
+    build_seconds = None
+    if not os.path.exists(args.snapshot):
+        import semsim.snapshot as snapshot
+        started = time.time()
+        snapshot.build(args.snapshot, sorted(glob.glob(os.path.join(root, "input_files", "wordlists", "*.txt"))), sorted(glob.glob(os.path.join(root, "input_files", "synsets", "*.csv"))))
+        build_seconds = time.time() - started
+
+    wordnet = run_backend("wordnet", args.snapshot, args.suite, args.slice)
+    snap = run_backend("snapshot", args.snapshot, args.suite, args.slice)
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "suite": args.suite,
+        "slice": args.slice,
+        "snapshot_bytes": os.path.getsize(args.snapshot),
+        "snapshot_build_seconds": build_seconds,
+        "wordnet": wordnet,
+        "snapshot": snap,
+        "same_results": wordnet.pop("digest") == snap.pop("digest"),
+        "load_speedup": wordnet["load_seconds"] / snap["load_seconds"] if snap["load_seconds"] else None,
+    }
+    sys.stdout.write(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+if __name__ == "__main__":
+    main()
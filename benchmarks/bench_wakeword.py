@@ -0,0 +1,169 @@
+"""
+Measures how accurately and how quickly the wake word detector gates recorded utterances.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_wakeword --fixtures recordings/
+    python -m benchmarks.bench_wakeword --size 100 --noise 800
+
+The fixtures directory holds mono WAV files in three subdirectories: ``templates`` (recordings of the wake word alone, as in ``input_files/wake_word``), ``wake`` (commands that start with the wake word) and ``other`` (speech that does not). Without ``--fixtures``, synthetic fixtures are generated in a temporary directory: the wake word and the other words are sequences of tones, said at different speeds, volumes and noise levels.
+
+The false accept and false reject rates, the share of utterances that would not have been sent to the recognizer and the time taken to check an utterance compared with its length are reported as JSON.
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import wave
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The interpreter builds its tables from paths relative to the working directory when it is imported
+os.chdir(root)
+
+import interpreter.listener as listener
+import interpreter.wakeword as wakeword
+
+rate = 16000
+
+# The synthetic wake word, as a list of (frequency, seconds, amplitude) tones
+wake_tones = [(300, 0.08, 6000), (2500, 0.06, 3000), (350, 0.10, 7000), (2200, 0.08, 3000)]
+
+other_frequencies = [200, 300, 500, 800, 1200, 1500, 2500, 3000]
+
+def synthesize(tones, rng, stretch=1.0, gain=1.0):
+    # Each tone fades in and out over 10 ms, and is made a little longer or shorter at random
+    samples = []
+    fade = rate / 100
+    for freq, seconds, amplitude in tones:
+        count = int(seconds * stretch * rng.uniform(0.9, 1.1) * rate)
+        for i in xrange(count):
+            envelope = min(1.0, float(i) / fade, float(count - i) / fade)
+            samples.append(gain * amplitude * envelope * math.sin(2 * math.pi * freq * i / rate))
+    return samples
+
+def random_tones(rng, count):
+    return [(rng.choice(other_frequencies), rng.uniform(0.05, 0.12), rng.choice([3000, 6000])) for i in range(count)]
+
+def write_utterance(filename, words, rng, noise):
+    # The words are separated by short pauses, with silence before and after like an utterance from the listener
+    samples = [0.0] * int(0.3 * rate)
+    for tones in words:
+        samples.extend(synthesize(tones, rng, rng.uniform(0.8, 1.2), rng.uniform(0.4, 1.6)))
+        samples.extend([0.0] * int(0.05 * rate))
+    samples.extend([0.0] * int(0.2 * rate))
+    samples = [max(-32767, min(32767, int(sample + rng.gauss(0, noise)))) for sample in samples]
+    wav = wave.open(filename, "wb")
+    wav.setnchannels(1)
+    wav.setsampwidth(2)
+    wav.setframerate(rate)
+    wav.writeframes(struct.pack("<%dh" % len(samples), *samples))
+    wav.close()
+
+def make_fixtures(dirname, size, seed=0, noise=200, templates=3):
+    """
+    Generates synthetic fixtures.
+
+    Args:
+        dirname (str): The directory to create the ``templates``, ``wake`` and ``other`` subdirectories in
+        size (int): The number of utterances in each of ``wake`` and ``other``
+        seed (int): The seed of the random generator
+        noise (float): The standard deviation of the background noise
+        templates (int): The number of recordings of the wake word alone
+    """
+    rng = random.Random(seed)
+    for subdir in ("templates", "wake", "other"):
+        os.makedirs(os.path.join(dirname, subdir))
+    for i in range(templates):
+        write_utterance(os.path.join(dirname, "templates", "%03d.wav" % i), [wake_tones], rng, noise)
+    for i in range(size):
+        command = [random_tones(rng, rng.randint(2, 5)) for j in range(rng.randint(1, 3))]
+        write_utterance(os.path.join(dirname, "wake", "%03d.wav" % i), [wake_tones] + command, rng, noise)
+        write_utterance(os.path.join(dirname, "other", "%03d.wav" % i), [random_tones(rng, 4)] + command, rng, noise)
+
+def read_utterance(filename):
+    # Reads a WAV file into an Utterance like the ones the listener produces
+    with listener.FileAudioSource(filename) as source:
+        frames = "".join(iter(lambda: source.stream.read(source.CHUNK), ""))
+        return listener.Utterance(frames, source.SAMPLE_RATE, source.SAMPLE_WIDTH, 0.0)
+
+def measure(detector, fixtures_dir):
+    """
+    Checks every utterance of the ``wake`` and ``other`` fixtures, recording each result as the recognizer would.
+
+    Args:
+        detector (WakeWordDetector): The detector
+        fixtures_dir (str): The fixtures directory
+
+    Returns:
+        dict: The detector's :meth:`~interpreter.wakeword.WakeWordDetector.stats` along with the true error rates over all the fixtures and the timing of the checks
+    """
+    errors = {"wake": 0, "other": 0}
+    counts = {"wake": 0, "other": 0}
+    audio_seconds = 0.0
+    check_seconds = 0.0
+    for label in ("wake", "other"):
+        for filename in sorted(glob.glob(os.path.join(fixtures_dir, label, "*.wav"))):
+            utterance = read_utterance(filename)
+            started = time.time()
+            accepted = detector.check(utterance)
+            check_seconds += time.time() - started
+            audio_seconds += utterance.duration()
+            counts[label] += 1
+            errors[label] += accepted != (label == "wake")
+            # The benchmark knows the answer, so every utterance the recognizer would see is recorded
+            if accepted or detector.audit_due():
+                detector.record(accepted, label == "wake")
+
+    results = detector.stats()
+    results.update({
+        "utterances": counts["wake"] + counts["other"],
+        "threshold": detector.threshold,
+        "true_false_accept_rate": float(errors["other"]) / counts["other"] if counts["other"] else None,
+        "true_false_reject_rate": float(errors["wake"]) / counts["wake"] if counts["wake"] else None,
+        "seconds_per_check": check_seconds / max(1, counts["wake"] + counts["other"]),
+        "real_time_factor": check_seconds / audio_seconds if audio_seconds else None,
+    })
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how accurately and how quickly the wake word detector gates recorded utterances")
+    parser.add_argument("--fixtures", help="directory with templates, wake and other subdirectories of WAV files (default: synthetic fixtures)")
+    parser.add_argument("--size", type=int, default=50, help="number of synthetic utterances of each kind")
+    parser.add_argument("--seed", type=int, default=0, help="seed used to generate the synthetic fixtures")
+    parser.add_argument("--noise", type=float, default=200, help="background noise level of the synthetic fixtures")
+    parser.add_argument("--threshold", type=float, help="accept threshold (default: calibrated from the templates)")
+    parser.add_argument("--audit-every", type=int, default=20, help="recognize one rejected utterance in this many to count false rejects")
+    args = parser.parse_args(argv)
+
+    fixtures_dir = args.fixtures
+    tmp_dir = None
+    if not fixtures_dir:
+        fixtures_dir = tmp_dir = tempfile.mkdtemp(prefix="lili-wakeword-")
+        make_fixtures(tmp_dir, args.size, args.seed, args.noise)
+    try:
+        detector = wakeword.load(os.path.join(fixtures_dir, "templates"), threshold=args.threshold, audit_every=args.audit_every)
+        if detector is None:
+            sys.exit("No templates found in " + os.path.join(fixtures_dir, "templates"))
+        results = measure(detector, fixtures_dir)
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir)
+
+    results.update({
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fixtures": args.fixtures or "synthetic",
+    })
+    sys.stdout.write(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+if __name__ == "__main__":
+    main()
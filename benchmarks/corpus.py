@@ -0,0 +1,98 @@
+import random
+
+# Templates for each action set, named after the first action of the set like the object extractor functions
+# Slots in braces are filled from the known word files, except for the people, places and topics listed below
+templates = {
+    "move": ["{action} to the {place}", "{action} {direction}", "{action} to the {direction}"],
+    "turn": ["{action} {direction}", "{action} around"],
+    "stop": ["{action}", "{action} now"],
+    "follow": ["{action} me", "{action} {person} to the {place}"],
+    "talk": ["{action} to {person}", "{action} about {topic}", "{action} with {person} about {topic}"],
+    "show": ["{action} me how to {shown_action} my {object}", "{action} the {object}", "{action} her what a {object} is",
+             "{action} me what to do when I want to {shown_action} my {object}", "{action} me to {shown_action} the {object}"],
+    "start": ["{action} the story", "{action} story mode"],
+}
+
+# Commands without a known action, which stop after action extraction
+unknown_templates = ["Blorg me to play tennis", "What time is it", "Tell-tale signs of {topic}"]
+
+people = ["Jonathan", "Brandon", "me", "her", "him", "Sarah"]
+places = ["kitchen", "bathroom", "bedroom", "garage", "office", "hallway"]
+topics = ["football", "movies", "computers", "music", "weather", "robots"]
+directions = ["left", "right", "forward", "backward", "up", "down"]
+
+# The sentences of interpreter/test_interpreter.py, always placed at the start of a corpus
+reference_sents = [
+    "Follow me",
+    "Follow Jonathan to the kitchen",
+    "Move to the bathroom",
+    "Stop",
+    "Talk to Jonathan",
+    "Talk about movies",
+    "Talk with Brandon about computers",
+    "TeacH me how to wash my hands",
+    "Show the car",
+    "Show her what a cow is",
+    "Show me what to do when I want to wash my hands",
+    "Show me to play tennis",
+    "Blorg me to play tennis",
+]
+
+def read_word_sets(filename):
+    """
+    Reads a known words file into a list of word sets, one per line.
+
+    Args:
+        filename (str): The name of a file in the format of ``input_files/known_words``
+
+    Returns:
+        list: A list of lists of words; the first word of each list names the set
+    """
+    word_sets = []
+    with open(filename, "rb") as inp_file:
+        for line in inp_file:
+            line = line.strip().lower()
+            if line:
+                word_sets.append([word.strip() for word in line.split(",") if word.strip()])
+    return word_sets
+
+def generate_corpus(actions_filename, shown_actions_filename, objects_filename, size, seed=0, unknown_ratio=0.05):
+    """
+    Generates a reproducible list of synthetic commands from the known word files.
+
+    Each command is generated by picking an action set, one of its words as the action and one of its templates, then filling the remaining slots. The same arguments always produce the same corpus, so results can be compared between commits.
+
+    Args:
+        actions_filename (str): The known actions file to take actions from
+        shown_actions_filename (str): The known shown actions file to take shown actions from
+        objects_filename (str): The shown objects file to take objects from
+        size (int): The number of commands to generate, including the reference sentences
+        seed (int): The seed of the random number generator
+        unknown_ratio (float): The fraction of commands that have no known action
+
+    Returns:
+        list: The list of command sentences
+    """
+    rand = random.Random(seed)
+    action_sets = [word_set for word_set in read_word_sets(actions_filename) if word_set[0] in templates]
+    shown_actions = [word for word_set in read_word_sets(shown_actions_filename) for word in word_set]
+    objects = [word for word_set in read_word_sets(objects_filename) for word in word_set]
+
+    corpus = reference_sents[:size]
+    while len(corpus) < size:
+        fill = {
+            "person": rand.choice(people),
+            "place": rand.choice(places),
+            "topic": rand.choice(topics),
+            "direction": rand.choice(directions),
+            "shown_action": rand.choice(shown_actions),
+            "object": rand.choice(objects),
+        }
+        if rand.random() < unknown_ratio:
+            sent = rand.choice(unknown_templates).format(**fill)
+        else:
+            action_set = rand.choice(action_sets)
+            fill["action"] = rand.choice(action_set).capitalize()
+            sent = rand.choice(templates[action_set[0]]).format(**fill)
+        corpus.append(sent)
+    return corpus
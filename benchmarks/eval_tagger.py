@@ -0,0 +1,130 @@
+"""
+Checks that a tagger backend gives the same interpreter results as the reference perceptron tagger before it is enabled.
+
+Run from the repository root::
+
+    python -m benchmarks.eval_tagger
+    python -m benchmarks.eval_tagger --backend lexicon --size 5000 --lexicon large
+
+Every sentence of the reference sentences and a synthetic corpus is tagged and interpreted with both backends. The tag agreement, the interpreter results that differ and the tagging time of each backend are reported as JSON. The exit status is 1 if any result differs. With ``--record``, the result is also recorded in ``input_files/tagger_evaluations.json``, and a backend can only be enabled once it has a recorded result with no differences, see :meth:`~interpreter.nlp.set_tagger_backend`.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import corpus
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+known_words_dir = os.path.join(root, "input_files", "known_words")
+
+# The interpreter builds its tables from paths relative to the working directory when it is imported
+os.chdir(root)
+
+import interpreter.interpreter as interp
+import interpreter.nlp as nlp
+import interpreter.taggers as taggers
+
+def run_backend(backend, sents):
+    """
+    Tags and interprets every sentence with one backend.
+
+    Args:
+        backend (str): The name of the backend
+        sents (list): The sentences
+
+    Returns:
+        (list, list, float, dict): The tagged sentences, the interpreter results, the seconds spent tagging and the backend's own statistics, if it keeps any
+    """
+    nlp.set_tagger_backend(backend, force=True)
+    tagger = nlp.get(nlp.tagger_backends[backend])
+    token_lists = [nlp.tokenize(sent) for sent in sents]
+
+    started = time.time()
+    tagged = [tagger.tag(tokens) for tokens in token_lists]
+    seconds = time.time() - started
+
+    results = []
+    for sent in sents:
+        try:
+            results.append(interp.interpret_sent(sent))
+        except Exception as err:
+            results.append({"exception": "%s: %s" % (type(err).__name__, err)})
+    stats = tagger.stats() if hasattr(tagger, "stats") else None
+    return (tagged, results, seconds, stats)
+
+def evaluate(backend, sents, reference="perceptron"):
+    """
+    Compares a backend with the reference backend.
+
+    Args:
+        backend (str): The name of the backend to check
+        sents (list): The sentences to check it on
+        reference (str): The name of the reference backend
+
+    Returns:
+        dict: The ``tag_accuracy`` against the reference tags, the ``mismatches`` between interpreter results, the tagging time of both backends and the backend's statistics, e.g. the cache hit rate
+    """
+    old_backend = nlp.tagger_backend
+    try:
+        ref_tagged, ref_results, ref_seconds, ref_stats = run_backend(reference, sents)
+        tagged, results, seconds, stats = run_backend(backend, sents)
+    finally:
+        nlp.set_tagger_backend(old_backend, force=True)
+
+    tokens = 0
+    agreed = 0
+    mismatches = []
+    for sent, ref_tags, tags, ref_res, res in zip(sents, ref_tagged, tagged, ref_results, results):
+        tokens += len(tags)
+        agreed += sum(1 for ref_tag, tag in zip(ref_tags, tags) if ref_tag == tag)
+        if ref_res != res:
+            mismatches.append({"sentence": sent, "reference": ref_res, "result": res, "reference_tags": ref_tags, "tags": tags})
+
+    return {
+        "backend": backend,
+        "reference": reference,
+        "sentences": len(sents),
+        "tag_accuracy": float(agreed) / tokens if tokens else 1.0,
+        "mismatches": mismatches,
+        "seconds": seconds,
+        "reference_seconds": ref_seconds,
+        "backend_stats": stats,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that a tagger backend gives the same interpreter results as the perceptron")
+    parser.add_argument("--backend", default="lexicon", choices=sorted(nlp.tagger_backends), help="backend to check (default lexicon)")
+    parser.add_argument("--size", type=int, default=1000, help="number of sentences in the synthetic corpus")
+    parser.add_argument("--seed", type=int, default=0, help="seed used to generate the corpus")
+    parser.add_argument("--lexicon", default="small", choices=["small", "large"], help="known words used to generate the corpus")
+    parser.add_argument("--record", action="store_true", help="record the result, which the backend needs before it can be enabled")
+    args = parser.parse_args(argv)
+
+    # There is no large list of shown objects
+    paths = (os.path.join(known_words_dir, "known_actions_%s.txt" % args.lexicon),
+             os.path.join(known_words_dir, "known_shown_actions_%s.txt" % args.lexicon),
+             os.path.join(known_words_dir, "shown_objects_small.txt"))
+    interp.install_snapshot(interp.build_snapshot(*paths))
+    sents = corpus.generate_corpus(paths[0], paths[1], paths[2], args.size, args.seed)
+    results = evaluate(args.backend, sents)
+    sys.stdout.write(json.dumps(results, indent=2, sort_keys=True) + "\n")
+    if args.record:
+        taggers.record_evaluation({
+            "backend": results["backend"],
+            "reference": results["reference"],
+            "sentences": results["sentences"],
+            "tag_accuracy": results["tag_accuracy"],
+            "mismatches": len(results["mismatches"]),
+            "lexicon": args.lexicon,
+            "size": args.size,
+            "seed": args.seed,
+            "timestamp": time.time(),
+        })
+    if results["mismatches"]:
+        sys.stderr.write("%d of %d results differ from the %s backend\n" % (len(results["mismatches"]), len(sents), results["reference"]))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
 import speech_recognition as sr
 import interpreter.interpreter as interp
+import interpreter.metrics as metrics
+import interpreter.nlp as nlp
+import interpreter.reloader as reloader
 from subprocess import call
 import os
 import sys
@@ -23,6 +26,11 @@ vm = IPC.process(True, "LILIExecutor.py")
 
 started = False # Changes once it gets start command from master controller
 
+# Load the NLP models in the background while waiting to start, so the first command is not delayed by them
+nlp.warm_up()
+# Picks up edits to the known word files without restarting
+reloader.start()
+
 r = sr.Recognizer()
 def runRecognizer():
 
@@ -143,6 +151,14 @@ while not started:
 # Added in for demonstration purposes
 started = True
 
+# Stage latencies are exported when either of these is set, see the interpreter.metrics module
+metrics_file = os.environ.get("LILI_METRICS_FILE")
+if os.environ.get("LILI_METRICS_PORT"):
+    metrics.enable()
+    metrics.serve(int(os.environ["LILI_METRICS_PORT"]))
+elif metrics_file:
+    metrics.enable()
+
 # Checks if this is the first voice command to be checked
 first = True
 
@@ -155,7 +171,9 @@ while started:
         first = False
 
     try:
+        cmd_started = metrics.start()
         sent = runRecognizer()
+        cmd_started = metrics.observe("recognize", cmd_started)
         sys.stderr.write("Recognized sentence: " + sent + "\n")
         if sent.lower().startswith("lily"):
 
@@ -170,6 +188,10 @@ while started:
                     res = interp.interpret_sent(sent)
                     sys.stderr.write("Result: " + str(res) +"\n")
                     process_result(res)
+                    # End-to-end latency of the command, from the recognized sentence to the action being sent
+                    metrics.observe("command", cmd_started)
+                    if metrics_file:
+                        metrics.write_file(metrics_file)
                 except Exception,e:
                     sys.stderr.write("Sentence could not be interpreted due to exception:\n")
                     sys.stderr.write(str(e) + "\n")
@@ -0,0 +1,131 @@
+"""
+Interprets a stream of commands without the executor, for processing command logs offline.
+
+Reads newline-delimited commands or JSON lines from a file or standard input and writes one JSON line per command::
+
+    python -m interpreter.batch commands.txt > results.jsonl
+    cat requests.jsonl | python -m interpreter.batch --workers 4 --output results.jsonl
+
+A JSON input line is an object with the command in its ``"text"``, ``"sentence"`` or ``"command"`` entry. Its ``"id"`` or ``"request_id"`` (if any) is copied to the output line. Output lines are always written in input order.
+"""
+from __future__ import absolute_import
+
+import argparse
+import json
+import sys
+
+# Absolute import, since this module is also run as __main__
+import interpreter.interpreter as interp
+import interpreter.parallel as parallel
+
+# Entries of a JSON input line that may hold the command, in order of preference
+text_keys = ("text", "sentence", "command")
+id_keys = ("id", "request_id")
+
+def parse_line(line):
+    """
+    Parses one input line into the command and the id to report it under.
+
+    Bytes that are not valid UTF-8 are replaced with U+FFFD, so every command can be written back out as JSON.
+
+    Args:
+        line (str): A line of input, either a plain command or a JSON object
+
+    Returns:
+        (str, object): A tuple ``(text, record_id)``; ``record_id`` is ``None`` for plain commands
+
+           * Returns ``(None, None)`` for blank lines
+    """
+    line = line.strip()
+    if not line:
+        return (None, None)
+    if isinstance(line, str):
+        line = line.decode("utf-8", "replace").encode("utf-8")
+    if line.startswith("{"):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return (line, None)
+        text = next((record[key] for key in text_keys if key in record), "")
+        record_id = next((record[key] for key in id_keys if key in record), None)
+        if isinstance(text, unicode):
+            # Plain commands are UTF-8 bytes, so JSON commands are given to the interpreter the same way
+            text = text.encode("utf-8")
+        return (text, record_id)
+    return (line, None)
+
+def interpret_line(item):
+    """
+    Interprets a single command and builds its output record.
+
+    Args:
+        item (tuple): A tuple ``(text, record_id)`` as returned by :meth:`parse_line`
+
+    Returns:
+        dict: The output record with the command's ``"text"``, its ``"result"`` (or an ``"exception"`` if it could not be interpreted) and its ``"id"`` if it had one
+    """
+    text, record_id = item
+    out = {"text": text}
+    if record_id is not None:
+        out["id"] = record_id
+    try:
+        out["result"] = interp.interpret_sent(text)
+    except Exception as err:
+        out["exception"] = "%s: %s" % (type(err).__name__, err)
+    return out
+
+def read_items(inp_file):
+    # readline instead of iterating the file, which reads ahead and would hold back commands piped in one at a time
+    for line in iter(inp_file.readline, ""):
+        item = parse_line(line)
+        if item[0] is not None:
+            yield item
+
+def run(inp_file, out_file, workers=1, window=None, chunk_size=32):
+    """
+    Streams every command of ``inp_file`` through the interpreter and writes the results to ``out_file`` as JSON lines.
+
+    With more than one worker, commands are interpreted in chunks by a process pool (see :meth:`~interpreter.parallel.imap_ordered`). At most ``window`` chunks are in flight at once and results are written as soon as every earlier result is written, so memory use stays constant however long the input is, and the output is in input order.
+
+    Args:
+        inp_file (file): The input stream
+        out_file (file): The output stream
+        workers (int): The number of worker processes, 1 interprets every command in this process
+        window (int): The maximum number of chunks in flight, defaults to 4 per worker
+        chunk_size (int): The number of commands sent to a worker at once
+
+    Returns:
+        int: The number of commands interpreted
+    """
+    count = 0
+    if workers <= 1:
+        for item in read_items(inp_file):
+            out_file.write(json.dumps(interpret_line(item)) + "\n")
+            count += 1
+        return count
+
+    for res in parallel.imap_ordered(interpret_line, read_items(inp_file), workers, chunk_size, window):
+        out_file.write(json.dumps(res) + "\n")
+        count += 1
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Interpret newline-delimited commands or JSON lines and write JSON line results")
+    parser.add_argument("input", nargs="?", help="file of commands, standard input if left out or -")
+    parser.add_argument("--output", help="file to write the results to, standard output if left out")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes (default 1)")
+    parser.add_argument("--chunk-size", type=int, default=32, help="commands sent to a worker at once (default 32)")
+    args = parser.parse_args(argv)
+
+    inp_file = sys.stdin if args.input in (None, "-") else open(args.input, "rb")
+    out_file = open(args.output, "wb") if args.output else sys.stdout
+    try:
+        run(inp_file, out_file, args.workers, chunk_size=args.chunk_size)
+    finally:
+        if inp_file is not sys.stdin:
+            inp_file.close()
+        if out_file is not sys.stdout:
+            out_file.close()
+
+if __name__ == "__main__":
+    main()
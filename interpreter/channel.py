@@ -0,0 +1,357 @@
+"""
+Sends commands to LILI master control through a queue that batches, coalesces and acknowledges them.
+
+The executor used to write every command to master control as soon as it was interpreted, one ``write`` per command, and never learned whether it arrived. A :class:`~interpreter.channel.CommandChannel` instead queues commands with :meth:`~CommandChannel.send`, which never blocks. :meth:`~CommandChannel.pump` writes everything queued in a single write.
+
+While a command is waiting in the queue, a newer command can make it redundant:
+
+* A command that is already queued is not queued again, e.g. ``stop`` said twice
+* A command replaces a queued command of the same group, e.g. ``rightWave`` replaces a ``leftWave`` that has not been sent yet, see :data:`command_groups`
+* ``stop`` removes every queued movement command, see :data:`cancelled_by`. Movement commands that were written but not acknowledged yet are forgotten too, so they are never written again after the ``stop``
+
+With acknowledgements turned on, each command is written as ``<command> <sequence number>`` and master control answers each one with ``ack <sequence number>``. A command that is not acknowledged within ``ack_timeout`` seconds is written again with the same sequence number, so master control can ignore the copy if it did get the first one. :class:`~interpreter.channel.LocalMasterControl` stands in for master control in tests and benchmarks.
+"""
+import collections
+import threading
+import time
+
+import metrics
+import tracelog
+
+# Commands of the same group replace each other while they wait to be sent
+command_groups = {
+    "leftWave": "wave",
+    "rightWave": "wave",
+}
+
+# Queued commands that are no longer needed once each of these commands is queued
+cancelled_by = {
+    "stop": frozenset(["leftWave", "rightWave", "turnAround", "follow"]),
+}
+
+class CommandChannel:
+    """ A queue of commands for LILI master control.
+
+    The channel has no thread of its own: :meth:`pump` writes the queued commands and must be called by whoever owns the connection to master control, e.g. the executor's main loop. Lines received from master control are passed to :meth:`on_line`.
+
+    Attributes:
+        queued (int): The number of commands given to :meth:`send`
+        coalesced (int): The number of queued or unacknowledged commands dropped because a newer command made them redundant
+        sent (int): The number of commands written, not counting resends
+        writes (int): The number of times the transport was written to
+        resent (int): The number of times a command was written again because it was not acknowledged
+        acked (int): The number of commands acknowledged
+        lost (int): The number of commands given up on after ``max_retries`` resends
+        latency (Histogram): The seconds from queueing each command to its acknowledgement
+    """
+    def __init__(self, write, acks=True, max_in_flight=16, ack_timeout=1.0, max_retries=3, on_queued=None):
+        """ Constructor for the :class:`~interpreter.channel.CommandChannel` class
+
+        Args:
+            write (function): Writes a string to master control, e.g. ``vm.write``
+            acks (bool): If ``True``, commands are numbered and kept until master control acknowledges them. If ``False``, commands are written as plain lines and forgotten
+            max_in_flight (int): The most commands written but not yet acknowledged; later commands wait in the queue
+            ack_timeout (float): The number of seconds to wait for an acknowledgement before writing a command again
+            max_retries (int): The number of times a command is written again before it is given up on
+            on_queued (function): Called after a command is queued, e.g. to wake the thread that calls :meth:`pump`
+        """
+        self.write = write
+        self.acks = acks
+        self.max_in_flight = max_in_flight
+        self.ack_timeout = ack_timeout
+        self.max_retries = max_retries
+        self.on_queued = on_queued
+        self.queue = collections.deque()
+        self.in_flight = collections.OrderedDict()
+        self.next_seq = 1
+        self.queued = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.writes = 0
+        self.resent = 0
+        self.acked = 0
+        self.lost = 0
+        self.latency = metrics.Histogram()
+        self._lock = threading.Lock()
+        self._acked = threading.Condition(self._lock)
+
+    def send(self, command):
+        """
+        Queues a command to be written by the next :meth:`pump`, unless a queued command already does the same.
+
+        Args:
+            command (str): The command, e.g. ``"stop"``
+
+        Returns:
+            bool: ``True`` if the command was queued, ``False`` if it was coalesced with a queued command
+        """
+        with self._lock:
+            self.queued += 1
+            cancelled = cancelled_by.get(command, ())
+            group = command_groups.get(command)
+            kept = collections.deque()
+            duplicate = False
+            for entry in self.queue:
+                queued_command = entry[0]
+                if queued_command == command and not cancelled:
+                    duplicate = True
+                    kept.append(entry)
+                elif queued_command in cancelled or (group is not None and command_groups.get(queued_command) == group):
+                    self.coalesced += 1
+                elif queued_command == command:
+                    # A second stop is dropped, the one already queued is moved behind what it cancelled
+                    self.coalesced += 1
+                else:
+                    kept.append(entry)
+            self.queue = kept
+            # A cancelled command that is waiting for its acknowledgement must not be resent after the command that cancelled it
+            for seq in [seq for seq, entry in self.in_flight.iteritems() if entry[0] in cancelled]:
+                del self.in_flight[seq]
+                self.coalesced += 1
+            if duplicate:
+                self.coalesced += 1
+                return False
+            # Each entry is (command, sequence number, time queued, times written)
+            self.queue.append((command, None, time.time(), 0))
+        tracelog.debug("command_queued", command=command)
+        if self.on_queued:
+            self.on_queued()
+        return True
+
+    def pump(self):
+        """
+        Writes every queued command that fits in the window of unacknowledged commands in a single write, and queues again the commands whose acknowledgement is overdue.
+
+        Returns:
+            int: The number of commands written
+        """
+        lines = []
+        with self._lock:
+            if self.acks:
+                self._requeue_overdue()
+            now = time.time()
+            while self.queue and (not self.acks or len(self.in_flight) < self.max_in_flight):
+                command, seq, queued_at, attempts = self.queue.popleft()
+                if not self.acks:
+                    lines.append(command)
+                    self.sent += 1
+                    continue
+                if seq is None:
+                    seq = self.next_seq
+                    self.next_seq += 1
+                    self.sent += 1
+                else:
+                    self.resent += 1
+                # The command is in flight before it is written, since the acknowledgement can arrive before write returns
+                self.in_flight[seq] = (command, seq, queued_at, attempts + 1, now)
+                lines.append("%s %d" % (command, seq))
+            if lines:
+                self.writes += 1
+        if lines:
+            self.write("\n".join(lines) + "\n")
+        return len(lines)
+
+    def _requeue_overdue(self):
+        # Puts the commands that have waited too long for an acknowledgement back at the front of the queue, in their original order
+        now = time.time()
+        overdue = [entry for entry in self.in_flight.itervalues() if now - entry[4] >= self.ack_timeout]
+        for command, seq, queued_at, attempts, written_at in reversed(overdue):
+            del self.in_flight[seq]
+            if attempts > self.max_retries:
+                self.lost += 1
+                tracelog.warning("command_lost", command=command, seq=seq)
+            else:
+                self.queue.appendleft((command, seq, queued_at, attempts))
+
+    def on_line(self, line):
+        """
+        Handles a line received from master control. Acknowledgements are handled, every other line is ignored.
+
+        Args:
+            line (str): The line, e.g. ``"ack 12"``
+
+        Returns:
+            bool: ``True`` if the line acknowledged a command in flight
+        """
+        words = line.split()
+        if len(words) != 2 or words[0] != "ack" or not words[1].isdigit():
+            return False
+        with self._lock:
+            entry = self.in_flight.pop(int(words[1]), None)
+            if entry is None:
+                return False
+            self.acked += 1
+            self._acked.notify_all()
+        self.latency.observe(time.time() - entry[2])
+        return True
+
+    def next_deadline(self):
+        """
+        Finds when the next acknowledgement becomes overdue, so the caller knows when :meth:`pump` has to be called again even if nothing else happens.
+
+        Returns:
+            float: The time, from ``time.time()``, at which the oldest command in flight should be resent, ``None`` if no command is in flight
+        """
+        with self._lock:
+            if not self.in_flight:
+                return None
+            return min(entry[4] for entry in self.in_flight.itervalues()) + self.ack_timeout
+
+    def pending(self):
+        """
+        Counts the commands that have not been written yet or not acknowledged yet.
+
+        Returns:
+            int: The number of queued commands plus the number of commands in flight
+        """
+        with self._lock:
+            return len(self.queue) + len(self.in_flight)
+
+    def flush(self, timeout=None):
+        """
+        Writes every queued command and waits for all of them to be acknowledged, resending them as needed.
+
+        Args:
+            timeout (float): The longest time to wait in seconds, forever if left out
+
+        Returns:
+            bool: ``True`` if nothing is pending any more, ``False`` if the timeout passed first
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            self.pump()
+            with self._lock:
+                if not self.queue and not self.in_flight:
+                    return True
+                wait = self.ack_timeout
+                if deadline is not None:
+                    wait = min(wait, deadline - time.time())
+                    if wait <= 0:
+                        return False
+                if self.in_flight:
+                    self._acked.wait(wait)
+
+    def stats(self):
+        """
+        Summarizes the commands handled by the channel.
+
+        Returns:
+            dict: The counters of the channel, the number of commands still ``pending`` and the median and 95th percentile of :attr:`latency`
+        """
+        p50, p95 = self.latency.quantiles((0.5, 0.95))
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "coalesced": self.coalesced,
+                "sent": self.sent,
+                "writes": self.writes,
+                "resent": self.resent,
+                "acked": self.acked,
+                "lost": self.lost,
+                "pending": len(self.queue) + len(self.in_flight),
+                "latency_p50": p50,
+                "latency_p95": p95,
+            }
+
+class LocalMasterControl:
+    """ An in-process stand-in for LILI master control that receives the commands of a :class:`~interpreter.channel.CommandChannel` and acknowledges them.
+
+    Each received command takes ``delay`` seconds to carry out, one at a time on the stand-in's own thread, and is acknowledged when it is done. A command received again with a sequence number that was already carried out is only acknowledged again.
+
+    Attributes:
+        commands (list): The commands carried out, in order
+        lines (int): The number of lines received, including resent commands
+        duplicates (int): The number of resent commands that had already been carried out
+    """
+    def __init__(self, channel=None, delay=0.0, drop_acks=()):
+        """ Constructor for the :class:`~interpreter.channel.LocalMasterControl` class
+
+        Args:
+            channel (CommandChannel): The channel to send acknowledgements to, see :meth:`attach`
+            delay (float): The number of seconds each command takes to carry out
+            drop_acks (iterable): Sequence numbers whose first acknowledgement is not sent, to test resending
+        """
+        self.channel = channel
+        self.delay = delay
+        self.drop_acks = set(drop_acks)
+        self.commands = []
+        self.lines = 0
+        self.duplicates = 0
+        self.done = set()
+        self._inbox = collections.deque()
+        self._busy = False
+        self._closed = False
+        self._ready = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="lili-master-control")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def attach(self, channel):
+        """
+        Sets the channel that acknowledgements are sent to.
+
+        Args:
+            channel (CommandChannel): The channel
+        """
+        self.channel = channel
+
+    def write(self, data):
+        """
+        Receives data written by the channel, like the pipe to master control would.
+
+        Args:
+            data (str): One or more lines
+        """
+        with self._ready:
+            for line in data.splitlines():
+                if line.strip():
+                    self.lines += 1
+                    self._inbox.append(line.strip())
+            self._ready.notify()
+
+    def idle(self):
+        """
+        Checks if every received line has been handled.
+
+        Returns:
+            bool: ``True`` if there is nothing left to handle
+        """
+        with self._ready:
+            return not self._inbox and not self._busy
+
+    def close(self):
+        """
+        Stops handling lines once every line already received has been handled.
+        """
+        with self._ready:
+            self._closed = True
+            self._ready.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while not self._inbox and not self._closed:
+                    self._ready.wait(1.0)
+                if not self._inbox:
+                    return
+                line = self._inbox.popleft()
+                self._busy = True
+            words = line.split()
+            command = words[0]
+            seq = int(words[1]) if len(words) > 1 else None
+            if seq is None or seq not in self.done:
+                if self.delay:
+                    time.sleep(self.delay)
+                self.commands.append(command)
+                if seq is not None:
+                    self.done.add(seq)
+            else:
+                self.duplicates += 1
+            if seq is not None and self.channel is not None:
+                if seq in self.drop_acks:
+                    self.drop_acks.discard(seq)
+                else:
+                    self.channel.on_line("ack %d" % seq)
+            with self._ready:
+                self._busy = False
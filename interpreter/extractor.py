@@ -1,11 +1,15 @@
-from nltk.stem.snowball import SnowballStemmer
+import nlp
+import features
+import lexicon
+import tracelog
+import metrics
 import os
 
 def is_direction(word):
     """
     Checks if a ``word`` represents a direction.
 
-    The word is checked against a hard-coded list of directional words. If there is a match, then the ``word`` is determined to be a directional word. This function is present to provide a space to make this operation more robust in the future.
+    The word is checked against a hard-coded set of directional words, :data:`~interpreter.features.directional_words`. If there is a match, then the ``word`` is determined to be a directional word. This function is present to provide a space to make this operation more robust in the future.
 
     Args:
         word (str): The word to be checked
@@ -13,14 +17,7 @@ def is_direction(word):
     Returns:
         bool: ``True`` if the ``word`` represents a directional word, ``False`` if not
     """
-    # Words that can be interpreted as a direction - for use with the move and turn object extractors
-    directional_words = ["left", "right", "up", "down", "forward", "backward"]
-
-    for direction in directional_words:
-        if word.lower() == direction:
-            return True
-
-    return False
+    return word.lower() in features.directional_words
 
 
 
@@ -35,7 +32,7 @@ def is_noun(tag):
         bool: ``True`` if the tag represents a noun, ``False`` if not
     """
     # Considers personal pronouns as nouns as long as any type of tagged noun (proper noun, etc.)
-    return (tag == "PRP" or tag.startswith("NN"))
+    return bool(features.tag_features[features.tag_id(tag)] & features.NOUN)
 
 def is_preposition(tag):
     """
@@ -48,7 +45,7 @@ def is_preposition(tag):
         bool: ``True`` if the tag represents a preposition, ``False`` if not
     """
     # IN is the general preposition tag, but the word "to" has its own TO tag whenever it is being used as a preposition
-    return (tag == "TO" or tag == "IN")
+    return bool(features.tag_features[features.tag_id(tag)] & features.PREPOSITION)
 
 def object_dict_follow(sent):
     """
@@ -71,14 +68,15 @@ def object_dict_follow(sent):
         dict: An :ref:`object dictionary <object-dictionary>` for the command
     """
 
+    sent = features.encode(sent)
     object_dict = {}
-    for token in sent:
-        if is_noun(token[1]):
+    for word, bits in zip(sent.words, sent.bits):
+        if bits & features.NOUN:
             # The current length of object_dict shows how many other nouns have been extracted from the sentence
             if len(object_dict) == 0:
-                object_dict["person"] = token[0].lower()
+                object_dict["person"] = word
             elif len(object_dict) == 1:
-                object_dict["place"] = token[0].lower()
+                object_dict["place"] = word
 
     return object_dict
 
@@ -133,15 +131,16 @@ def object_dict_move(sent):
         dict: An :ref:`object dictionary <object-dictionary>` for the command
     """
 
+    sent = features.encode(sent)
     object_dict = {}
-    prep_found = False
+    direction = features.DIRECTION | features.DIRECTION_TAG
 
-    for token in sent:
-        # The directional words tend to be tagged as one of these four parts of speech
-        if (token[1] == "VBD" or token[1] == "NN" or token[1] == "IN" or token[1] == "RB") and (is_direction(token[0])):
-            object_dict["direction"] = token[0].lower()
-        elif is_noun(token[1]):
-            object_dict["place"] = token[0].lower()
+    for word, bits in zip(sent.words, sent.bits):
+        # The directional words tend to be tagged as one of four parts of speech, see features.DIRECTION_TAG
+        if bits & direction == direction:
+            object_dict["direction"] = word
+        elif bits & features.NOUN:
+            object_dict["place"] = word
 
     return object_dict
 
@@ -168,31 +167,31 @@ def object_dict_talk(sent):
         dict: An :ref:`object dictionary <object-dictionary>` for the command
     """
 
+    sent = features.encode(sent)
     object_dict = {}
     prep_found = False
     about_found = False
 
-    for token in sent:
+    for word, bits in zip(sent.words, sent.bits):
 
-        if token[0].lower() != "about" and is_preposition(token[1]):
-            prep_found = True
-        elif token[0].lower() == "about":
+        if bits & features.ABOUT:
             about_found = True
+        elif bits & features.PREPOSITION:
+            prep_found = True
 
-        if is_noun(token[1]):
+        if bits & features.NOUN:
             if prep_found and not about_found:
-                object_dict["person"] = token[0].lower()
+                object_dict["person"] = word
                 prep_found = False
             elif about_found and not prep_found:
-                object_dict["topic"] = token[0].lower()
+                object_dict["topic"] = word
                 about_found = False
             else:
-                obj_tag = "unknown"
-                object_dict["unknown"] = token[0].lower()
+                object_dict["unknown"] = word
 
     return object_dict
 
-def object_dict_show(sent):
+def object_dict_show(sent, shown_words=None):
     """
     Extracts objects out of a sentence that contains *show* as its :ref:`action <action>`
 
@@ -211,71 +210,59 @@ def object_dict_show(sent):
 
     Args:
         sent (list): A part of speech tagged list of tokens representing a sentence
+        shown_words (function): Returns the tuple ``(shown_actions_index, shown_objects_index)`` to resolve shown words with, defaults to :data:`current_shown_words`, the indexes of the interpreter's current snapshot
 
     Returns:
         dict: An :ref:`object dictionary <object-dictionary>` for the command
     """
 
+    sent = features.encode(sent)
     object_dict = {}
     prec_found = False
     to_found = False
 
-    for token in sent:
-        if token[1] == "TO":
+    for word, bits in zip(sent.words, sent.bits):
+        if bits & features.TO:
             to_found = True
-        elif token[1] == "DT":
+        elif bits & features.DT:
             prec_found = True
-        elif is_noun(token[1]):
+        elif bits & features.NOUN:
             if prec_found:
-                object_dict["object"] = token[0].lower()
+                object_dict["object"] = word
             else:
-                object_dict["person"] = token[0].lower()
-        elif token[1] ==  "VB":
+                object_dict["person"] = word
+        elif bits & features.VB:
             if to_found:
-                object_dict["show_action"] = token[0].lower()
+                object_dict["show_action"] = word
                 prec_found = True
 
-    # Create the stemmer to get root words if needed
-    stemmer = SnowballStemmer("english")
-    if "object" in object_dict:
-        search_res = binary_search_shown_words(object_dict["object"], known_shown_objects)
-        if search_res > -1:
-            object_dict["object"] = first_shown_objects[search_res]
-        else:
-            # If the object word wasn't found, try looking for its stem
-            stem = stemmer.stem(object_dict["object"])
-            search_res = binary_search_shown_words(stem, known_shown_objects)
-            if search_res > -1:
-                object_dict["object"] = first_shown_objects[search_res]
+    # Time spent resolving shown words is reported as a part of the extractor stage
+    started = metrics.start()
+    shown_actions_index, shown_objects_index = (shown_words or current_shown_words)()
 
+    if "object" in object_dict:
+        object_dict["object"] = resolve_shown_word(object_dict["object"], shown_objects_index)
 
     if "show_action" in object_dict:
-
-        search_res = binary_search_shown_words(object_dict["show_action"], known_shown_actions)
-        if search_res > -1:
-            object_dict["show_action"] = first_shown_actions[search_res]
-        else:
-            # If the show action word wasn't found, try looking for its stem
-            stem = stemmer.stem(object_dict["show_action"])
-            search_res = binary_search_shown_words(stem, known_shown_actions)
-            if search_res > -1:
-                object_dict["show_action"] = first_shown_actions[search_res]
+        object_dict["show_action"] = resolve_shown_word(object_dict["show_action"], shown_actions_index)
 
         video_title = object_dict["show_action"]
         if "object" in object_dict:
             video_title = video_title + "-" + object_dict["object"]
         object_dict["video_title"] = video_title.lower()
 
+    metrics.observe("extractor.show_resolution", started)
     return object_dict
 
 def object_dict_start(sent):
     """
     Specially crafted to start up story mode. Only extracts the first noun encountered as the object the start.
     """
+    sent = features.encode(sent)
     object_dict = {}
 
-    for token in sent:
-        if is_noun(token[1]) and not "object" in object_dict:
+    for token, bits in zip(sent.tokens, sent.bits):
+        if bits & features.NOUN and not "object" in object_dict:
             object_dict["object"] = token[0]
 
     return object_dict
@@ -303,31 +290,92 @@ def build_shown_words(filename):
                         # Add each known action and its action set index to the list to be returned
                         known_words.append((word, line_num))
                     line_num += 1
-                except AttributeError: # Occurs if getattr fails
-                    sys.stderr.write("Error: There is no object extraction function called " + func_name + "\n")
-                except StandardError as err: # Catches any other error
-                    sys.stderr.write(str(err) + "\n")
+                except StandardError as err: # Catches any error
+                    tracelog.error("shown_words_file_error", error=str(err), filename=filename)
 
     # Sorts the list of known actions by A-Z alphabetical order
     known_words = sorted(known_words, key=lambda tup: tup[0])
 
     return (known_words, first_words)
 
-def binary_search_shown_words(target, pool):
+def inflections(word):
+    """
+    Generates candidate inflected forms of a word with regular English suffix rules, such as *hands* and *washing*.
+
+    Not every candidate is a real word. :meth:`~interpreter.extractor.build_shown_index` only keeps those with the same stem as the word itself.
 
-    # If the search pool has been exhausted, the target is not in the pool
-    if (len(pool) == 0):
-        return -1
+    Args:
+        word (str): The word to inflect
 
-    # Gets middle index of the remaining pool
-    mid = len(pool)/2
+    Returns:
+        list: The candidate inflected forms
+    """
+    forms = [word + "s", word + "es", word + "ed", word + "d", word + "ing"]
+    if word.endswith("e"):
+        forms.append(word[:-1] + "ing")
+    if word.endswith("y"):
+        forms.extend([word[:-1] + "ies", word[:-1] + "ied"])
+    if len(word) > 2 and word[-1] not in "aeiouwxy":
+        # Doubled final consonant, e.g. "stop" to "stopped"
+        forms.extend([word + word[-1] + "ed", word + word[-1] + "ing"])
+    return forms
+
+def build_shown_index(filename):
+    """
+    Builds a normalized index of shown words, so that resolving a word to its set is a single hash lookup.
 
-    if target < pool[mid][0]: # Target must be in lower half of pool
-        return binary_search_shown_words(target, pool[:mid])
-    elif target > pool[mid][0]: # Target must be in higher half of pool
-        return binary_search_shown_words(target, pool[mid+1:])
-    else: # Match has been found
-        return pool[mid][1]
+    The index maps every word in the file to its set index. The stem of each word and every regular inflection of it that shares the same stem (its lemma is the word) are mapped to the same set index, so *hands* resolves to the set of *hand* without stemming at lookup time. When forms of different sets collide, words that appear in the file take priority over generated forms.
+
+    Args:
+        filename (str): The name of a file of known shown actions or objects in the format read by :meth:`~interpreter.extractor.build_shown_words`
+
+    Returns:
+        Lexicon: A :class:`~interpreter.lexicon.Lexicon` mapping each surface form, stem and inflection to its set index
+    """
+    known_words, first_words = build_shown_words(filename)
+    stemmer = nlp.stemmer()
+
+    # Words from the file first, so they are never shadowed by a generated form - the lexicon keeps the first set index of a word
+    forms = list(known_words)
+    for word, set_index in known_words:
+        stem = stemmer.stem(word)
+        forms.append((stem, set_index))
+        for form in inflections(word):
+            if stemmer.stem(form) == stem:
+                forms.append((form, set_index))
+
+    return lexicon.Lexicon(forms, first_words)
+
+def resolve_shown_word(word, shown_index):
+    """
+    Resolves a shown action or object to the first word of its set.
+
+    The word is looked up in an index built by :meth:`~interpreter.extractor.build_shown_index`. Only a word that is not in the index at all is stemmed, to try its stem as well.
+
+    Args:
+        word (str): The lowercase word to resolve
+        shown_index (Lexicon): An index as returned by :meth:`~interpreter.extractor.build_shown_index`
+
+    Returns:
+        str: The first word of the word's set, or the word itself if it is not known
+    """
+    set_index = shown_index.lookup(word)
+    if set_index < 0:
+        set_index = shown_index.lookup(nlp.stemmer().stem(word))
+        if set_index < 0:
+            return word
+    return shown_index.first_word(set_index)
+
+def load_shown_words():
+    """
+    Builds the indexes of known shown actions and objects from :data:`shown_actions_path` and :data:`objects_path`.
+
+    Registered with the :mod:`~interpreter.nlp` provider as ``"shown_words"``, so the indexes are built once, either on the first show command or during :meth:`~interpreter.nlp.warm_up`. When compiled lexicons are enabled (see :meth:`~interpreter.lexicon.load`), the indexes are only built by the first process and mapped by every other one.
+
+    Returns:
+        (Lexicon, Lexicon): The shown actions index and the shown objects index
+    """
+    return (lexicon.load(shown_actions_path, build_shown_index, "index"), lexicon.load(objects_path, build_shown_index, "index"))
 
 shown_actions_path = ""
 objects_path = ""
@@ -341,12 +389,8 @@ elif "source" in os.listdir("."): # If this is true, code is being run by make i
 shown_actions_path = shown_actions_path + "input_files/known_words/known_shown_actions_small.txt"
 objects_path = objects_path + "input_files/known_words/shown_objects_small.txt"
 
-# Builds synonym lists that are utilized when resolving shown actions and objects to words that are already known by LILI
-shown_action_res = build_shown_words(shown_actions_path)
-shown_object_res = build_shown_words(objects_path)
-
-known_shown_actions = sorted(shown_action_res[0], key=lambda tup: tup[0])
-first_shown_actions = shown_action_res[1]
+# The indexes used when resolving shown actions and objects to words that are already known by LILI need the stemmer, so they are built on first use
+nlp.loaders["shown_words"] = load_shown_words
 
-known_shown_objects = sorted(shown_object_res[0], key=lambda tup: tup[0])
-first_shown_objects = shown_object_res[1]
\ No newline at end of file
+# Returns the shown word indexes object_dict_show uses when it is not given any; the interpreter replaces it with the shown words of each snapshot it installs, so a reload is seen here too
+current_shown_words = lambda: nlp.get("shown_words")
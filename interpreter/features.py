@@ -0,0 +1,172 @@
+"""
+Encodes a part of speech tagged sentence once into integer ids and feature bits for the object extractors.
+
+Every extractor used to check each token's tag with string comparisons (``is_noun``, ``is_preposition``) and its word against a list of directions. Instead, each tag and each word that has a feature is given an integer id with a precomputed set of feature bits, and an ``object_dict_`` function encodes its sentence into arrays of ids and bits once before reading it. It then tests features with a bitwise and, e.g. ``sent.bits[i] & features.NOUN``.
+
+The extractors compiled from rules (see :mod:`~interpreter.rules`) do not use encoded sentences: they keep a table of the result for every tagged word they have seen, so encoding a sentence for them would only add to its cost. The interpreter therefore leaves encoding to the ``object_dict_`` functions.
+"""
+import threading
+from array import array
+
+# Feature bits of a token
+NOUN = 1 # The tag is PRP or starts with NN, see extractor.is_noun
+PREPOSITION = 2 # The tag is TO or IN, see extractor.is_preposition
+DIRECTION = 4 # The word is a direction, see extractor.is_direction
+DIRECTION_TAG = 8 # The tag is one of the tags that directional words tend to be tagged as
+TO = 16 # The tag is TO
+DT = 32 # The tag is DT
+VB = 64 # The tag is VB
+ABOUT = 128 # The word is "about"
+
+# Words that can be interpreted as a direction - for use with the move and turn object extractors
+directional_words = frozenset(["left", "right", "up", "down", "forward", "backward"])
+
+# The Penn Treebank tags, which get the first tag ids so the ids are the same in every process
+penn_tags = ["CC", "CD", "DT", "EX", "FW", "IN", "JJ", "JJR", "JJS", "LS", "MD", "NN", "NNS", "NNP", "NNPS", "PDT", "POS",
+             "PRP", "PRP$", "RB", "RBR", "RBS", "RP", "SYM", "TO", "UH", "VB", "VBD", "VBG", "VBN", "VBP", "VBZ", "WDT", "WP",
+             "WP$", "WRB", "$", "#", "``", "''", "(", ")", ",", ".", ":", "-NONE-"]
+
+def classify_tag(tag):
+    """
+    Computes the feature bits of a part of speech tag.
+
+    Args:
+        tag (str): The tag
+
+    Returns:
+        int: The tag's feature bits
+    """
+    bits = 0
+    if tag == "PRP" or tag.startswith("NN"):
+        bits |= NOUN
+    # IN is the general preposition tag, but the word "to" has its own TO tag whenever it is being used as a preposition
+    if tag == "TO" or tag == "IN":
+        bits |= PREPOSITION
+    if tag in ("VBD", "NN", "IN", "RB"):
+        bits |= DIRECTION_TAG
+    if tag == "TO":
+        bits |= TO
+    if tag == "DT":
+        bits |= DT
+    if tag == "VB":
+        bits |= VB
+    return bits
+
+# The id of each tag and the feature bits of each tag id
+tag_ids = {}
+tag_features = array("H")
+_tag_lock = threading.Lock()
+
+def tag_id(tag):
+    """
+    Gets the id of a part of speech tag. A tag that has not been seen before is given the next free id.
+
+    Args:
+        tag (str): The tag
+
+    Returns:
+        int: The tag's id
+    """
+    try:
+        return tag_ids[tag]
+    except KeyError:
+        with _tag_lock:
+            if tag not in tag_ids:
+                # The features are added before the id, so an id is never used before its features exist
+                tag_features.append(classify_tag(tag))
+                tag_ids[tag] = len(tag_features) - 1
+            return tag_ids[tag]
+
+for tag in penn_tags:
+    tag_id(tag)
+
+# Only words with features have an id, every other word has id 0
+word_ids = {}
+word_features = array("H", [0])
+
+def add_word(word, bits):
+    # Gives a word the next free id with the given feature bits
+    word_features.append(bits)
+    word_ids[word] = len(word_features) - 1
+
+for word in sorted(directional_words):
+    add_word(word, DIRECTION)
+add_word("about", ABOUT)
+
+def token_bits(word, tag):
+    """
+    Computes the feature bits of a single tagged word.
+
+    Args:
+        word (str): The lowercase word
+        tag (str): Its part of speech tag
+
+    Returns:
+        int: The feature bits of the word and its tag
+    """
+    return tag_features[tag_id(tag)] | word_features[word_ids.get(word, 0)]
+
+class EncodedSentence:
+    """ A part of speech tagged sentence along with the ids and feature bits of its tokens.
+
+    An encoded sentence can be used anywhere a list of ``(token, tag)`` tuples is expected: iterating over it or indexing it gives the tuples, and slicing it gives an encoded sentence of the slice without encoding it again.
+
+    Attributes:
+        tokens (list): The tuples ``(token, tag)``
+        words (list): The lowercase word of each token
+        tag_ids (array.array): The tag id of each token
+        word_ids (array.array): The word id of each token, 0 for words without features
+        bits (array.array): The feature bits of each token
+    """
+    def __init__(self, tagged_sent, encoded=None):
+        """ Constructor for the :class:`~interpreter.features.EncodedSentence` class
+
+        Args:
+            tagged_sent (list): A part of speech tagged list of tokens
+            encoded (tuple): The ``(words, tag_ids, word_ids, bits)`` of ``tagged_sent`` if they are already known
+        """
+        self.tokens = tagged_sent if isinstance(tagged_sent, list) else list(tagged_sent)
+        if encoded is None:
+            words = [token[0].lower() for token in self.tokens]
+            ids = array("H", [tag_id(token[1]) for token in self.tokens])
+            wids = array("H", [word_ids.get(word, 0) for word in words])
+            encoded = (words, ids, wids, array("H", [tag_features[i] | word_features[w] for i, w in zip(ids, wids)]))
+        self.words, self.tag_ids, self.word_ids, self.bits = encoded
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return EncodedSentence(self.tokens[index], (self.words[index], self.tag_ids[index], self.word_ids[index], self.bits[index]))
+        return self.tokens[index]
+
+    def __getslice__(self, start, end):
+        # Python 2 calls __getslice__ for simple slices such as sent[2:]
+        return self.__getitem__(slice(start, end))
+
+    def __eq__(self, other):
+        return list(self.tokens) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(self.tokens)
+
+def encode(tagged_sent):
+    """
+    Encodes a part of speech tagged sentence, unless it is already encoded.
+
+    Args:
+        tagged_sent (list): A part of speech tagged list of tokens, or an :class:`~interpreter.features.EncodedSentence`
+
+    Returns:
+        EncodedSentence: The encoded sentence
+    """
+    if isinstance(tagged_sent, EncodedSentence):
+        return tagged_sent
+    return EncodedSentence(tagged_sent)
@@ -0,0 +1,133 @@
+import interpreter
+import metrics
+import tracelog
+
+class IncrementalInterpreter:
+    """ Interprets a command word by word while it is still being spoken, for use with a streaming recognizer.
+
+    :meth:`~interpreter.interpreter.interpret_sent` can only start once the whole utterance has been recognized. Instead, each token is given to :meth:`feed` as soon as the recognizer produces it, and the growing prefix of the command is searched for its :ref:`action <action>` right away. Commands whose action needs no objects, such as *stop*, are dispatched as soon as the action is heard, without waiting for the end of the utterance. When the utterance ends, :meth:`finish` extracts the objects from the whole command and returns the same result as :meth:`~interpreter.interpreter.interpret_sent`.
+
+    Example::
+
+        inc = IncrementalInterpreter(on_dispatch=process_result)
+        for token in recognizer_tokens():
+            inc.feed(token)
+        res = inc.finish()
+        if not inc.dispatched:
+            process_result(res)
+
+    Attributes:
+        tokens (list): The tokens fed so far
+        action_tuple (int, int): The action's set index and position, as returned by :meth:`~interpreter.interpreter.extract_action`, or ``None`` until the action is found
+        dispatched (dict): The result dispatched early, ``None`` if the command was not dispatched early
+    """
+    def __init__(self, early_actions=("stop", "turn"), on_dispatch=None, snapshot=None):
+        """ Constructor for the :class:`~interpreter.incremental.IncrementalInterpreter` class
+
+        Args:
+            early_actions (tuple): The first actions of the action sets that are dispatched as soon as they are heard
+            on_dispatch (function): Called with the result of a command that is dispatched early
+            snapshot (LexiconSnapshot): The tables to interpret the command with, defaults to the current snapshot when the first token is fed
+        """
+        self.early_actions = frozenset(early_actions)
+        self.on_dispatch = on_dispatch
+        self.initial_snapshot = snapshot
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets the current command, so the next token starts a new one.
+        """
+        self.snapshot = self.initial_snapshot
+        self.tokens = []
+        self.action_tuple = None
+        self.dispatched = None
+        self.started = None
+
+    def feed(self, token):
+        """
+        Adds the next token of the command.
+
+        Only the new token is looked up, since every earlier token of the prefix has already been checked, so this gives the same action as :meth:`~interpreter.interpreter.extract_action` on the whole prefix.
+
+        Args:
+            token (str): The next token, e.g. a word from a streaming recognizer
+
+        Returns:
+            dict: The result of the command if this token caused it to be dispatched early, ``None`` if not
+        """
+        if not self.tokens:
+            # The whole command is interpreted with the snapshot that was current when it started
+            self.snapshot = self.snapshot or interpreter.current_snapshot()
+            self.started = metrics.start()
+            self.dispatched = None
+        self.tokens.append(token)
+        if self.action_tuple is not None:
+            return None
+
+        set_index = self.snapshot.known_actions.lookup(token.lower())
+        if set_index < 0:
+            return None
+        self.action_tuple = (set_index, len(self.tokens) - 1)
+        tracelog.debug("incremental_action", action_tuple=self.action_tuple)
+
+        if self.snapshot.first_actions[set_index] not in self.early_actions:
+            return None
+        self.dispatched = interpreter.generate_json(set_index, {}, self.snapshot.first_actions)
+        metrics.observe("early_dispatch", self.started)
+        tracelog.info("early_dispatch", action=self.dispatched["action"], tokens=len(self.tokens))
+        if self.on_dispatch:
+            self.on_dispatch(self.dispatched)
+        return self.dispatched
+
+    def feed_text(self, text):
+        """
+        Tokenizes a piece of a transcript and feeds each of its tokens, for recognizers that produce several words at a time.
+
+        Args:
+            text (str): The new piece of the transcript
+
+        Returns:
+            dict: The result of the command if it was dispatched early while feeding this text, ``None`` if not
+        """
+        res = None
+        for token in interpreter.preprocess_text(text):
+            res = self.feed(token) or res
+        return res
+
+    def finish(self):
+        """
+        Ends the command and extracts its objects from the whole utterance, then gets ready for the next command.
+
+        Returns:
+            dict: The object dictionary of the command, including its action, or a dictionary with an ``"error"`` entry, the same as :meth:`~interpreter.interpreter.interpret_sent`. For a command that was dispatched early, this includes the objects that were spoken after the action
+        """
+        try:
+            if self.action_tuple is None:
+                return {"error": "Main action not found"}
+            object_dict = interpreter.generate_object_dict(self.tokens, self.action_tuple, self.snapshot.object_extractor_functions)
+            res = interpreter.generate_json(self.action_tuple[0], object_dict, self.snapshot.first_actions)
+            metrics.observe("interpret", self.started)
+            return res
+        finally:
+            dispatched = self.dispatched
+            self.reset()
+            # Kept until the next command starts, so the caller can tell if the result was already acted on
+            self.dispatched = dispatched
+
+def interpret_stream(tokens, early_actions=("stop", "turn"), on_dispatch=None):
+    """
+    Interprets a command from an iterable of tokens, dispatching it early if its action needs no objects.
+
+    Args:
+        tokens (iterable): The tokens of the command, in the order they are spoken
+        early_actions (tuple): The first actions of the action sets that are dispatched as soon as they are heard
+        on_dispatch (function): Called with the result of a command that is dispatched early
+
+    Returns:
+        dict: The result of :meth:`IncrementalInterpreter.finish`
+    """
+    inc = IncrementalInterpreter(early_actions, on_dispatch)
+    for token in tokens:
+        inc.feed(token)
+    return inc.finish()
@@ -1,6 +1,12 @@
-import nltk
+import functools
+import inspect
 import json
 import extractor
+import rules
+import nlp
+import lexicon
+import tracelog
+import metrics
 import sys
 import os
 
@@ -20,15 +26,15 @@ def preprocess_text(text):
     Note:
         Do not do any part of speech tagging in this function. It is a compute-intensive task and may not be needed for all commands (i.e. erroneous situations).
     """
-    res = nltk.word_tokenize(text)
-    sys.stderr.write(str(res) + "\n")
+    res = nlp.tokenize(text)
+    tracelog.debug("tokenized", tokens=res)
     return res
 
 def extract_action(sent, known_actions):
     """
     Finds the :ref:`action <action>` that LILI can respond to, given a tokenized command sentence and a list of known actions.
 
-    The action is most likely one of the first couple of words of the command, so the sentence is processed from first word to last word. Each word in the sentence is searched for in the given list of known actions. The first word that is found in the known actions array is determined to be the action, and processing ends. A binary search algorithm is used to search for the word to keep processing time short even with large lists of known actions.
+    The action is most likely one of the first couple of words of the command, so the sentence is processed from first word to last word. Each word in the sentence is searched for in the given list of known actions. The first word that is found in the known actions is determined to be the action, and processing ends. The known actions are a :class:`~interpreter.lexicon.Lexicon`, so each word is found with a single hash lookup even with large lists of known actions.
 
     A tuple that contains two values is returned:
 
@@ -37,7 +43,7 @@ def extract_action(sent, known_actions):
 
     Args:
         sent (list): A list containing the tokenized sentence
-        known_actions (list): A list of tuples ``(str, int)``, each containing the string of a known action and its action set index
+        known_actions (Lexicon): A :class:`~interpreter.lexicon.Lexicon` of known actions and their action set indices
 
     Returns:
         (int, int): A tuple that contains the action's set index and position in the command sentence
@@ -48,43 +54,13 @@ def extract_action(sent, known_actions):
     token_index = 0
     for token in sent:
         token = token.lower()
-        search_res = binary_search_actions(token, known_actions)
+        search_res = known_actions.lookup(token)
         if search_res > -1:
             return (search_res, token_index)
         token_index += 1
     # If no main action is found, return (-1,0)
     return (-1, 0)
 
-def binary_search_actions(target, pool):
-    """
-    Binary search to find a ``target`` word in a ``pool`` of possibilities.
-
-    This binary search is used to find a target word with fast performance even with a large search pool. It is implemented recursively to provide a simpler implementation. It assumes that the known actions list is sorted in descending (A to Z) order.
-
-    Args:
-        target (str): The word to search for
-        pool (list): A list of tuples ``(str, int)``, each containing the string of a known :ref:`action <action>` and its :ref:`action set index <action-set-index>`
-
-    Return:
-        int: The action set index of the ``target`` word if it is found in the ``pool``
-
-           * Returns -1 if no match is found
-    """
-
-    # If the search pool has been exhausted, the target is not in the pool
-    if (len(pool) == 0):
-        return -1
-
-    # Gets middle index of the remaining pool
-    mid = len(pool)/2
-
-    if target < pool[mid][0]: # Target must be in lower half of pool
-        return binary_search_actions(target, pool[:mid])
-    elif target > pool[mid][0]: # Target must be in higher half of pool
-        return binary_search_actions(target, pool[mid+1:])
-    else: # Match has been found
-        return pool[mid][1]
-
 def generate_object_dict(sent, action_tuple, object_extractor_functions):
     """
     Creates an :ref:`object dictionary <object-dictionary>` according to the provided :ref:`action <action>`.
@@ -105,11 +81,13 @@ def generate_object_dict(sent, action_tuple, object_extractor_functions):
     """
 
     # Tag the sentence with parts of speech
-    tagged_sent = nltk.pos_tag(sent)
+    started = metrics.start()
+    tagged_sent = nlp.pos_tag(sent)
+    started = metrics.observe("pos_tag", started)
 
+    # The sentence is not encoded here: the compiled rules keep a table of every tagged word they have seen and do not use the encoding, and the object_dict_ functions encode their own sentence
     # Output for debugging
-    sys.stderr.write("Tagged sentence:\n")
-    sys.stderr.write(str(tagged_sent) + "\n")
+    tracelog.debug("tagged", tagged=tagged_sent)
 
     # Remove the main action from the sentence - it does not need to be considered when extracting objects
     # Gets rid of the action and everything behind it as well
@@ -117,15 +95,15 @@ def generate_object_dict(sent, action_tuple, object_extractor_functions):
     tagged_sent = tagged_sent[action_tuple[1]+1:]
 
     # Output for debugging
-    sys.stderr.write("Trimmed sentence:\n")
-    sys.stderr.write(str(tagged_sent) + "\n")
+    tracelog.debug("trimmed", tagged=tagged_sent)
 
     # Call the main action's corresponding function extractor
     object_dict = object_extractor_functions[action_tuple[0]](tagged_sent)
+    metrics.observe("extractor", started)
 
     return object_dict
 
-def generate_json(action, object_dict):
+def generate_json(action, object_dict, first_actions=None):
     """
     Returns a JSON string representation of an :ref:`object dictionary <object-dictionary>` with an entry for the action's :ref:`set index <action-set-index>`
 
@@ -134,41 +112,35 @@ def generate_json(action, object_dict):
     Args:
         action (int): The set index of the action
         object_dict (dict): The object dictionary to be converted to a JSON string
+        first_actions (list): The first action of each action set, defaults to the list of the current :class:`~interpreter.interpreter.LexiconSnapshot`
 
     Returns:
         str: A JSON string representation of the object dictionary and the action set index
     """
 
+    if first_actions is None:
+        first_actions = current_snapshot().first_actions
     result = object_dict
     result["action"] = first_actions[action]
     return result
     #return json.dumps(result)
 
-def build_action_structures(filename):
+def build_action_lexicon(filename, extractor_rules=None):
     """
-    MUST UPDATE FOR CREATING THE LIST OF FIRST ACTIONS
-    Given a filename that contains a list of known :ref:`actions <action>`, generates the data structures needed to interpret commands.
+    Reads a file of known :ref:`actions <action>` into a :class:`~interpreter.lexicon.Lexicon`.
 
-    Opens a file of known actions, where each action set is represented on one line (see :ref:`this part of the interpreter demo <initial-setup>` for details on the input file). For each word in this file, a tuple *(str, int)* is generated that contains that word along with its :ref:`action set index <action-set-index>`. This tuple is then appended to the list of known actions. This list is sorted by A-Z order before it is returned to prepare it for binary search operations.
-
-    A list of :ref:`object extractor functions <object-extractor-function>` is created to correspond to the action set indices be called later on. For each line, another function is added to the extractor function list. To determine the name of the extractor function to be added next, the first word in the action set is appended to the end of the string ``"object_dict\_"``. Once the function name string is built, the function is retreived from the extractor module and is appended to the extractor function list.
+    Each action set is represented on one line (see :ref:`this part of the interpreter demo <initial-setup>` for details on the input file). For each word in this file, a tuple *(str, int)* is generated that contains that word along with its :ref:`action set index <action-set-index>`. These tuples are then stored in a compact lexicon of known actions, which is used to look up words in a command. An action set is skipped if it has neither rules nor an :ref:`object extractor function <object-extractor-function>` in the extractor module, see :meth:`~interpreter.interpreter.build_action_structures`.
 
     Args:
         filename (str): The name of the file that contains the list of known actions
+        extractor_rules (dict): The compiled extractor rules of each action, see :meth:`~interpreter.rules.load`
 
     Returns:
-        (list, list): A tuple ``(known_actions, object_extractor_functions)`` containing:
-
-           1. ``known_actions`` - The list of tuples each containing a known action and its set index
-           2. ``object_extractor_functions`` - The list of object extractor functions whose list indices correspond with the appropriate action set indices
-
-    Note:
-        This function only needs to run when the input file is updated. It should not be run every time a new command needs to be interpreted.
+        Lexicon: The lexicon of known actions and their set indices, whose first words are the first action of each action set
     """
 
     # Initializing data structures
     known_actions = []
-    object_dict_functions = []
     first_actions = []
     line_num = 0
 
@@ -184,8 +156,9 @@ def build_action_structures(filename):
             if len(actions) > 0:
                 func_name = "object_dict_" + actions[0]
                 try:
-                    # Gets the corresponding object extractor function from the extractor module and adds it to the list to be returned
-                    object_dict_functions.append(getattr(extractor, func_name))
+                    # Makes sure the action set has rules or the corresponding object extractor function exists in the extractor module
+                    if actions[0] not in (extractor_rules or {}):
+                        getattr(extractor, func_name)
                     first_actions.append(actions[0])
                     for action in actions:
                         action = action.strip()
@@ -193,37 +166,182 @@ def build_action_structures(filename):
                         known_actions.append((action, line_num))
                     line_num += 1
                 except AttributeError: # Occurs if getattr fails
-                    sys.stderr.write("Error: There is no object extraction function called " + func_name + "\n")
+                    tracelog.error("missing_extractor", function=func_name, filename=filename)
                 except StandardError as err: # Catches any other error
-                    sys.stderr.write(str(err) + "\n")
+                    tracelog.error("action_file_error", error=str(err), filename=filename)
 
-    # Sorts the list of known actions by A-Z alphabetical order
-    known_actions = sorted(known_actions, key=lambda tup: tup[0])
+    # Packs the known actions into a compact lexicon for fast lookups
+    return lexicon.Lexicon(known_actions, first_actions)
+
+def build_action_structures(filename, extractor_rules=None):
+    """
+    Given a filename that contains a list of known :ref:`actions <action>`, generates the data structures needed to interpret commands.
+
+    The :class:`~interpreter.lexicon.Lexicon` of known actions is built by :meth:`~interpreter.interpreter.build_action_lexicon`, or mapped from a compiled copy when one is available (see :meth:`~interpreter.lexicon.load`), so that several interpreter processes share a single copy of a large lexicon.
+
+    A list of :ref:`object extractor functions <object-extractor-function>` is created to correspond to the action set indices be called later on. For each action set, another function is added to the extractor function list. If the rules have a section for the first word in the action set, its compiled :class:`~interpreter.rules.RuleExtractor` is added. Otherwise, to determine the name of the extractor function to be added next, the first word in the action set is appended to the end of the string ``"object_dict\_"``. Once the function name string is built, the function is retreived from the extractor module and is appended to the extractor function list.
+
+    Args:
+        filename (str): The name of the file that contains the list of known actions
+        extractor_rules (dict): The compiled extractor rules of each action, see :meth:`~interpreter.rules.load`
+
+    Returns:
+        (Lexicon, list, list): A tuple ``(known_actions, object_extractor_functions, first_actions)`` containing:
+
+           1. ``known_actions`` - The :class:`~interpreter.lexicon.Lexicon` of known actions and their set indices
+           2. ``object_extractor_functions`` - The list of object extractor functions whose list indices correspond with the appropriate action set indices
+           3. ``first_actions`` - The list of the first action of each action set, indexed by set index
+
+    Note:
+        This function only needs to run when the input file is updated. It should not be run every time a new command needs to be interpreted.
+    """
+    extractor_rules = extractor_rules or {}
+    # Which action sets are kept depends on which actions have rules, so a compiled lexicon is only reused with the same ones
+    known_actions = lexicon.load(filename, functools.partial(build_action_lexicon, extractor_rules=extractor_rules), "actions", key=",".join(sorted(extractor_rules)))
+    first_actions = list(known_actions.first_words)
+    # Gets the compiled rules of each action set, or the corresponding object extractor function from the extractor module
+    object_dict_functions = [extractor_rules.get(action) or getattr(extractor, "object_dict_" + action) for action in first_actions]
 
     return (known_actions, object_dict_functions, first_actions)
 
-def interpret_sent(sent_text):
+class LexiconSnapshot:
+    """ An immutable version of every table that is needed to interpret a command.
+
+    A command is interpreted entirely with the snapshot that was current when it started, so replacing the current snapshot (see :meth:`~interpreter.interpreter.install_snapshot` and the :mod:`~interpreter.reloader` module) never affects a command that is already being interpreted.
+
+    Attributes:
+        known_actions (Lexicon): The lexicon of known actions
+        object_extractor_functions (tuple): The object extractor functions, indexed by action set index. Extractors that resolve shown words are bound to this snapshot's shown words
+        first_actions (tuple): The first action of each action set, indexed by action set index
+        shown_words (function): Returns the tuple ``(shown_actions_index, shown_objects_index)`` of this snapshot, see :meth:`~interpreter.extractor.build_shown_index`
+        sources (tuple): A tuple ``(filename, signature)`` for each file the snapshot was built from, see :meth:`~interpreter.interpreter.file_signature`
+        version (int): Counts up each time a new snapshot is built by the reloader
+    """
+    def __init__(self, known_actions, object_extractor_functions, first_actions, shown_words, sources=(), version=0):
+        """ Constructor for the :class:`~interpreter.interpreter.LexiconSnapshot` class. See the class's documentation for details on each parameter
+        """
+        self.known_actions = known_actions
+        self.first_actions = tuple(first_actions)
+        self.shown_words = shown_words
+        self.sources = tuple(sources)
+        self.version = version
+        self.object_extractor_functions = tuple(bind_shown_words(func, shown_words) for func in object_extractor_functions)
+
+def bind_shown_words(func, shown_words):
+    """
+    Binds an object extractor function that resolves shown words (one with a ``shown_words`` argument, such as :meth:`~interpreter.extractor.object_dict_show`) to a snapshot's shown words.
+
+    Args:
+        func (function): The object extractor function
+        shown_words (function): The snapshot's shown words function
+
+    Returns:
+        function: The bound function, or ``func`` itself if it does not resolve shown words
+    """
+    try:
+        if "shown_words" in inspect.getargspec(func).args:
+            return functools.partial(func, shown_words=shown_words)
+    except TypeError: # Not a plain Python function
+        pass
+    return func
+
+def file_signature(filename):
+    """
+    Gets the modification time and size of a file, which change whenever the file is edited.
+
+    Args:
+        filename (str): The name of the file
+
+    Returns:
+        (float, int): The modification time and size of the file, ``None`` if it does not exist
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (stat.st_mtime, stat.st_size)
+
+def build_snapshot(actions_filename, shown_actions_filename, objects_filename, rules_filename=None, version=0):
+    """
+    Builds a complete :class:`~interpreter.interpreter.LexiconSnapshot` from the known word files and the extractor rules, including the shown word indexes.
+
+    Args:
+        actions_filename (str): The file of known actions
+        shown_actions_filename (str): The file of known shown actions
+        objects_filename (str): The file of known shown objects
+        rules_filename (str): The file of extractor rules, defaults to :data:`~interpreter.rules.rules_path`
+        version (int): The version number of the snapshot
+
+    Returns:
+        LexiconSnapshot: The new snapshot
+    """
+    rules_filename = rules_filename or rules.rules_path
+    filenames = (actions_filename, shown_actions_filename, objects_filename, rules_filename)
+    # The signatures are taken before reading, so a file that changes while it is read is noticed again
+    sources = [(filename, file_signature(filename)) for filename in filenames]
+    known_actions, object_dict_functions, first_actions = build_action_structures(actions_filename, rules.load(rules_filename))
+    shown = (lexicon.load(shown_actions_filename, extractor.build_shown_index, "index"), lexicon.load(objects_filename, extractor.build_shown_index, "index"))
+    return LexiconSnapshot(known_actions, object_dict_functions, first_actions, lambda: shown, sources, version)
+
+def current_snapshot():
+    """
+    Gets the snapshot that new commands are interpreted with.
+
+    Returns:
+        LexiconSnapshot: The current snapshot
+    """
+    return _snapshot
+
+def install_snapshot(snapshot):
+    """
+    Makes a snapshot the current one. Replacing the reference is atomic, so commands that already started keep the snapshot they started with.
+
+    The module level ``known_actions``, ``object_extractor_functions`` and ``first_actions`` are updated as well for code that still reads them, and :meth:`~interpreter.extractor.object_dict_show` resolves shown words with the snapshot's indexes when it is called without any.
+
+    Args:
+        snapshot (LexiconSnapshot): The new current snapshot
+    """
+    global _snapshot, known_actions, object_extractor_functions, first_actions
+    _snapshot = snapshot
+    known_actions = snapshot.known_actions
+    object_extractor_functions = list(snapshot.object_extractor_functions)
+    first_actions = list(snapshot.first_actions)
+    extractor.current_shown_words = snapshot.shown_words
+
+def interpret_sent(sent_text, snapshot=None):
     """
     Implements the order of execution (pipeline) of interpreting a sentence - utilized for checking test cases
+
+    Args:
+        sent_text (str): The command sentence
+        snapshot (LexiconSnapshot): The tables to interpret the command with, defaults to the current snapshot
+
+    Returns:
+        dict: The object dictionary of the command, including its action, or a dictionary with an ``"error"`` entry
     """
-    sys.stderr.write("Preprocessing this sentence:\n")
-    sys.stderr.write(sent_text + "\n")
+    # The snapshot is read once, so the whole command sees one consistent version of the tables
+    if snapshot is None:
+        snapshot = _snapshot
+    tracelog.debug("preprocessing", text=sent_text)
+    # Each stage is timed when metrics are enabled, see the metrics module
+    sent_started = metrics.start()
     sent = preprocess_text(sent_text)
-    sys.stderr.write("Tokenized:\n")
-    sys.stderr.write(str(sent) + "\n")
-    action_tuple = extract_action(sent, known_actions)
+    started = metrics.observe("tokenize", sent_started)
+    action_tuple = extract_action(sent, snapshot.known_actions)
+    metrics.observe("extract_action", started)
 
     # If this occurred, the action was not recognized
     if action_tuple[0] < 0:
         error_dict = {"error":"Main action not found"}
+        metrics.observe("interpret", sent_started)
         #return json.dumps(error_dict)
         return error_dict
 
-    sys.stderr.write("Action Tuple:\n")
-    sys.stderr.write(str(action_tuple) + "\n")
-    object_dict = generate_object_dict(sent, action_tuple, object_extractor_functions)
-    return generate_json(action_tuple[0], object_dict)
-    sys.stderr.write("\n")
+    tracelog.debug("action", action_tuple=action_tuple)
+    object_dict = generate_object_dict(sent, action_tuple, snapshot.object_extractor_functions)
+    res = generate_json(action_tuple[0], object_dict, snapshot.first_actions)
+    metrics.observe("interpret", sent_started)
+    return res
 
 actions_path = ""
 if "lili-interpreter" in os.listdir("."):
@@ -234,7 +352,7 @@ elif "source" in os.listdir("."): # If this is true, code is being run by make i
 actions_path = actions_path + "input_files/known_words/known_actions_small.txt"
 
 # When imported, this module builds the structures needed to interpret commands
-res = build_action_structures(actions_path)
-known_actions = res[0]
-object_extractor_functions = res[1]
-first_actions = res[2]
\ No newline at end of file
+res = build_action_structures(actions_path, rules.load(rules.rules_path))
+# The shown word indexes of the first snapshot are built on first use, see extractor.load_shown_words
+sources = [(filename, file_signature(filename)) for filename in (actions_path, extractor.shown_actions_path, extractor.objects_path, rules.rules_path)]
+install_snapshot(LexiconSnapshot(res[0], res[1], res[2], lambda: nlp.get("shown_words"), sources))
\ No newline at end of file
@@ -0,0 +1,363 @@
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+# Compiled lexicon files start with this header, see write_compiled
+magic = "LILILEX1"
+format_version = 2
+header_format = "<8sIIIIdQI"
+header_size = struct.calcsize(header_format)
+
+# Set indices are stored as unsigned 16-bit numbers
+max_sets = 1 << 16
+
+def encode(word):
+    """
+    Gets the bytes a word is stored as in a lexicon. Unicode words are stored as UTF-8, the encoding of the known words files, so a word looks up the same whether it is given as ``str`` or ``unicode``.
+
+    Args:
+        word (str): The word, either ``str`` or ``unicode``
+
+    Returns:
+        str: The word's bytes
+    """
+    if isinstance(word, unicode):
+        return word.encode("utf-8")
+    return word
+
+def word_hash(word):
+    """
+    Hashes a word for the lexicon's hash table.
+
+    CRC-32 is used instead of the built-in ``hash`` because it is the same in every process and on every platform, so a compiled lexicon can be shared between processes.
+
+    Args:
+        word (str): The word to hash, either ``str`` or ``unicode``
+
+    Returns:
+        int: An unsigned 32-bit hash of the word
+    """
+    return zlib.crc32(encode(word)) & 0xffffffff
+
+class Lexicon:
+    """ A compact, read-only mapping from known words to their set indices.
+
+    A lexicon replaces the sorted lists of ``(str, int)`` tuples that used to hold every known action and shown word. All words are stored once in a single string buffer. The position of each word in the buffer, the set index of each word, and an open addressing hash table over the words are kept in typed arrays, so a lexicon holds a handful of Python objects no matter how many words it contains. Looking up a word is a single hash table probe sequence.
+
+    Words are stored as UTF-8 bytes (see :meth:`encode`), so words and first words are ``str`` whether the lexicon is in memory or mapped from a compiled file.
+
+    Attributes:
+        first_words (list): The first word of each set, indexed by set index
+        buf (str): Every word in the lexicon, concatenated
+        offsets (array.array): The start of each word in ``buf``, followed by the length of ``buf``
+        sets (array.array): The set index of each word
+        slots (array.array): The hash table; each slot holds the position of a word in ``offsets`` or -1 if the slot is empty
+    """
+    def __init__(self, pairs, first_words=None):
+        """ Constructor for the :class:`~interpreter.lexicon.Lexicon` class
+
+        Args:
+            pairs (list): A list of tuples ``(str, int)``, each containing a word and its set index. If a word appears more than once, its first set index is kept
+            first_words (list): The first word of each set, indexed by set index
+
+        Raises:
+            ValueError: If a set index does not fit in the lexicon, see :data:`max_sets`
+        """
+        self.first_words = [encode(word) for word in first_words or []]
+
+        words = []
+        set_indices = []
+        seen = set()
+        for word, set_index in pairs:
+            word = encode(word)
+            if word not in seen:
+                seen.add(word)
+                words.append(word)
+                set_indices.append(set_index)
+        if len(self.first_words) > max_sets or (set_indices and not 0 <= max(set_indices) < max_sets):
+            raise ValueError("A lexicon holds at most %d sets" % max_sets)
+
+        self.buf = "".join(words)
+        self.offsets = array("I", [0])
+        for word in words:
+            self.offsets.append(self.offsets[-1] + len(word))
+        self.sets = array("H", set_indices)
+
+        # The table is kept at most half full so probe sequences stay short
+        size = 8
+        while size < len(words) * 2:
+            size *= 2
+        self.mask = size - 1
+        self.slots = array("i", [-1]) * size
+        for i, word in enumerate(words):
+            slot = word_hash(word) & self.mask
+            while self.slots[slot] >= 0:
+                slot = (slot + 1) & self.mask
+            self.slots[slot] = i
+
+    def lookup(self, word):
+        """
+        Finds the set index of a word.
+
+        Args:
+            word (str): The word to look up
+
+        Returns:
+            int: The set index of the word
+
+               * Returns -1 if the word is not in the lexicon
+        """
+        word = encode(word)
+        slots = self.slots
+        offsets = self.offsets
+        slot = word_hash(word) & self.mask
+        i = slots[slot]
+        while i >= 0:
+            if self.buf[offsets[i]:offsets[i + 1]] == word:
+                return self.sets[i]
+            slot = (slot + 1) & self.mask
+            i = slots[slot]
+        return -1
+
+    def first_word(self, set_index):
+        """
+        Gets the first word of a set, which is the word that every word of the set resolves to.
+
+        Args:
+            set_index (int): The set index
+
+        Returns:
+            str: The first word of the set
+        """
+        return self.first_words[set_index]
+
+    def __contains__(self, word):
+        return self.lookup(word) > -1
+
+    def __len__(self):
+        return len(self.sets)
+
+    def items(self):
+        """
+        Lists the contents of the lexicon in A-Z order, in the format of the old known actions list.
+
+        Returns:
+            list: A sorted list of tuples ``(str, int)``, each containing a word and its set index
+        """
+        offsets = self.offsets
+        return sorted((self.buf[offsets[i]:offsets[i + 1]], self.sets[i]) for i in range(len(self.sets)))
+
+    def nbytes(self):
+        """
+        Calculates the memory used by the lexicon's buffer and arrays.
+
+        Returns:
+            int: The number of bytes used
+        """
+        return len(self.buf) + sum(arr.itemsize * len(arr) for arr in (self.offsets, self.sets, self.slots))
+
+class MappedLexicon(Lexicon):
+    """ A :class:`~interpreter.lexicon.Lexicon` that is read directly from a memory-mapped compiled lexicon file.
+
+    The file is mapped read-only and words are looked up in the mapped buffer without copying the lexicon into the process. Every process that maps the same file shares the same physical pages, so the memory used by each additional interpreter process stays the same no matter how large the lexicon is.
+
+    Attributes:
+        filename (str): The compiled lexicon file
+        source_mtime (float): The modification time of the known words file the lexicon was compiled from
+        source_size (int): The size of the known words file the lexicon was compiled from
+        key_hash (int): The hash of the key the lexicon was compiled with, see :meth:`~interpreter.lexicon.write_compiled`
+    """
+    def __init__(self, filename):
+        """ Constructor for the :class:`~interpreter.lexicon.MappedLexicon` class
+
+        Args:
+            filename (str): The compiled lexicon file, as written by :meth:`~interpreter.lexicon.write_compiled`
+
+        Raises:
+            ValueError: If the file is not a compiled lexicon, or was written in an older format
+        """
+        self.filename = filename
+        with open(filename, "rb") as lex_file:
+            self.buf = mmap.mmap(lex_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        file_magic, version, self.count, num_slots, buf_len, self.source_mtime, self.source_size, self.key_hash = struct.unpack_from(header_format, self.buf, 0)
+        if file_magic != magic:
+            self.buf.close()
+            raise ValueError(filename + " is not a compiled lexicon")
+        if version != format_version:
+            self.buf.close()
+            raise ValueError(filename + " was compiled in an older format")
+        self.mask = num_slots - 1
+
+        # Positions of each section in the file, see write_compiled
+        self.offsets_pos = header_size
+        self.sets_pos = self.offsets_pos + 4 * (self.count + 1)
+        self.slots_pos = _align(self.sets_pos + 2 * self.count)
+        self.words_pos = self.slots_pos + 4 * num_slots
+        first_words_pos = self.words_pos + buf_len
+        # The first words are few and short, so they are the only part kept as Python strings
+        self.first_words = self.buf[first_words_pos:].split("\n") if first_words_pos < len(self.buf) else []
+
+    def lookup(self, word):
+        """
+        Finds the set index of a word by probing the hash table in the mapped file.
+
+        Args:
+            word (str): The word to look up
+
+        Returns:
+            int: The set index of the word
+
+               * Returns -1 if the word is not in the lexicon
+        """
+        word = encode(word)
+        buf = self.buf
+        unpack_from = struct.unpack_from
+        slot = word_hash(word) & self.mask
+        i = unpack_from("<i", buf, self.slots_pos + 4 * slot)[0]
+        while i >= 0:
+            start, end = unpack_from("<II", buf, self.offsets_pos + 4 * i)
+            if end - start == len(word) and buf[self.words_pos + start:self.words_pos + end] == word:
+                return unpack_from("<H", buf, self.sets_pos + 2 * i)[0]
+            slot = (slot + 1) & self.mask
+            i = unpack_from("<i", buf, self.slots_pos + 4 * slot)[0]
+        return -1
+
+    def __len__(self):
+        return self.count
+
+    def items(self):
+        """
+        Lists the contents of the lexicon in A-Z order, in the format of the old known actions list.
+
+        Returns:
+            list: A sorted list of tuples ``(str, int)``, each containing a word and its set index
+        """
+        offsets = struct.unpack_from("<%dI" % (self.count + 1), self.buf, self.offsets_pos)
+        sets = struct.unpack_from("<%dH" % self.count, self.buf, self.sets_pos)
+        return sorted((self.buf[self.words_pos + offsets[i]:self.words_pos + offsets[i + 1]], sets[i]) for i in range(self.count))
+
+    def nbytes(self):
+        """
+        Gets the size of the mapped file. The pages of the file are shared with every other process that maps it.
+
+        Returns:
+            int: The number of bytes mapped
+        """
+        return len(self.buf)
+
+    def close(self):
+        """
+        Unmaps the file. The lexicon cannot be used after it is closed.
+        """
+        self.buf.close()
+
+def _align(pos):
+    # Sections are aligned to 4 bytes
+    return (pos + 3) & ~3
+
+def _little_endian(arr):
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tostring()
+
+def write_compiled(lex, filename, source_filename=None, key=""):
+    """
+    Writes a lexicon to a compiled lexicon file that can be mapped by :class:`~interpreter.lexicon.MappedLexicon`.
+
+    The file holds a header, the word offsets, the set indices, the hash table, the word buffer and finally the first words of each set separated by newlines. All numbers are little-endian. The file is written under a temporary name and renamed when it is complete, so processes never map a partially written file.
+
+    Args:
+        lex (Lexicon): The lexicon to write
+        filename (str): The compiled lexicon file to write
+        source_filename (str): The known words file the lexicon was built from. Its modification time and size are stored to detect when the compiled file is out of date
+        key (str): Everything else the lexicon was built from, e.g. the actions that have extractor rules. Its hash is stored to detect when the compiled file is out of date
+
+    Raises:
+        ValueError: If the lexicon has more sets than the file format can hold, see :data:`max_sets`
+    """
+    if len(lex.first_words) > max_sets:
+        raise ValueError("A compiled lexicon holds at most %d sets" % max_sets)
+
+    source_mtime = 0.0
+    source_size = 0
+    if source_filename:
+        stat = os.stat(source_filename)
+        source_mtime = stat.st_mtime
+        source_size = stat.st_size
+
+    sections = [
+        struct.pack(header_format, magic, format_version, len(lex), lex.mask + 1, len(lex.buf), source_mtime, source_size, word_hash(key)),
+        _little_endian(lex.offsets),
+        _little_endian(lex.sets),
+    ]
+    if len(lex.sets) % 2:
+        sections.append("\0\0")
+    sections.extend([_little_endian(lex.slots), lex.buf, "\n".join(encode(word) for word in lex.first_words)])
+
+    tmp_filename = "%s.%d.tmp" % (filename, os.getpid())
+    with open(tmp_filename, "wb") as out_file:
+        out_file.write("".join(sections))
+    if os.name == "nt" and os.path.exists(filename):
+        # Windows cannot rename over an existing file
+        os.remove(filename)
+    os.rename(tmp_filename, filename)
+
+def is_current(lex, source_filename, key=""):
+    """
+    Checks if a mapped lexicon was compiled from the current version of its known words file and with the same key.
+
+    Args:
+        lex (MappedLexicon): The mapped lexicon
+        source_filename (str): The known words file
+        key (str): The key the lexicon should have been compiled with, see :meth:`~interpreter.lexicon.write_compiled`
+
+    Returns:
+        bool: ``True`` if neither the file nor the key has changed since the lexicon was compiled, ``False`` if either has
+    """
+    stat = os.stat(source_filename)
+    return lex.source_mtime == stat.st_mtime and lex.source_size == stat.st_size and lex.key_hash == word_hash(key)
+
+def load(source_filename, build, kind, compiled_dir=None, key=""):
+    """
+    Loads the lexicon of a known words file, mapping a compiled copy when one is available.
+
+    When a directory for compiled lexicons is configured, either with ``compiled_dir`` or the ``LILI_LEXICON_DIR`` environment variable, the compiled file for ``source_filename`` is mapped if it is up to date and was compiled with the same ``key``. Otherwise the lexicon is built, compiled into that directory and then mapped, so the next process only has to map it. Without a directory, the lexicon is built in memory.
+
+    Args:
+        source_filename (str): The known words file
+        build (function): A function that takes ``source_filename`` and returns a :class:`~interpreter.lexicon.Lexicon`
+        kind (str): A name for what ``build`` makes of the file, since one file may be built into different lexicons, e.g. ``"actions"``
+        compiled_dir (str): The directory of compiled lexicons
+        key (str): Everything besides ``source_filename`` that changes what ``build`` makes, see :meth:`~interpreter.lexicon.write_compiled`
+
+    Returns:
+        Lexicon: The lexicon, which is a :class:`~interpreter.lexicon.MappedLexicon` if it was mapped
+    """
+    compiled_dir = compiled_dir or os.environ.get("LILI_LEXICON_DIR")
+    if not compiled_dir:
+        return build(source_filename)
+
+    compiled_filename = os.path.join(compiled_dir, "%s.%s.lex" % (os.path.basename(source_filename), kind))
+    if os.path.exists(compiled_filename):
+        try:
+            lex = MappedLexicon(compiled_filename)
+            if is_current(lex, source_filename, key):
+                return lex
+            lex.close()
+        except (ValueError, struct.error, EnvironmentError):
+            pass
+
+    lex = build(source_filename)
+    try:
+        if not os.path.isdir(compiled_dir):
+            os.makedirs(compiled_dir)
+        write_compiled(lex, compiled_filename, source_filename, key)
+        return MappedLexicon(compiled_filename)
+    except EnvironmentError:
+        # E.g. the directory is read-only or the old file is still mapped on Windows, the built lexicon works just as well
+        return lex
@@ -0,0 +1,324 @@
+"""
+Listens for utterances continuously in the background, instead of calibrating and blocking for every command.
+
+The executors used to call ``adjust_for_ambient_noise(source, duration=1)`` and then ``listen`` for every command, which added a second of calibration to every command and missed anything said in between. A :class:`~interpreter.listener.BackgroundListener` instead reads audio from the source all the time. It keeps the most recent audio in a ring buffer, calibrates its energy threshold once when it starts and then again periodically on its own thread, and puts each detected utterance in a queue.
+
+The source can be a ``speech_recognition.Microphone`` or a :class:`~interpreter.listener.FileAudioSource`, which plays a WAV file instead, so the listener can be tested without a microphone.
+"""
+import audioop
+import collections
+import Queue
+import threading
+import time
+import wave
+
+import tracelog
+
+class FileAudioSource:
+    """ An audio source that reads a WAV file, standing in for ``speech_recognition.Microphone``.
+
+    Like a microphone, it is opened with a ``with`` block and then read in chunks from its ``stream``. Reading past the end of the file returns an empty string, unless the file is looped.
+
+    Attributes:
+        SAMPLE_RATE (int): The number of samples per second
+        SAMPLE_WIDTH (int): The number of bytes per sample
+        CHUNK (int): The number of samples read at a time
+        stream (FileAudioSource): The source itself, which has the ``read`` method of a microphone stream
+    """
+    def __init__(self, filename, chunk=1024, realtime=False, loop=False):
+        """ Constructor for the :class:`~interpreter.listener.FileAudioSource` class
+
+        Args:
+            filename (str): The WAV file, which must be mono
+            chunk (int): The number of samples read at a time
+            realtime (bool): If ``True``, each read waits as long as the audio it returns would take to record
+            loop (bool): If ``True``, the file starts over when it ends instead of ending the stream
+        """
+        self.filename = filename
+        self.CHUNK = chunk
+        self.realtime = realtime
+        self.loop = loop
+        self.wav = None
+        self.stream = None
+
+    def __enter__(self):
+        self.wav = wave.open(self.filename, "rb")
+        if self.wav.getnchannels() != 1:
+            self.wav.close()
+            raise ValueError(self.filename + " is not a mono WAV file")
+        self.SAMPLE_RATE = self.wav.getframerate()
+        self.SAMPLE_WIDTH = self.wav.getsampwidth()
+        self.stream = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.wav.close()
+        self.stream = None
+
+    def read(self, size):
+        """
+        Reads the next samples of the file.
+
+        Args:
+            size (int): The number of samples to read
+
+        Returns:
+            str: The raw samples, an empty string at the end of the file
+        """
+        frames = self.wav.readframes(size)
+        if not frames and self.loop:
+            self.wav.rewind()
+            frames = self.wav.readframes(size)
+        if self.realtime and frames:
+            time.sleep(float(len(frames)) / (self.SAMPLE_WIDTH * self.SAMPLE_RATE))
+        return frames
+
+class Utterance:
+    """ The audio of one detected utterance.
+
+    Attributes:
+        frames (str): The raw samples, including a short stretch of audio from before the speech started
+        sample_rate (int): The number of samples per second
+        sample_width (int): The number of bytes per sample
+        started (float): The time the speech started, from ``time.time()``
+    """
+    def __init__(self, frames, sample_rate, sample_width, started):
+        self.frames = frames
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.started = started
+
+    def duration(self):
+        """
+        Calculates the length of the utterance.
+
+        Returns:
+            float: The length in seconds
+        """
+        return float(len(self.frames)) / (self.sample_rate * self.sample_width)
+
+class BackgroundListener:
+    """ Reads audio from a source on a background thread and puts every utterance it detects in a queue.
+
+    Each chunk of audio is added to a ring buffer holding the last ``ring_seconds`` of audio along with its energy. A chunk whose energy is above the threshold starts an utterance, which also gets the ``pre_roll`` seconds of audio before it from the ring buffer so the start of the first word is not cut off. The utterance ends after ``pause_seconds`` of quiet audio or when it reaches ``phrase_limit`` seconds.
+
+    The threshold is calibrated from the first ``calibration_seconds`` of audio, before any utterance is detected, and then recalibrated every ``recalibrate_interval`` seconds on a separate thread from the audio in the ring buffer, so it follows changes in background noise without delaying any command.
+
+    Audio is captured even while no one is waiting for an utterance, e.g. while a video plays. At most ``max_queued`` utterances are kept, dropping the oldest, and :meth:`drain` throws away everything heard before it is called, so old audio is never taken for a new command.
+
+    Attributes:
+        queue (Queue.Queue): The detected utterances. ``None`` is put in the queue when the source ends
+        energy_threshold (float): The energy above which audio is considered speech
+        calibrations (int): The number of times the threshold has been calibrated
+        utterances (int): The number of utterances detected
+        dropped (int): The number of utterances thrown away because the queue was full or they were drained
+    """
+    def __init__(self, source, ring_seconds=10.0, pre_roll=0.3, pause_seconds=0.8, phrase_limit=10.0,
+                 calibration_seconds=1.0, recalibrate_interval=30.0, energy_ratio=1.5, min_threshold=300.0, queue=None, max_queued=3):
+        """ Constructor for the :class:`~interpreter.listener.BackgroundListener` class
+
+        Args:
+            source (object): The audio source, e.g. a ``speech_recognition.Microphone`` or a :class:`~interpreter.listener.FileAudioSource`
+            ring_seconds (float): The length of audio kept in the ring buffer
+            pre_roll (float): The length of audio from before the speech started that is included in an utterance
+            pause_seconds (float): The length of quiet audio that ends an utterance
+            phrase_limit (float): The longest utterance
+            calibration_seconds (float): The length of audio used to calibrate the threshold when listening starts
+            recalibrate_interval (float): The number of seconds between recalibrations, 0 to never recalibrate
+            energy_ratio (float): The threshold is the background noise energy multiplied by this
+            min_threshold (float): The lowest threshold, so silence does not make every sound an utterance
+            queue (Queue.Queue): The queue to put utterances in, a new queue if left out
+            max_queued (int): The most utterances kept in the queue, 0 to keep every utterance
+        """
+        self.source = source
+        self.ring_seconds = ring_seconds
+        self.pre_roll = pre_roll
+        self.pause_seconds = pause_seconds
+        self.phrase_limit = phrase_limit
+        self.calibration_seconds = calibration_seconds
+        self.recalibrate_interval = recalibrate_interval
+        self.energy_ratio = energy_ratio
+        self.min_threshold = min_threshold
+        self.queue = queue or Queue.Queue()
+        self.max_queued = max_queued
+        self.energy_threshold = None
+        self.calibrations = 0
+        self.utterances = 0
+        self.dropped = 0
+        # Utterances that started before this time were heard before the last drain
+        self._drained_at = 0.0
+        self.ring = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """
+        Starts listening on a background thread, and recalibrating on another.
+
+        Returns:
+            BackgroundListener: The listener itself
+        """
+        self._threads = [threading.Thread(target=self._capture, name="lili-listener")]
+        if self.recalibrate_interval:
+            self._threads.append(threading.Thread(target=self._recalibrate_loop, name="lili-listener-calibration"))
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops listening and waits for the background threads to finish.
+        """
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join()
+
+    def get(self, timeout=None):
+        """
+        Waits for the next utterance.
+
+        Args:
+            timeout (float): The longest time to wait in seconds, forever if left out
+
+        Returns:
+            Utterance: The next utterance, ``None`` if the source has ended or the timeout passed
+        """
+        deadline = time.time() + (timeout if timeout is not None else 1e9)
+        while True:
+            try:
+                # A timeout is always given, since waiting on a Queue without one cannot be interrupted with Ctrl-C in Python 2
+                utterance = self.queue.get(timeout=max(0, deadline - time.time()))
+            except Queue.Empty:
+                return None
+            # An utterance that was still being heard when the queue was drained is as old as the ones that were drained
+            if utterance is not None and utterance.started < self._drained_at:
+                self.dropped += 1
+                continue
+            return utterance
+
+    def drain(self):
+        """
+        Throws away every utterance heard so far, including one that is still being heard. Called before waiting for a command, so audio from while a command ran, e.g. a video's sound, is not taken for the next command.
+
+        Returns:
+            int: The number of utterances thrown away from the queue
+        """
+        self._drained_at = time.time()
+        drained = 0
+        ended = False
+        while True:
+            try:
+                utterance = self.queue.get_nowait()
+            except Queue.Empty:
+                break
+            if utterance is None:
+                ended = True
+            else:
+                drained += 1
+        if ended:
+            # The source has ended, which the next get still has to report
+            self.queue.put(None)
+        self.dropped += drained
+        return drained
+
+    def calibrate(self):
+        """
+        Sets the energy threshold from the background noise in the ring buffer.
+
+        The background noise is the energy of the quietest quarter of the chunks, so speech in the ring buffer does not raise it, while a room that gets louder does.
+
+        Returns:
+            float: The new threshold, or the old one if the ring buffer is empty
+        """
+        with self._lock:
+            energies = sorted(energy for frames, energy in self.ring)
+        if not energies:
+            return self.energy_threshold
+        noise = energies[len(energies) / 4]
+        new_threshold = max(self.min_threshold, noise * self.energy_ratio)
+        with self._lock:
+            self.energy_threshold = new_threshold
+            self.calibrations += 1
+        tracelog.debug("listener_calibrated", noise=noise, threshold=new_threshold)
+        return new_threshold
+
+    def _recalibrate_loop(self):
+        while not self._stopped.wait(self.recalibrate_interval):
+            if self.energy_threshold is not None:
+                self.calibrate()
+
+    def _capture(self):
+        try:
+            with self.source as source:
+                self._listen(source)
+        except Exception as err:
+            tracelog.error("listener_failed", error=str(err))
+        finally:
+            self._enqueue(None)
+
+    def _listen(self, source):
+        chunk_seconds = float(source.CHUNK) / source.SAMPLE_RATE
+        self.ring = collections.deque(maxlen=max(1, int(self.ring_seconds / chunk_seconds)))
+        pre_roll_chunks = int(self.pre_roll / chunk_seconds)
+        pause_chunks = max(1, int(self.pause_seconds / chunk_seconds))
+        limit_chunks = max(1, int(self.phrase_limit / chunk_seconds))
+        calibration_chunks = max(1, int(self.calibration_seconds / chunk_seconds))
+
+        chunks_read = 0
+        phrase = None
+        quiet_chunks = 0
+        while not self._stopped.is_set():
+            frames = source.stream.read(source.CHUNK)
+            if not frames:
+                break
+            energy = audioop.rms(frames, source.SAMPLE_WIDTH)
+            with self._lock:
+                self.ring.append((frames, energy))
+            chunks_read += 1
+
+            # Nothing is detected until the first calibration is done
+            if self.energy_threshold is None:
+                if chunks_read >= calibration_chunks:
+                    self.calibrate()
+                continue
+
+            if phrase is None:
+                if energy > self.energy_threshold:
+                    with self._lock:
+                        pre_roll = list(self.ring)[-pre_roll_chunks - 1:-1] if pre_roll_chunks else []
+                    phrase = [chunk for chunk, chunk_energy in pre_roll] + [frames]
+                    phrase_started = time.time() - chunk_seconds * (len(phrase) - 1)
+                    phrase_chunks = len(phrase)
+                    quiet_chunks = 0
+                continue
+
+            phrase.append(frames)
+            phrase_chunks += 1
+            quiet_chunks = quiet_chunks + 1 if energy <= self.energy_threshold else 0
+            if quiet_chunks >= pause_chunks or phrase_chunks >= limit_chunks:
+                self._put(phrase, source, phrase_started)
+                phrase = None
+
+        if phrase is not None:
+            self._put(phrase, source, phrase_started)
+
+    def _put(self, phrase, source, started):
+        self.utterances += 1
+        utterance = Utterance("".join(phrase), source.SAMPLE_RATE, source.SAMPLE_WIDTH, started)
+        tracelog.debug("utterance", seconds=utterance.duration())
+        self._enqueue(utterance)
+
+    def _enqueue(self, item):
+        # Drops the oldest utterances instead of letting them pile up while no one is waiting
+        # The end of the source (None) is always added on top, so it never pushes out an utterance
+        while item is not None and self.max_queued and self.queue.qsize() >= self.max_queued:
+            try:
+                oldest = self.queue.get_nowait()
+            except Queue.Empty:
+                break
+            if oldest is not None:
+                self.dropped += 1
+                tracelog.debug("utterance_dropped", seconds=oldest.duration())
+        self.queue.put(item)
@@ -0,0 +1,244 @@
+import BaseHTTPServer
+import os
+import sys
+import threading
+import time
+from array import array
+
+# Most precise wall clock available on each platform
+if sys.platform == "win32":
+    timer = time.clock
+else:
+    timer = time.time
+
+# Timing is off by default - set LILI_METRICS=1 (or call enable()) to collect stage latencies
+enabled = os.environ.get("LILI_METRICS", "") not in ("", "0")
+
+# Number of most recent samples kept by each histogram to calculate quantiles from
+window_size = 4096
+
+# Quantiles that are reported for every stage
+quantiles = (0.5, 0.95, 0.99)
+
+metric_name = "lili_stage_latency_seconds"
+
+# Parts of a stage, named "<stage>.<substage>", are exported under their own metric so that summing the stages does not count them twice
+substage_metric_name = "lili_substage_latency_seconds"
+
+class Histogram:
+    """ Collects latency samples for a single pipeline stage.
+
+    The total count and sum of all samples are kept for the lifetime of the process, while quantiles are calculated over a fixed-size window of the most recent samples so that memory use stays constant.
+
+    Attributes:
+        count (int): The number of samples observed
+        total (float): The sum of all observed samples in seconds
+    """
+    def __init__(self, size=None):
+        """ Constructor for the :class:`~interpreter.metrics.Histogram` class
+
+        Args:
+            size (int): The number of recent samples to keep, defaults to :data:`window_size`
+        """
+        self.samples = array("d", [0.0] * (size or window_size))
+        self.count = 0
+        self.total = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        """
+        Adds a sample to the histogram.
+
+        Args:
+            value (float): The sample in seconds
+        """
+        with self.lock:
+            self.samples[self.count % len(self.samples)] = value
+            self.count += 1
+            self.total += value
+
+    def quantile(self, q):
+        """
+        Calculates a quantile over the window of recent samples.
+
+        Args:
+            q (float): The quantile to calculate, between 0 and 1
+
+        Returns:
+            float: The sample value at the quantile, ``0.0`` if there are no samples
+        """
+        return self.quantiles((q,))[0]
+
+    def quantiles(self, qs):
+        """
+        Calculates several quantiles over the window of recent samples, sorting the window only once.
+
+        Args:
+            qs (list): The quantiles to calculate, each between 0 and 1
+
+        Returns:
+            list: The sample values at each quantile
+        """
+        with self.lock:
+            window = sorted(self.samples[:min(self.count, len(self.samples))])
+        if not window:
+            return [0.0 for q in qs]
+        return [window[min(int(q * len(window)), len(window) - 1)] for q in qs]
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+def enable(on=True):
+    """
+    Turns collection of stage latencies on or off.
+
+    Args:
+        on (bool): ``True`` to collect latencies, ``False`` to stop collecting them
+    """
+    global enabled
+    enabled = on
+
+def start():
+    """
+    Starts timing a stage.
+
+    Returns:
+        float: The current time to be passed to :meth:`observe`
+
+           * Returns ``None`` if metrics are disabled, which makes the matching :meth:`observe` call a no-op
+    """
+    if enabled:
+        return timer()
+    return None
+
+def observe(stage, started):
+    """
+    Records the time passed since ``started`` as a sample of the given stage.
+
+    Args:
+        stage (str): The name of the stage, e.g. ``"pos_tag"``, or ``"<stage>.<substage>"`` for a part of a stage that is also timed as a whole, e.g. ``"extractor.show_resolution"``
+        started (float): The value returned by :meth:`start` when the stage began
+
+    Returns:
+        float: The current time, so that the next stage can be timed from it without another call to :meth:`start`
+
+           * Returns ``None`` if ``started`` is ``None``
+    """
+    if started is None:
+        return None
+    now = timer()
+    histogram(stage).observe(now - started)
+    return now
+
+def histogram(stage):
+    """
+    Gets the histogram for a stage, creating it if this stage has not been seen before.
+
+    Args:
+        stage (str): The name of the stage
+
+    Returns:
+        :class:`~interpreter.metrics.Histogram`: The stage's histogram
+    """
+    try:
+        return _histograms[stage]
+    except KeyError:
+        with _histograms_lock:
+            return _histograms.setdefault(stage, Histogram())
+
+def reset():
+    """
+    Removes every collected sample.
+    """
+    with _histograms_lock:
+        _histograms.clear()
+
+def summary():
+    """
+    Summarizes every stage as a dictionary, which is convenient for benchmarks and tests.
+
+    Returns:
+        dict: Maps each stage name to a dictionary with ``count``, ``sum``, ``p50``, ``p95``, and ``p99`` values in seconds
+
+           * A substage's dictionary also has the ``parent`` stage it is part of
+    """
+    res = {}
+    for stage, hist in sorted(_histograms.items()):
+        p50, p95, p99 = hist.quantiles((0.5, 0.95, 0.99))
+        res[stage] = {"count": hist.count, "sum": hist.total, "p50": p50, "p95": p95, "p99": p99}
+        if "." in stage:
+            res[stage]["parent"] = stage.split(".", 1)[0]
+    return res
+
+def export_text():
+    """
+    Formats every stage as a Prometheus summary in the text exposition format. Substages are formatted as a separate summary labelled with their stage.
+
+    Returns:
+        str: The Prometheus text representation of the collected latencies
+    """
+    histograms = sorted(_histograms.items())
+    stages = [(stage, 'stage="%s"' % stage, hist) for stage, hist in histograms if "." not in stage]
+    substages = [(stage, 'stage="%s",substage="%s"' % tuple(stage.split(".", 1)), hist) for stage, hist in histograms if "." in stage]
+
+    lines = []
+    for name, description, entries in ((metric_name, "Latency of LILI interpreter pipeline stages", stages),
+                                       (substage_metric_name, "Latency of parts of LILI interpreter pipeline stages, included in their stage's latency", substages)):
+        if not entries and name == substage_metric_name:
+            continue
+        lines.append("# HELP " + name + " " + description)
+        lines.append("# TYPE " + name + " summary")
+        for stage, labels, hist in entries:
+            values = hist.quantiles(quantiles)
+            for q, value in zip(quantiles, values):
+                lines.append('%s{%s,quantile="%s"} %.9f' % (name, labels, q, value))
+            lines.append('%s_sum{%s} %.9f' % (name, labels, hist.total))
+            lines.append('%s_count{%s} %d' % (name, labels, hist.count))
+    return "\n".join(lines) + "\n"
+
+def write_file(filename):
+    """
+    Writes the Prometheus text representation to a file, e.g. for the node exporter's textfile collector.
+
+    The text is written to a temporary file first and then renamed, so a reader never sees a partially written file.
+
+    Args:
+        filename (str): The name of the file to write
+    """
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "wb") as out_file:
+        out_file.write(export_text())
+    if os.name == "nt" and os.path.exists(filename):
+        # Windows cannot rename over an existing file
+        os.remove(filename)
+    os.rename(tmp_filename, filename)
+
+class _MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = export_text()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are not worth logging
+        pass
+
+def serve(port, host="127.0.0.1"):
+    """
+    Serves the Prometheus text representation over HTTP from a background thread.
+
+    Args:
+        port (int): The port to listen on, 0 picks a free port
+        host (str): The address to listen on, defaults to the local machine only
+
+    Returns:
+        BaseHTTPServer.HTTPServer: The running server; its ``server_address`` holds the actual port
+    """
+    server = BaseHTTPServer.HTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="lili-metrics")
+    thread.daemon = True
+    thread.start()
+    return server
@@ -0,0 +1,190 @@
+import os
+import threading
+import taggers
+import tracelog
+
+# The NLTK components are only imported and loaded the first time they are needed
+# Importing nltk and loading its tokenizer and tagger models takes much longer than the rest of the interpreter's startup
+_lock = threading.RLock()
+_components = {}
+
+def _load_tokenizer():
+    from nltk.tokenize import word_tokenize
+    return word_tokenize
+
+def _load_tagger():
+    from nltk.tag.perceptron import PerceptronTagger
+    # nltk.pos_tag builds a new tagger on every call, so one instance is loaded and kept instead
+    return PerceptronTagger()
+
+def _load_lexicon_tagger():
+    import taggers
+    table, verb_table = taggers.build_tag_tables(taggers.nouns_path, taggers.verbs_path)
+    return taggers.LexiconTagger(table, lambda: get("tagger"), verb_table)
+
+def _load_cached_tagger():
+    import tagcache
+    # Checking the cached tags against the perceptron is opt-in, e.g. LILI_TAG_CACHE_VERIFY=100 checks every 100th sentence
+    return tagcache.CachedTagger(tagcache.load(), lambda: get("tagger"), int(os.environ.get("LILI_TAG_CACHE_VERIFY", "0")))
+
+def _load_stemmer():
+    from nltk.stem.snowball import SnowballStemmer
+    return SnowballStemmer("english")
+
+# Functions that load each component, keyed by the component's name
+loaders = {
+    "tokenizer": _load_tokenizer,
+    "tagger": _load_tagger,
+    "lexicon_tagger": _load_lexicon_tagger,
+    "cached_tagger": _load_cached_tagger,
+    "stemmer": _load_stemmer,
+}
+
+# The component used by pos_tag for each tagger backend, see interpreter.taggers
+tagger_backends = {
+    "perceptron": "tagger",
+    "lexicon": "lexicon_tagger",
+    "cached": "cached_tagger",
+}
+tagger_backend = "perceptron"
+
+def set_tagger_backend(name, force=False):
+    """
+    Chooses the tagger used by :meth:`pos_tag`. See :mod:`interpreter.taggers` for the available backends.
+
+    A backend other than the perceptron is only chosen if ``benchmarks.eval_tagger`` has recorded that it gives the same interpreter results as the perceptron, see :meth:`~interpreter.taggers.passed_evaluation`.
+
+    Args:
+        name (str): The name of the backend, one of the keys of :data:`tagger_backends`
+        force (bool): If ``True``, the backend is chosen without a passing evaluation, e.g. to evaluate it
+
+    Raises:
+        ValueError: If there is no backend with that name, or it has not passed its evaluation and ``force`` is ``False``
+    """
+    global tagger_backend
+    if name not in tagger_backends:
+        raise ValueError("Unknown tagger backend " + name)
+    if name != "perceptron":
+        result = taggers.passed_evaluation(name)
+        if result is None and not force:
+            raise ValueError("The %s tagger backend has no passing evaluation, run python -m benchmarks.eval_tagger --backend %s --record" % (name, name))
+        if result is None:
+            tracelog.warning("tagger_backend_not_evaluated", backend=name)
+        else:
+            tracelog.info("tagger_backend", backend=name, tag_accuracy=result["tag_accuracy"], sentences=result["sentences"])
+    tagger_backend = name
+
+if os.environ.get("LILI_TAGGER"):
+    try:
+        set_tagger_backend(os.environ["LILI_TAGGER"])
+    except ValueError as err:
+        # The perceptron is kept, rather than failing to start
+        tracelog.error("tagger_backend_rejected", error=str(err))
+
+def get(name):
+    """
+    Gets a shared NLP component, loading it first if this is the first time it is needed.
+
+    Args:
+        name (str): The name of the component, one of the keys of :data:`loaders`
+
+    Returns:
+        object: The loaded component
+    """
+    try:
+        return _components[name]
+    except KeyError:
+        with _lock:
+            # Another thread may have loaded the component while this one waited for the lock
+            if name not in _components:
+                _components[name] = loaders[name]()
+            return _components[name]
+
+def is_loaded(name):
+    """
+    Checks if a component has already been loaded.
+
+    Args:
+        name (str): The name of the component
+
+    Returns:
+        bool: ``True`` if the component is loaded, ``False`` if not
+    """
+    return name in _components
+
+def unload(name):
+    """
+    Drops a loaded component, so that it is loaded again the next time it is needed, e.g. after the files it was built from have changed.
+
+    Args:
+        name (str): The name of the component
+    """
+    with _lock:
+        _components.pop(name, None)
+
+def tokenize(text):
+    """
+    Tokenizes a raw text sentence into words and punctuation marks, the same way as ``nltk.word_tokenize``.
+
+    Args:
+        text (str): A string containing a sentence
+
+    Returns:
+        list: A list of tokens
+    """
+    return get("tokenizer")(text)
+
+def pos_tag(tokens):
+    """
+    Part of speech tags a list of tokens with the tagger of the current backend, which is only loaded once. The default backend tags the same way as ``nltk.pos_tag``.
+
+    Args:
+        tokens (list): A list of tokens
+
+    Returns:
+        list: A list of tuples ``(token, tag)``
+    """
+    return get(tagger_backends[tagger_backend]).tag(tokens)
+
+def stemmer():
+    """
+    Gets the shared English Snowball stemmer.
+
+    Returns:
+        nltk.stem.snowball.SnowballStemmer: The stemmer
+    """
+    return get("stemmer")
+
+def warm_up(background=True):
+    """
+    Loads every component ahead of time, so that the first command does not have to wait for them.
+
+    Args:
+        background (bool): If ``True``, the components are loaded on a daemon thread and this function returns immediately
+
+    Returns:
+        threading.Thread: The thread loading the components, ``None`` if they were loaded on the calling thread
+    """
+    if not background:
+        _warm_up()
+        return None
+    thread = threading.Thread(target=_warm_up, name="lili-nlp-warm-up")
+    thread.daemon = True
+    thread.start()
+    return thread
+
+def _warm_up():
+    for name in sorted(loaders):
+        # Taggers of backends that are not in use are not loaded, the perceptron is always loaded since the other backends fall back to it
+        if name in tagger_backends.values() and name not in ("tagger", tagger_backends[tagger_backend]):
+            continue
+        try:
+            get(name)
+        except Exception as err:
+            # The component will be loaded again, and the error raised, when it is first used
+            tracelog.error("warm_up_failed", component=name, error=str(err))
+    try:
+        # Running the models once loads any data that is only read on first use
+        pos_tag(tokenize("Move to the kitchen"))
+    except Exception as err:
+        tracelog.error("warm_up_failed", component="pipeline", error=str(err))
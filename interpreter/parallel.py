@@ -0,0 +1,112 @@
+"""
+Interprets large batches of commands on every core, for offline replay of command logs.
+
+Commands are split into chunks that are handed to a pool of worker processes. Each worker loads the lexicons, the tokenizer and the tagger once when it starts, instead of once per command, and the results of the chunks are merged back in input order.
+"""
+from __future__ import absolute_import
+
+import collections
+import itertools
+import multiprocessing
+
+# Absolute imports, since the batch module that uses this one is also run as __main__
+import interpreter.interpreter as interp
+import interpreter.nlp as nlp
+
+def init_worker():
+    """
+    Prepares a worker process to interpret commands. Run once in every worker when the pool starts.
+
+    Everything the parent process has already loaded is inherited by the worker, so this only loads what is still missing: the NLP models and the shown word indexes of the current snapshot.
+    """
+    nlp.warm_up(background=False)
+    try:
+        interp.current_snapshot().shown_words()
+    except Exception:
+        # Raised again, and reported per command, if a show command needs the indexes
+        pass
+
+def chunked(items, size):
+    """
+    Splits an iterable into lists of ``size`` items, without reading more of it than the next chunk.
+
+    Args:
+        items (iterable): The items to split
+        size (int): The number of items per chunk
+
+    Returns:
+        generator: The chunks; the last one may be shorter
+    """
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+def run_chunk(func, chunk):
+    """
+    Applies ``func`` to every item of a chunk. This is the task a worker process runs.
+
+    Args:
+        func (function): A module level function, so it can be sent to the worker
+        chunk (list): The items
+
+    Returns:
+        list: The results, in the order of the items
+    """
+    return [func(item) for item in chunk]
+
+def imap_ordered(func, items, workers=None, chunk_size=32, window=None, initializer=init_worker):
+    """
+    Applies ``func`` to every item on a pool of worker processes and yields the results in input order.
+
+    Items are read lazily and at most ``window`` chunks are in flight at once, so memory use stays constant however many items there are. A chunk's results are yielded as soon as every earlier chunk has been yielded.
+
+    Args:
+        func (function): A module level function taking one item
+        items (iterable): The items
+        workers (int): The number of worker processes, defaults to the number of cores
+        chunk_size (int): The number of items sent to a worker at once. Larger chunks lower the overhead per item, smaller ones keep the workers evenly loaded
+        window (int): The maximum number of chunks in flight, defaults to 4 per worker
+        initializer (function): Run once in each worker when it starts, defaults to :meth:`init_worker`
+
+    Returns:
+        generator: The result of ``func`` for each item
+    """
+    workers = workers or multiprocessing.cpu_count()
+    window = window or 4 * workers
+    pool = multiprocessing.Pool(workers, initializer)
+    finished = False
+    try:
+        pending = collections.deque()
+        for chunk in chunked(items, chunk_size):
+            pending.append(pool.apply_async(run_chunk, (func, chunk)))
+            if len(pending) >= window:
+                for res in pending.popleft().get():
+                    yield res
+        while pending:
+            for res in pending.popleft().get():
+                yield res
+        finished = True
+    finally:
+        if finished:
+            pool.close()
+        else:
+            # An error or a caller that stopped early - the remaining chunks are not needed
+            pool.terminate()
+        pool.join()
+
+def interpret_sents(sents, workers=None, chunk_size=32):
+    """
+    Interprets every sentence in parallel.
+
+    Args:
+        sents (iterable): The command sentences
+        workers (int): The number of worker processes, defaults to the number of cores
+        chunk_size (int): The number of sentences sent to a worker at once
+
+    Returns:
+        generator: The result of :meth:`~interpreter.interpreter.interpret_sent` for each sentence, in order
+    """
+    return imap_ordered(interp.interpret_sent, sents, workers, chunk_size)
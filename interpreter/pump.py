@@ -0,0 +1,281 @@
+"""
+Waits for messages from LILI master control without polling.
+
+The executor used to wait for the start signal by calling ``vm.tryReadLine()`` and ``IPC.Sync()`` in a loop, which kept a core busy while nothing was happening, and only saw a message on its next turn around the loop. A :class:`~interpreter.pump.MessagePump` instead blocks in ``select`` until a line arrives from master control or a command is queued to be sent, and handles it right away.
+
+Commands are queued on a :class:`~interpreter.channel.CommandChannel`, which wakes the pump by writing a byte to a pipe of the pump's own, so the pump can wait on incoming lines and outgoing commands at once. The pump also wakes when the channel has to resend a command that was not acknowledged.
+
+On Windows, ``select`` only works on sockets, so a thread reads the incoming lines instead and hands them to the pump through a queue.
+
+:class:`~interpreter.pump.PipePeer` stands in for master control at the other end of a pair of pipes, for tests and benchmarks.
+"""
+import errno
+import os
+import select
+import threading
+import time
+import Queue
+
+import tracelog
+
+use_select = os.name != "nt"
+if use_select:
+    import fcntl
+
+def fileno(stream):
+    # Accepts either a file object or a file descriptor
+    return stream if isinstance(stream, (int, long)) else stream.fileno()
+
+class MessagePump:
+    """ Reads lines from master control and writes the commands of a :class:`~interpreter.channel.CommandChannel`, waking only when there is something to do.
+
+    Attributes:
+        lines (int): The number of lines received
+        wakeups (int): The number of times the pump woke up
+        closed (bool): ``True`` once master control has closed its end, or :meth:`close` was called
+    """
+    def __init__(self, inp, out, on_line, channel=None):
+        """ Constructor for the :class:`~interpreter.pump.MessagePump` class
+
+        Args:
+            inp (object): The file or file descriptor that master control's lines are read from
+            out (object): The file or file descriptor that commands are written to
+            on_line (function): Called with each line received, without its line ending. Lines that acknowledge a command are given to the channel instead
+            channel (CommandChannel): The channel whose commands the pump writes. Its ``write`` and ``on_queued`` are set to the pump's
+        """
+        self.inp = fileno(inp)
+        self.out = fileno(out)
+        self.on_line = on_line
+        self.channel = channel
+        self.lines = 0
+        self.wakeups = 0
+        self.closed = False
+        self._buffer = ""
+        self._write_lock = threading.Lock()
+        self._thread = None
+        if use_select:
+            self._wake_r, self._wake_w = os.pipe()
+            fcntl.fcntl(self._wake_w, fcntl.F_SETFL, fcntl.fcntl(self._wake_w, fcntl.F_GETFL) | os.O_NONBLOCK)
+        else:
+            self._events = Queue.Queue()
+            reader = threading.Thread(target=self._read_lines, name="lili-pump-reader")
+            reader.daemon = True
+            reader.start()
+        if channel is not None:
+            channel.write = self.write
+            channel.on_queued = self.wake
+
+    def write(self, data):
+        """
+        Writes data to master control.
+
+        Args:
+            data (str): The data, usually one or more lines
+        """
+        with self._write_lock:
+            while data:
+                data = data[os.write(self.out, data):]
+
+    def wake(self):
+        """
+        Wakes the pump so it writes the commands that were just queued. Safe to call from any thread.
+        """
+        if use_select:
+            try:
+                os.write(self._wake_w, "x")
+            except OSError as err:
+                # The pipe is full, so the pump is going to wake anyway
+                if err.errno != errno.EAGAIN:
+                    raise
+        else:
+            self._events.put(None)
+
+    def run_once(self, timeout=None):
+        """
+        Waits until a line arrives, a command is queued or a command has to be resent, and handles it.
+
+        Args:
+            timeout (float): The longest time to wait in seconds, forever if left out
+
+        Returns:
+            int: The number of lines handled
+        """
+        deadline = self.channel.next_deadline() if self.channel is not None else None
+        if deadline is not None:
+            wait = max(0.0, deadline - time.time())
+            timeout = wait if timeout is None else min(timeout, wait)
+
+        if use_select:
+            lines = self._select_lines(timeout)
+        else:
+            lines = self._queued_lines(timeout)
+        self.wakeups += 1
+
+        for line in lines:
+            self.lines += 1
+            if self.channel is not None and self.channel.on_line(line):
+                continue
+            try:
+                self.on_line(line)
+            except Exception as err:
+                tracelog.error("pump_line_failed", line=line, error=str(err))
+        if self.channel is not None:
+            self.channel.pump()
+        return len(lines)
+
+    def _select_lines(self, timeout):
+        try:
+            readable = select.select([self.inp, self._wake_r], [], [], timeout)[0]
+        except select.error as err:
+            if err.args[0] == errno.EINTR:
+                return []
+            raise
+        if self._wake_r in readable:
+            os.read(self._wake_r, 4096)
+        if self.inp not in readable:
+            return []
+        data = os.read(self.inp, 65536)
+        if not data:
+            self.closed = True
+            data = "\n" if self._buffer else ""
+        self._buffer += data
+        lines = self._buffer.split("\n")
+        self._buffer = lines.pop()
+        return [line.rstrip("\r") for line in lines]
+
+    def _read_lines(self):
+        # Only used when select cannot wait on the input, see use_select
+        with os.fdopen(os.dup(self.inp), "rb") as inp_file:
+            for line in iter(inp_file.readline, ""):
+                self._events.put(line.rstrip("\r\n"))
+        self._events.put(EOFError)
+
+    def _queued_lines(self, timeout):
+        lines = []
+        try:
+            event = self._events.get(timeout=timeout if timeout is not None else 1e9)
+        except Queue.Empty:
+            return lines
+        while True:
+            if event is EOFError:
+                self.closed = True
+            elif event is not None:
+                lines.append(event)
+            try:
+                event = self._events.get_nowait()
+            except Queue.Empty:
+                return lines
+
+    def run_until(self, condition, timeout=None):
+        """
+        Handles messages until a condition is met, master control closes its end or the timeout passes.
+
+        Args:
+            condition (function): Called after each wakeup, the pump stops when it returns ``True``
+            timeout (float): The longest time to run in seconds, forever if left out
+
+        Returns:
+            bool: ``True`` if the condition was met
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while not condition():
+            if self.closed:
+                return False
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+            self.run_once(remaining)
+        return True
+
+    def start(self):
+        """
+        Handles messages on a background thread until :meth:`close` is called or master control closes its end.
+
+        Returns:
+            MessagePump: The pump itself
+        """
+        self._thread = threading.Thread(target=self.run_until, args=(lambda: self.closed,), name="lili-pump")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def close(self):
+        """
+        Stops the background thread started by :meth:`start`.
+        """
+        self.closed = True
+        self.wake()
+        if self._thread is not None:
+            self._thread.join()
+
+class PipePeer:
+    """ A stand-in for LILI master control, connected to a :class:`~interpreter.pump.MessagePump` by a pair of pipes.
+
+    The peer acknowledges every numbered command it receives, like :class:`~interpreter.channel.LocalMasterControl`, and records when each line arrived.
+
+    Attributes:
+        executor_in (int): The file descriptor the executor reads the peer's lines from
+        executor_out (int): The file descriptor the executor writes its commands to
+        received (list): A tuple ``(time received, line)`` for each line from the executor
+    """
+    def __init__(self, acks=True):
+        """ Constructor for the :class:`~interpreter.pump.PipePeer` class
+
+        Args:
+            acks (bool): If ``True``, numbered commands are acknowledged
+        """
+        self.acks = acks
+        self.executor_in, self._out = os.pipe()
+        self._in, self.executor_out = os.pipe()
+        self.received = []
+        self._received = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="lili-pipe-peer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def send_line(self, line):
+        """
+        Sends a line to the executor.
+
+        Args:
+            line (str): The line, without its line ending
+        """
+        data = line + "\n"
+        while data:
+            data = data[os.write(self._out, data):]
+
+    def wait_for(self, count, timeout=5.0):
+        """
+        Waits until a number of lines have been received from the executor.
+
+        Args:
+            count (int): The number of lines
+            timeout (float): The longest time to wait in seconds
+
+        Returns:
+            bool: ``True`` if that many lines were received in time
+        """
+        deadline = time.time() + timeout
+        with self._received:
+            while len(self.received) < count and time.time() < deadline:
+                self._received.wait(deadline - time.time())
+            return len(self.received) >= count
+
+    def close(self):
+        """
+        Closes the peer's end of the pipes, which the pump sees as master control going away.
+        """
+        os.close(self._out)
+
+    def _run(self):
+        with os.fdopen(self._in, "rb") as inp_file:
+            for line in iter(inp_file.readline, ""):
+                line = line.rstrip("\r\n")
+                with self._received:
+                    self.received.append((time.time(), line))
+                    self._received.notify_all()
+                words = line.split()
+                if self.acks and len(words) == 2 and words[1].isdigit():
+                    self.send_line("ack " + words[1])
@@ -0,0 +1,97 @@
+import threading
+import interpreter
+import tracelog
+
+class LexiconWatcher(threading.Thread):
+    """ Watches the known word files of the current :class:`~interpreter.interpreter.LexiconSnapshot` and reloads them when they change.
+
+    The files are checked every ``interval`` seconds. When one of them has changed, a new snapshot is built on the watcher's own thread and then installed with :meth:`~interpreter.interpreter.install_snapshot`, so command handling is never blocked by a reload. If a new snapshot cannot be built, the current one stays in use and the error is logged; the files are only tried again after they change again.
+
+    Attributes:
+        interval (float): The number of seconds between checks
+        reloads (int): The number of snapshots installed by this watcher
+    """
+    def __init__(self, interval=2.0, on_reload=None):
+        """ Constructor for the :class:`~interpreter.reloader.LexiconWatcher` class
+
+        Args:
+            interval (float): The number of seconds between checks
+            on_reload (function): Called with each newly installed snapshot
+        """
+        threading.Thread.__init__(self, name="lili-lexicon-watcher")
+        self.daemon = True
+        self.interval = interval
+        self.on_reload = on_reload
+        self.reloads = 0
+        self.failed_sources = None
+        self.stopped = threading.Event()
+
+    def changed_sources(self, snapshot):
+        """
+        Checks if any of the files a snapshot was built from have changed.
+
+        Args:
+            snapshot (LexiconSnapshot): The snapshot to check
+
+        Returns:
+            list: The current ``(filename, signature)`` of every file, or ``None`` if none of them have changed
+        """
+        sources = [(filename, interpreter.file_signature(filename)) for filename, signature in snapshot.sources]
+        if sources == list(snapshot.sources) or sources == self.failed_sources:
+            return None
+        return sources
+
+    def check(self):
+        """
+        Checks the files once and reloads them if they have changed.
+
+        Returns:
+            bool: ``True`` if a new snapshot was installed, ``False`` if not
+        """
+        snapshot = interpreter.current_snapshot()
+        sources = self.changed_sources(snapshot)
+        if sources is None:
+            return False
+
+        filenames = [filename for filename, signature in sources]
+        try:
+            new_snapshot = interpreter.build_snapshot(*filenames, version=snapshot.version + 1)
+        except Exception as err:
+            self.failed_sources = sources
+            tracelog.error("reload_failed", error=str(err), files=filenames)
+            return False
+
+        interpreter.install_snapshot(new_snapshot)
+        self.reloads += 1
+        self.failed_sources = None
+        tracelog.info("reloaded", version=new_snapshot.version, files=filenames)
+        if self.on_reload:
+            self.on_reload(new_snapshot)
+        return True
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception as err:
+                tracelog.error("reload_failed", error=str(err))
+
+    def stop(self):
+        """
+        Stops watching the files. A reload that has already started is finished first.
+        """
+        self.stopped.set()
+
+def start(interval=2.0):
+    """
+    Starts a :class:`~interpreter.reloader.LexiconWatcher` on a background thread.
+
+    Args:
+        interval (float): The number of seconds between checks
+
+    Returns:
+        LexiconWatcher: The running watcher
+    """
+    watcher = LexiconWatcher(interval)
+    watcher.start()
+    return watcher
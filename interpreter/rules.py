@@ -0,0 +1,338 @@
+"""
+Object extractors defined by rules in a data file instead of ``object_dict_`` functions.
+
+Each action set's rules are in a section named after its first action. The rules of a section are compiled into a :class:`~interpreter.rules.RuleExtractor`, which is used in place of the extractor module's function for that action (see :meth:`~interpreter.interpreter.build_action_structures`), so a new action can be added by adding it to the known actions file and adding its rules, without writing any code::
+
+    # Lines starting with # are comments
+    [follow]
+    person = first noun
+    place = first noun
+
+    [talk]
+    flag prep when preposition and not word about
+    flag about when word about
+    person = last noun if prep and not about then clear prep
+    topic = last noun if about and not prep then clear about
+    unknown = last noun
+
+    [turn]
+    include move
+
+A rule ``slot = first|last predicate [if flags] [then actions] [keep case]`` fills an object of the object dictionary with a word of the sentence:
+
+* ``first`` rules only fill their object once, ``last`` rules fill it again with every word they match
+* A predicate is one or more of ``noun``, ``preposition``, ``direction``, ``tag TAG|TAG...`` and ``word WORD|WORD...`` joined by ``and``, each optionally preceded by ``not``
+* ``if`` lists the flags (joined by ``and``, each optionally preceded by ``not``) that must be set for the rule to apply
+* ``then`` lists the flags to ``set`` or ``clear`` (joined by ``and``) when the rule fills its object
+* Objects are lowercase unless the rule ends with ``keep case``
+
+A line ``flag name when predicate`` sets a flag whenever a word matches the predicate. ``include action`` copies the flags and rules of an earlier section.
+
+The sentence is read once. For every word, the flags are updated first, then the rules are tried in order and the first rule that matches the word fills its object.
+"""
+import os
+import features
+
+# The features of a word that predicates can test by name, see interpreter.features
+feature_bits = {
+    "noun": features.NOUN,
+    "preposition": features.PREPOSITION,
+    "direction": features.DIRECTION,
+}
+
+def matches(predicate, bits, word, tag):
+    """
+    Checks if a tagged word matches a compiled predicate.
+
+    Args:
+        predicate (tuple): A predicate compiled by :meth:`parse_predicate`
+        bits (int): The feature bits of the word
+        word (str): The lowercase word
+        tag (str): Its part of speech tag
+
+    Returns:
+        bool: ``True`` if the word matches, ``False`` if not
+    """
+    need_bits, not_bits, tags, not_tags, words, not_words = predicate
+    return (bits & need_bits == need_bits and not bits & not_bits
+            and (tags is None or tag in tags) and tag not in not_tags
+            and (words is None or word in words) and word not in not_words)
+
+class RuleExtractor:
+    """ An object extractor compiled from the rules of one action set.
+
+    Called like an ``object_dict_`` function with a part of speech tagged sentence, it returns an :ref:`object dictionary <object-dictionary>`. The flags of the rules are the bits of a single integer, so the state carried from word to word is one number.
+
+    The predicates only depend on the tagged word itself, so each distinct tagged word is only matched against the predicates once. The result - the flags it sets and the rules it can fill, with the object value already lowercased - is kept in a table, and every later occurrence of the word costs one lookup. Commands use a small vocabulary, so the table stays small; it is cleared if it grows past ``max_cached_tokens`` entries.
+
+    Attributes:
+        action (str): The first action of the action set
+        flags (list): A tuple ``(predicate, bit)`` for each flag line
+        rules (list): A tuple ``(slot, first, predicate, required, forbidden, sets, clears, keep_case)`` for each rule, in order
+        flag_names (dict): The bit of each flag, keyed by name
+    """
+    max_cached_tokens = 10000
+
+    def __init__(self, action):
+        """ Constructor for the :class:`~interpreter.rules.RuleExtractor` class
+
+        Args:
+            action (str): The first action of the action set
+        """
+        self.action = action
+        self.flags = []
+        self.rules = []
+        self.flag_names = {}
+        self._transitions = {}
+
+    def flag_bit(self, name):
+        """
+        Gets the bit of a flag, giving it the next free bit the first time it is used.
+
+        Args:
+            name (str): The name of the flag
+
+        Returns:
+            int: The flag's bit
+        """
+        if name not in self.flag_names:
+            self.flag_names[name] = 1 << len(self.flag_names)
+        return self.flag_names[name]
+
+    def transitions(self, token):
+        """
+        Matches a tagged word against every predicate of the extractor.
+
+        Args:
+            token (tuple): A tuple ``(word, tag)``
+
+        Returns:
+            (int, tuple): The bits of the flags the word sets, and a tuple ``(slot, first, required, forbidden, sets, clears, value)`` for each rule whose predicate the word matches, in order
+        """
+        word = token[0].lower()
+        tag = token[1]
+        bits = features.token_bits(word, tag)
+        flag_bits = 0
+        for predicate, bit in self.flags:
+            if matches(predicate, bits, word, tag):
+                flag_bits |= bit
+        candidates = tuple((slot, first, required, forbidden, sets, clears, token[0] if keep_case else word)
+                           for slot, first, predicate, required, forbidden, sets, clears, keep_case in self.rules
+                           if matches(predicate, bits, word, tag))
+        return (flag_bits, candidates)
+
+    def __call__(self, sent):
+        object_dict = {}
+        if not self.rules:
+            return object_dict
+        state = 0
+        table = self._transitions
+        for token in sent:
+            entry = table.get(token)
+            if entry is None:
+                if len(table) >= self.max_cached_tokens:
+                    table.clear()
+                entry = table[token] = self.transitions(token)
+            state |= entry[0]
+            for slot, first, required, forbidden, sets, clears, value in entry[1]:
+                if first and slot in object_dict:
+                    continue
+                if state & required != required or state & forbidden:
+                    continue
+                object_dict[slot] = value
+                state = (state | sets) & ~clears
+                break
+        return object_dict
+
+    def __repr__(self):
+        return "<RuleExtractor %s>" % self.action
+
+def split_on(words, keyword):
+    # Splits a list of words on every occurrence of a keyword
+    parts = [[]]
+    for word in words:
+        if word == keyword:
+            parts.append([])
+        else:
+            parts[-1].append(word)
+    return parts
+
+def parse_predicate(words):
+    """
+    Compiles a predicate such as ``noun and not word about``.
+
+    Args:
+        words (list): The words of the predicate
+
+    Returns:
+        tuple: A tuple ``(need_bits, not_bits, tags, not_tags, words, not_words)``; ``tags`` and ``words`` are ``None`` if any tag or word is allowed
+
+    Raises:
+        ValueError: If the predicate is not valid
+    """
+    need_bits = 0
+    not_bits = 0
+    tags = None
+    not_tags = frozenset()
+    word_set = None
+    not_words = frozenset()
+    for atom in split_on(words, "and"):
+        negate = bool(atom) and atom[0] == "not"
+        if negate:
+            atom = atom[1:]
+        if len(atom) == 1 and atom[0] in feature_bits:
+            if negate:
+                not_bits |= feature_bits[atom[0]]
+            else:
+                need_bits |= feature_bits[atom[0]]
+        elif len(atom) == 2 and atom[0] == "tag":
+            values = frozenset(value.upper() for value in atom[1].split("|"))
+            if negate:
+                not_tags |= values
+            else:
+                tags = values if tags is None else tags & values
+        elif len(atom) == 2 and atom[0] == "word":
+            values = frozenset(value.lower() for value in atom[1].split("|"))
+            if negate:
+                not_words |= values
+            else:
+                word_set = values if word_set is None else word_set & values
+        else:
+            raise ValueError("invalid predicate '%s'" % " ".join(atom))
+    return (need_bits, not_bits, tags, not_tags, word_set, not_words)
+
+def parse_flags(words, extractor_rules):
+    # Compiles "prep and not about" into the bits that must be set and the bits that must not be set
+    required = 0
+    forbidden = 0
+    for atom in split_on(words, "and"):
+        if len(atom) == 1:
+            required |= extractor_rules.flag_bit(atom[0])
+        elif len(atom) == 2 and atom[0] == "not":
+            forbidden |= extractor_rules.flag_bit(atom[1])
+        else:
+            raise ValueError("invalid flags '%s'" % " ".join(atom))
+    return (required, forbidden)
+
+def parse_actions(words, extractor_rules):
+    # Compiles "set prec and clear to" into the bits to set and the bits to clear
+    sets = 0
+    clears = 0
+    for atom in split_on(words, "and"):
+        if len(atom) == 2 and atom[0] == "set":
+            sets |= extractor_rules.flag_bit(atom[1])
+        elif len(atom) == 2 and atom[0] == "clear":
+            clears |= extractor_rules.flag_bit(atom[1])
+        else:
+            raise ValueError("invalid action '%s'" % " ".join(atom))
+    return (sets, clears)
+
+def parse_rule(slot, words, extractor_rules):
+    """
+    Compiles the part of a rule after its ``=``.
+
+    Args:
+        slot (str): The object the rule fills
+        words (list): The words after the ``=``
+        extractor_rules (RuleExtractor): The extractor the rule belongs to, which holds the bits of its flags
+
+    Returns:
+        tuple: The compiled rule, see :attr:`RuleExtractor.rules`
+
+    Raises:
+        ValueError: If the rule is not valid
+    """
+    if not words or words[0] not in ("first", "last"):
+        raise ValueError("a rule must start with 'first' or 'last'")
+    first = words[0] == "first"
+    words = words[1:]
+
+    keep_case = words[-2:] == ["keep", "case"]
+    if keep_case:
+        words = words[:-2]
+
+    sets = clears = 0
+    if "then" in words:
+        pos = words.index("then")
+        sets, clears = parse_actions(words[pos + 1:], extractor_rules)
+        words = words[:pos]
+
+    required = forbidden = 0
+    if "if" in words:
+        pos = words.index("if")
+        required, forbidden = parse_flags(words[pos + 1:], extractor_rules)
+        words = words[:pos]
+
+    return (slot, first, parse_predicate(words), required, forbidden, sets, clears, keep_case)
+
+def parse_rules(lines, filename="<rules>"):
+    """
+    Compiles the rules of every section of a rules file.
+
+    Args:
+        lines (iterable): The lines of the rules file
+        filename (str): The name of the file, used in error messages
+
+    Returns:
+        dict: The :class:`~interpreter.rules.RuleExtractor` of each section, keyed by action
+
+    Raises:
+        ValueError: If a line is not valid; the message gives the file and line number
+    """
+    extractors = {}
+    current = None
+    for line_num, line in enumerate(lines, 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        try:
+            if line.startswith("[") and line.endswith("]"):
+                current = RuleExtractor(line[1:-1].strip().lower())
+                extractors[current.action] = current
+                continue
+            if current is None:
+                raise ValueError("rule outside of a section")
+
+            words = line.split()
+            if words[0] == "include" and len(words) == 2:
+                other = extractors.get(words[1].lower())
+                if other is None or other is current:
+                    raise ValueError("unknown section '%s'" % words[1])
+                # Flags are renumbered, since both sections may use the same names for different bits
+                names = dict((bit, name) for name, bit in other.flag_names.iteritems())
+                remap = lambda mask: sum(current.flag_bit(names[bit]) for bit in names if mask & bit)
+                current.flags.extend((predicate, remap(bit)) for predicate, bit in other.flags)
+                current.rules.extend((slot, first, predicate, remap(required), remap(forbidden), remap(sets), remap(clears), keep_case)
+                                     for slot, first, predicate, required, forbidden, sets, clears, keep_case in other.rules)
+            elif words[0] == "flag" and len(words) > 3 and words[2] == "when":
+                current.flags.append((parse_predicate(words[3:]), current.flag_bit(words[1])))
+            elif len(words) > 2 and words[1] == "=":
+                current.rules.append(parse_rule(words[0], words[2:], current))
+            else:
+                raise ValueError("invalid line '%s'" % line)
+        except ValueError as err:
+            raise ValueError("%s line %d: %s" % (filename, line_num, err))
+    return extractors
+
+def load(filename):
+    """
+    Loads and compiles a rules file.
+
+    Args:
+        filename (str): The rules file
+
+    Returns:
+        dict: The :class:`~interpreter.rules.RuleExtractor` of each section, keyed by action. Empty if the file does not exist
+    """
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, "rb") as inp_file:
+        return parse_rules(inp_file, filename)
+
+rules_path = ""
+if "lili-interpreter" in os.listdir("."): # If this is true, code is being run in LSSWinRobot repo
+    rules_path = "lili-interpreter/"
+elif "source" in os.listdir("."): # If this is true, code is being run by make in Sphinx documentation generator
+    rules_path = "source/"
+
+rules_path = rules_path + "input_files/extractor_rules.txt"
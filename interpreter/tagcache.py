@@ -0,0 +1,326 @@
+"""
+A precomputed table of the tags each word of LILI's vocabulary takes, so the perceptron's context model only runs for the words that need it.
+
+The table is built offline from the word lists and from logged commands, which are tagged with the perceptron, and saved as a tab-separated file with one word per line followed by the number of times it took each tag::
+
+    python -m interpreter.tagcache --commands commands.jsonl --output input_files/tag_cache.tsv
+
+A word that (almost) always takes the same tag is tagged from the table. Every other word is tagged by the perceptron's context model, using the tags of the words before it, which is the same model the perceptron runs for every word of every sentence. The cache is used by the ``cached`` tagger backend, see :mod:`interpreter.taggers`.
+"""
+from __future__ import absolute_import
+
+import argparse
+import os
+import Queue
+import sys
+import threading
+
+import interpreter.taggers as taggers
+import interpreter.tracelog as tracelog
+
+def add_counts(distributions, word, tag, count=1):
+    """
+    Adds to the number of times a word took a tag.
+
+    Args:
+        distributions (dict): The tag counts of each word, keyed by the lowercase word
+        word (str): The word
+        tag (str): The tag
+        count (int): The number of times to add
+    """
+    word = word.lower()
+    counts = distributions.setdefault(word, {})
+    counts[tag] = counts.get(tag, 0) + count
+
+def wordlist_distributions(nouns_filename, verbs_filename):
+    """
+    Builds tag distributions from the noun and verb word lists alone.
+
+    Each word gets one count for every tag it can take according to :meth:`~interpreter.taggers.build_tag_tables`, so a word that is both a noun and a verb gets an even distribution and is left to the context model.
+
+    Args:
+        nouns_filename (str): The noun word list
+        verbs_filename (str): The verb word list
+
+    Returns:
+        dict: The tag counts of each word, keyed by the lowercase word
+    """
+    table, verb_table = taggers.build_tag_tables(nouns_filename, verbs_filename)
+    distributions = {}
+    for word, tag in table.iteritems():
+        add_counts(distributions, word, tag)
+    for word, tag in verb_table.iteritems():
+        add_counts(distributions, word, "NN")
+        add_counts(distributions, word, tag)
+    return distributions
+
+def command_distributions(sents, tagger, distributions=None, weight=10):
+    """
+    Adds the tags that a tagger gives the words of logged commands to tag distributions.
+
+    Args:
+        sents (iterable): The command sentences
+        tagger (object): The reference tagger, usually the perceptron
+        distributions (dict): The tag counts to add to, a new table if left out
+        weight (int): The number of counts each tagged word adds. Tags seen in real commands outweigh the word lists
+
+    Returns:
+        dict: The tag counts of each word, keyed by the lowercase word
+    """
+    import interpreter.nlp as nlp
+    if distributions is None:
+        distributions = {}
+    for sent in sents:
+        for word, tag in tagger.tag(nlp.tokenize(sent)):
+            add_counts(distributions, word, tag, weight)
+    return distributions
+
+def write_distributions(distributions, filename):
+    """
+    Saves tag distributions to a file. The file is written under a temporary name and renamed when it is complete.
+
+    Args:
+        distributions (dict): The tag counts of each word
+        filename (str): The file to write
+    """
+    tmp_filename = "%s.%d.tmp" % (filename, os.getpid())
+    with open(tmp_filename, "wb") as out_file:
+        for word in sorted(distributions):
+            counts = distributions[word]
+            out_file.write(word + "\t" + " ".join("%s:%d" % (tag, counts[tag]) for tag in sorted(counts)) + "\n")
+    if os.name == "nt" and os.path.exists(filename):
+        # Windows cannot rename over an existing file
+        os.remove(filename)
+    os.rename(tmp_filename, filename)
+
+def read_distributions(filename):
+    """
+    Reads tag distributions saved by :meth:`write_distributions`.
+
+    Args:
+        filename (str): The file to read
+
+    Returns:
+        dict: The tag counts of each word, keyed by the lowercase word
+    """
+    distributions = {}
+    with open(filename, "rb") as inp_file:
+        for line in inp_file:
+            line = line.rstrip("\r\n")
+            if not line:
+                continue
+            word, counts = line.split("\t", 1)
+            distributions[word] = dict((tag, int(count)) for tag, count in (pair.rsplit(":", 1) for pair in counts.split()))
+    return distributions
+
+def unambiguous_tags(distributions, threshold=0.98):
+    """
+    Picks the words that can be tagged without context.
+
+    Args:
+        distributions (dict): The tag counts of each word
+        threshold (float): The smallest share of a word's counts its most common tag must have
+
+    Returns:
+        dict: The most common tag of each unambiguous word, keyed by the lowercase word
+    """
+    tags = {}
+    for word, counts in distributions.iteritems():
+        if word in taggers.context_words:
+            continue
+        tag = max(sorted(counts), key=counts.get)
+        if counts[tag] >= threshold * sum(counts.itervalues()):
+            tags[word] = tag
+    return tags
+
+class CachedTagger:
+    """ A part of speech tagger that tags unambiguous words from a precomputed table and runs the perceptron's context model for the rest.
+
+    Unlike the :class:`~interpreter.taggers.LexiconTagger`, a sentence with an unknown word is not tagged again from scratch. Only the ambiguous and unknown words go through the perceptron's feature extraction and model, with the tags already chosen for the words before them as context.
+
+    If ``verify_every`` is set, every ``verify_every``-th sentence is also tagged by the whole perceptron to measure how often the cached tags agree with it. The check runs on a background thread, so it never adds to the time a command takes; sentences are skipped instead of queued when the checks fall behind. Checking is off by default.
+
+    Attributes:
+        tags (dict): The tag of each unambiguous word, keyed by the lowercase word
+        hits (int): The number of words tagged from the table
+        misses (int): The number of words tagged by the context model
+        checked (int): The number of cached tags compared with the perceptron
+        agreed (int): The number of compared cached tags that matched the perceptron
+        skipped (int): The number of sentences due for a check that were skipped because the checks fell behind
+    """
+    # The most sentences waiting to be checked
+    max_pending_checks = 16
+
+    def __init__(self, tags, fallback, verify_every=0):
+        """ Constructor for the :class:`~interpreter.tagcache.CachedTagger` class
+
+        Args:
+            tags (dict): The tag of each unambiguous word, keyed by the lowercase word
+            fallback (function): Returns the perceptron tagger; it is only called when a word is first missing from the table
+            verify_every (int): How many sentences to tag between accuracy checks, 0 to never check (the default)
+        """
+        self.tags = tags
+        self.fallback = fallback
+        self.verify_every = verify_every
+        self.hits = 0
+        self.misses = 0
+        self.checked = 0
+        self.agreed = 0
+        self.skipped = 0
+        self.sentences = 0
+        self._lock = threading.Lock()
+        self._checks = Queue.Queue(self.max_pending_checks)
+        self._checker = None
+
+    def tag(self, tokens):
+        """
+        Part of speech tags a list of tokens.
+
+        Args:
+            tokens (list): A list of tokens
+
+        Returns:
+            list: A list of tuples ``(token, tag)``
+        """
+        cached = [self.tags.get(token.lower()) for token in tokens]
+        misses = cached.count(None)
+        if misses:
+            output = self._tag_misses(tokens, cached)
+        else:
+            output = zip(tokens, cached)
+
+        with self._lock:
+            self.hits += len(tokens) - misses
+            self.misses += misses
+            self.sentences += 1
+            verify = self.verify_every and self.sentences % self.verify_every == 0
+        if verify:
+            self._queue_check(tokens, cached)
+        return output
+
+    def wait_for_checks(self):
+        """
+        Waits until every queued accuracy check is done, e.g. before reading :meth:`stats` in a test or evaluation.
+        """
+        self._checks.join()
+
+    def _queue_check(self, tokens, cached):
+        with self._lock:
+            if self._checker is None:
+                self._checker = threading.Thread(target=self._check_loop, name="lili-tag-cache-check")
+                self._checker.daemon = True
+                self._checker.start()
+        try:
+            self._checks.put_nowait((list(tokens), cached))
+        except Queue.Full:
+            with self._lock:
+                self.skipped += 1
+
+    def _check_loop(self):
+        while True:
+            tokens, cached = self._checks.get()
+            try:
+                self._verify(tokens, cached)
+            except Exception as err:
+                tracelog.error("tag_cache_check_failed", error=str(err))
+            finally:
+                self._checks.task_done()
+
+    def _tag_misses(self, tokens, cached):
+        tagger = self.fallback()
+        if not hasattr(tagger, "_get_features"):
+            # Not an NLTK perceptron, the whole sentence is tagged and its tags are used for the missing words
+            return [(token, tag or fallback_tag) for token, tag, (word, fallback_tag) in zip(tokens, cached, tagger.tag(tokens))]
+
+        # The same steps as PerceptronTagger.tag, but only for the words missing from the table
+        prev, prev2 = tagger.START
+        context = tagger.START + [tagger.normalize(token) for token in tokens] + tagger.END
+        output = []
+        for i, token in enumerate(tokens):
+            tag = cached[i] or tagger.tagdict.get(token)
+            if not tag:
+                tag = tagger.model.predict(tagger._get_features(i, token, context, prev, prev2))
+                if isinstance(tag, tuple):
+                    # Newer versions of NLTK return the tag and its confidence
+                    tag = tag[0]
+            output.append((token, tag))
+            prev2 = prev
+            prev = tag
+        return output
+
+    def _verify(self, tokens, cached):
+        reference = self.fallback().tag(tokens)
+        checked = 0
+        agreed = 0
+        for tag, (word, ref_tag) in zip(cached, reference):
+            if tag is not None:
+                checked += 1
+                agreed += tag == ref_tag
+        with self._lock:
+            self.checked += checked
+            self.agreed += agreed
+
+    def stats(self):
+        """
+        Summarizes how well the table is working.
+
+        Returns:
+            dict: The ``hit_rate`` (the share of words tagged from the table) and the ``accuracy`` of the checked cached tags, along with the counts they are calculated from
+        """
+        with self._lock:
+            words = self.hits + self.misses
+            return {
+                "sentences": self.sentences,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": float(self.hits) / words if words else 0.0,
+                "checked": self.checked,
+                "skipped": self.skipped,
+                "accuracy": float(self.agreed) / self.checked if self.checked else None,
+            }
+
+def load(filename=None, threshold=0.98):
+    """
+    Loads the tag table of the ``cached`` backend.
+
+    Args:
+        filename (str): The tag distributions file, defaults to the ``LILI_TAG_CACHE`` environment variable or :data:`cache_path`. If the file does not exist, the distributions are built from the word lists
+        threshold (float): See :meth:`unambiguous_tags`
+
+    Returns:
+        dict: The tag of each unambiguous word
+    """
+    filename = filename or os.environ.get("LILI_TAG_CACHE") or cache_path
+    if os.path.exists(filename):
+        distributions = read_distributions(filename)
+    else:
+        distributions = wordlist_distributions(taggers.nouns_path, taggers.verbs_path)
+    return unambiguous_tags(distributions, threshold)
+
+def main(argv=None):
+    import interpreter.batch as batch
+    import interpreter.nlp as nlp
+
+    parser = argparse.ArgumentParser(description="Build the tag distributions file of the cached tagger backend")
+    parser.add_argument("--commands", action="append", default=[], help="file of logged commands, plain or JSON lines as read by interpreter.batch, may be repeated")
+    parser.add_argument("--output", default=cache_path, help="file to write the tag distributions to (default %s)" % cache_path)
+    args = parser.parse_args(argv)
+
+    distributions = wordlist_distributions(taggers.nouns_path, taggers.verbs_path)
+    for filename in args.commands:
+        with open(filename, "rb") as inp_file:
+            sents = [text for text, record_id in batch.read_items(inp_file)]
+        command_distributions(sents, nlp.get("tagger"), distributions)
+    write_distributions(distributions, args.output)
+    sys.stderr.write("%d words, %d unambiguous\n" % (len(distributions), len(unambiguous_tags(distributions))))
+
+cache_path = ""
+if "lili-interpreter" in os.listdir("."): # If this is true, code is being run in LSSWinRobot repo
+    cache_path = "lili-interpreter/"
+elif "source" in os.listdir("."): # If this is true, code is being run by make in Sphinx documentation generator
+    cache_path = "source/"
+
+cache_path = cache_path + "input_files/tag_cache.tsv"
+
+if __name__ == "__main__":
+    main()
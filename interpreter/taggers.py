@@ -0,0 +1,249 @@
+"""
+Part of speech tagger backends for :meth:`~interpreter.nlp.pos_tag`.
+
+A backend is any object with a ``tag(tokens)`` method that returns a list of ``(token, tag)`` tuples, like the NLTK taggers. The backend in use is chosen with :meth:`~interpreter.nlp.set_tagger_backend` or the ``LILI_TAGGER`` environment variable:
+
+* ``perceptron`` - NLTK's averaged perceptron tagger, the same tagger as ``nltk.pos_tag`` (the default)
+* ``lexicon`` - a :class:`~interpreter.taggers.LexiconTagger` that looks words up in a table built from the word lists and only runs the perceptron for sentences with words it does not know
+* ``cached`` - a :class:`~interpreter.tagcache.CachedTagger` that tags unambiguous words from precomputed tag distributions and only runs the perceptron's context model for the other words
+
+The ``lexicon`` and ``cached`` backends can only be enabled once ``python -m benchmarks.eval_tagger --backend NAME --record`` has confirmed that they give the same interpreter results as the perceptron on our corpora. The result is recorded in :data:`evaluations_path`, see :meth:`passed_evaluation`.
+"""
+import json
+import os
+
+# Words outside the noun and verb lists that always take the same tag in commands, with the tags the perceptron gives them
+# Words that the perceptron tags differently depending on context (e.g. "that", "her", "up") are left out on purpose
+closed_class_tags = {
+    "a": "DT", "an": "DT", "the": "DT", "this": "DT", "these": "DT", "those": "DT", "every": "DT", "each": "DT", "some": "DT",
+    "to": "TO",
+    "of": "IN", "in": "IN", "on": "IN", "at": "IN", "with": "IN", "about": "IN", "into": "IN", "from": "IN", "for": "IN",
+    "by": "IN", "through": "IN", "towards": "IN", "toward": "IN", "when": "WRB",
+    "i": "PRP", "me": "PRP", "you": "PRP", "him": "PRP", "it": "PRP", "us": "PRP", "them": "PRP", "we": "PRP", "they": "PRP",
+    "my": "PRP$", "your": "PRP$", "his": "PRP$", "our": "PRP$", "their": "PRP$",
+    "and": "CC", "or": "CC", "but": "CC",
+    "how": "WRB", "where": "WRB", "what": "WP", "who": "WP",
+    "is": "VBZ", "are": "VBP", "not": "RB", "now": "RB",
+    ".": ".", "?": ".", "!": ".", ",": ",", ":": ":", ";": ":",
+}
+
+# Words whose tag the move and turn extractors depend on, which are always left to the perceptron
+context_words = frozenset(["left", "right", "up", "down", "forward", "backward", "around", "back"])
+
+def read_wordlist(filename):
+    """
+    Reads a word list file with one word per line.
+
+    Args:
+        filename (str): The word list file
+
+    Returns:
+        set: The lowercase words of the file; multi-word entries are left out
+    """
+    words = set()
+    with open(filename, "rb") as inp_file:
+        for line in inp_file:
+            word = line.strip().lower()
+            if word and " " not in word:
+                words.add(word)
+    return words
+
+def plural(noun):
+    """
+    Forms the regular plural of a noun.
+
+    Args:
+        noun (str): A singular noun
+
+    Returns:
+        str: The plural
+    """
+    if noun.endswith(("s", "x", "z", "ch", "sh")):
+        return noun + "es"
+    if noun.endswith("y") and noun[-2:-1] not in "aeiou":
+        return noun[:-1] + "ies"
+    return noun + "s"
+
+def verb_tags(verbs):
+    """
+    Tags each form in a list of verb forms, based on the other forms of the same verb in the list.
+
+    A form is tagged ``"VBG"`` if it is the *-ing* form of another form in the list, ``"VBZ"`` if it is the *-s* form of another form, and ``"VB"`` if it is neither and another form of it is in the list. Past forms cannot be told apart from past participles without context, so they are left out.
+
+    Args:
+        verbs (set): The lowercase verb forms
+
+    Returns:
+        dict: The tag of each verb form that could be tagged
+    """
+    tags = {}
+    for verb in verbs:
+        if verb.endswith("ing") and (verb[:-3] in verbs or verb[:-3] + "e" in verbs or verb[:-4] in verbs):
+            tags[verb] = "VBG"
+        elif verb.endswith("s") and (verb[:-1] in verbs or (verb.endswith("es") and verb[:-2] in verbs) or (verb.endswith("ies") and verb[:-3] + "y" in verbs)):
+            tags[verb] = "VBZ"
+        elif verb.endswith("ed"):
+            continue
+        elif verb + "s" in verbs or verb + "es" in verbs or verb + "ing" in verbs or verb[:-1] + "ing" in verbs:
+            tags[verb] = "VB"
+    return tags
+
+def build_tag_tables(nouns_filename, verbs_filename):
+    """
+    Builds the tables of the :class:`~interpreter.taggers.LexiconTagger` from the noun and verb word lists.
+
+    Nouns and their regular plurals are tagged ``"NN"`` and ``"NNS"``, verb forms are tagged by :meth:`verb_tags` and every word of :data:`closed_class_tags` gets its listed tag. Words that are both nouns and verbs, like *walk*, can take either tag. They are left out of the main table, and those with a base verb form are put in a second table that is only used where a command can only have a verb.
+
+    Args:
+        nouns_filename (str): The noun word list
+        verbs_filename (str): The verb word list
+
+    Returns:
+        (dict, dict): The tag of each unambiguous word and the verb tag of each ambiguous word, both keyed by the lowercase word
+    """
+    nouns = read_wordlist(nouns_filename)
+    verbs = read_wordlist(verbs_filename)
+    tagged_verbs = verb_tags(verbs)
+
+    table = {}
+    for noun in nouns:
+        table[noun] = "NN"
+        table.setdefault(plural(noun), "NNS")
+    table.update(tagged_verbs)
+
+    # A word in both lists, in any form, is ambiguous
+    verb_table = {}
+    for noun in nouns:
+        for word in (noun, plural(noun)):
+            if word in verbs:
+                table.pop(word, None)
+                if tagged_verbs.get(word) == "VB":
+                    verb_table[word] = "VB"
+    for word in context_words:
+        table.pop(word, None)
+        verb_table.pop(word, None)
+
+    table.update(closed_class_tags)
+    return (table, verb_table)
+
+class LexiconTagger:
+    """ A part of speech tagger that looks words up in a table and falls back to another tagger for the words it does not know.
+
+    Commands use a small vocabulary, so most sentences only contain words from the table, and tagging them is a dictionary lookup per word. Words that can be either a noun or a verb, like most actions, are tagged as verbs where a command can only have a verb: as its first word, which is the action of an imperative, and right after *to*. If a sentence has any word that cannot be tagged this way, the fallback tagger tags the whole sentence, since the tag of an unknown word depends on its neighbours, and only its tags for the unknown words are used.
+
+    Attributes:
+        table (dict): The tag of each unambiguous word, keyed by the lowercase word
+        verb_table (dict): The verb tag of each word that can also be a noun, keyed by the lowercase word
+        hits (int): The number of sentences tagged from the table alone
+        fallbacks (int): The number of sentences that needed the fallback tagger
+    """
+    def __init__(self, table, fallback, verb_table=None):
+        """ Constructor for the :class:`~interpreter.taggers.LexiconTagger` class
+
+        Args:
+            table (dict): The tag of each unambiguous word, keyed by the lowercase word
+            fallback (function): Returns the tagger used for sentences with unknown words; it is only called when such a sentence is first tagged
+            verb_table (dict): The verb tag of each word that can also be a noun, keyed by the lowercase word
+        """
+        self.table = table
+        self.verb_table = verb_table or {}
+        self.fallback = fallback
+        self.hits = 0
+        self.fallbacks = 0
+
+    def tag(self, tokens):
+        """
+        Part of speech tags a list of tokens.
+
+        Args:
+            tokens (list): A list of tokens
+
+        Returns:
+            list: A list of tuples ``(token, tag)``
+        """
+        table = self.table
+        tags = []
+        prev_tag = None
+        for token in tokens:
+            word = token.lower()
+            tag = table.get(word)
+            if tag is None and (prev_tag is None or prev_tag == "TO"):
+                tag = self.verb_table.get(word)
+            tags.append(tag)
+            # After an unknown word, the words that follow it are only looked up in the main table
+            prev_tag = tag or "?"
+        if None not in tags:
+            self.hits += 1
+            return zip(tokens, tags)
+
+        self.fallbacks += 1
+        fallback_tags = self.fallback().tag(tokens)
+        return [(token, tag if tag is not None else fallback_tag[1]) for token, tag, fallback_tag in zip(tokens, tags, fallback_tags)]
+
+def read_evaluations(filename=None):
+    """
+    Reads the recorded results of ``benchmarks.eval_tagger``.
+
+    Args:
+        filename (str): The file of results, defaults to :data:`evaluations_path`
+
+    Returns:
+        dict: The last result of each backend, keyed by the backend's name. Empty if nothing has been recorded
+    """
+    filename = filename or evaluations_path
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, "rb") as inp_file:
+        return json.load(inp_file)
+
+def record_evaluation(result, filename=None):
+    """
+    Records the result of ``benchmarks.eval_tagger`` for a backend, replacing its earlier result. The file is written under a temporary name and renamed when it is complete.
+
+    Args:
+        result (dict): The result, with the ``backend``'s name, the number of ``sentences``, the ``tag_accuracy`` and the number of ``mismatches`` between interpreter results
+        filename (str): The file of results, defaults to :data:`evaluations_path`
+    """
+    filename = filename or evaluations_path
+    evaluations = read_evaluations(filename)
+    evaluations[result["backend"]] = result
+    tmp_filename = "%s.%d.tmp" % (filename, os.getpid())
+    with open(tmp_filename, "wb") as out_file:
+        json.dump(evaluations, out_file, indent=2, sort_keys=True)
+        out_file.write("\n")
+    if os.name == "nt" and os.path.exists(filename):
+        # Windows cannot rename over an existing file
+        os.remove(filename)
+    os.rename(tmp_filename, filename)
+
+def passed_evaluation(name, filename=None):
+    """
+    Gets the recorded result of a backend if it passed, i.e. every interpreter result was the same as the perceptron's.
+
+    Args:
+        name (str): The name of the backend
+        filename (str): The file of results, defaults to :data:`evaluations_path`
+
+    Returns:
+        dict: The recorded result, ``None`` if there is none or the backend did not pass
+    """
+    result = read_evaluations(filename).get(name)
+    if result is None or result.get("mismatches") != 0 or not result.get("sentences"):
+        return None
+    return result
+
+nouns_path = ""
+verbs_path = ""
+evaluations_path = ""
+if "lili-interpreter" in os.listdir("."): # If this is true, code is being run in LSSWinRobot repo
+    nouns_path = "lili-interpreter/"
+    verbs_path = "lili-interpreter/"
+    evaluations_path = "lili-interpreter/"
+elif "source" in os.listdir("."): # If this is true, code is being run by make in Sphinx documentation generator
+    nouns_path = "source/"
+    verbs_path = "source/"
+    evaluations_path = "source/"
+
+nouns_path = nouns_path + "input_files/wordlists/nouns.txt"
+verbs_path = verbs_path + "input_files/wordlists/verbs.txt"
+evaluations_path = evaluations_path + "input_files/tagger_evaluations.json"
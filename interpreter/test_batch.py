@@ -0,0 +1,48 @@
+import json
+import StringIO
+import batch
+
+def fake_interpret(text):
+    return {"action": text.split()[0].lower()}
+
+def run_batch(monkeypatch, text, workers):
+    monkeypatch.setattr(batch.interp, "interpret_sent", fake_interpret)
+    out = StringIO.StringIO()
+    count = batch.run(StringIO.StringIO(text), out, workers, window=3, chunk_size=4)
+    return count, [json.loads(line) for line in out.getvalue().splitlines()]
+
+def test_parse_line():
+    assert batch.parse_line("Stop\n") == ("Stop", None)
+    assert batch.parse_line('{"id": 7, "text": "Follow me"}') == ("Follow me", 7)
+    assert batch.parse_line('{"request_id": "a", "command": "Stop"}') == ("Stop", "a")
+    assert batch.parse_line("   \n") == (None, None)
+
+def test_non_ascii_json_line(monkeypatch):
+    assert batch.parse_line('{"text": "Move to the caf\\u00e9"}') == ("Move to the caf\xc3\xa9", None)
+    # JSON and plain commands are interpreted the same way
+    count, res = run_batch(monkeypatch, '{"id": 1, "text": "Caf\\u00e9 now"}\nCaf\xc3\xa9 now\n', 1)
+    assert [r["result"] for r in res] == [{"action": u"caf\xe9"}, {"action": u"caf\xe9"}]
+    assert res[0]["text"] == res[1]["text"] == u"Caf\xe9 now"
+
+def test_invalid_utf8_line(monkeypatch):
+    assert batch.parse_line("\xff\xfe turn\n") == ("\xef\xbf\xbd\xef\xbf\xbd turn", None)
+    # One bad line does not stop the lines after it
+    count, res = run_batch(monkeypatch, "move left\n\xff\xfe turn\nstop\n", 1)
+    assert count == 3
+    assert [r["text"] for r in res] == ["move left", u"\ufffd\ufffd turn", "stop"]
+
+def test_run(monkeypatch):
+    count, res = run_batch(monkeypatch, 'Stop\n\n{"id": 2, "text": "Move left"}\n', 1)
+    assert count == 2
+    assert res == [{"text": "Stop", "result": {"action": "stop"}}, {"id": 2, "text": "Move left", "result": {"action": "move"}}]
+
+def test_exception_is_reported(monkeypatch):
+    count, res = run_batch(monkeypatch, '{"id": 1}\n', 1)
+    assert res[0]["id"] == 1
+    assert res[0]["exception"].startswith("IndexError")
+
+def test_workers_keep_order(monkeypatch):
+    text = "".join("Word%d now\n" % i for i in range(50))
+    count, res = run_batch(monkeypatch, text, 3)
+    assert count == 50
+    assert [r["result"]["action"] for r in res] == ["word%d" % i for i in range(50)]
@@ -0,0 +1,78 @@
+import time
+import channel
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+def test_coalesces_queued_commands():
+    written = []
+    chan = channel.CommandChannel(written.append, acks=False)
+    assert chan.send("follow")
+    assert chan.send("leftWave")
+    # Replaces the left wave, then is repeated
+    assert chan.send("rightWave")
+    assert not chan.send("rightWave")
+    assert chan.send("turnAround")
+    assert chan.send("stop")
+    assert chan.send("stop")
+    assert chan.send("leftWave")
+    assert chan.pump() == 2
+    # Written in a single write without sequence numbers
+    assert written == ["stop\nleftWave\n"]
+    stats = chan.stats()
+    assert (stats["queued"], stats["coalesced"], stats["sent"], stats["writes"]) == (8, 6, 2, 1)
+
+def test_acknowledged():
+    master = channel.LocalMasterControl()
+    chan = channel.CommandChannel(master.write, max_in_flight=2)
+    master.attach(chan)
+    for command in ["follow", "turnAround", "leftWave"]:
+        chan.send(command)
+    # Only two commands can be waiting for an acknowledgement at once
+    assert chan.pump() == 2
+    assert chan.flush(timeout=5)
+    chan.send("stop")
+    assert chan.flush(timeout=5)
+    assert master.commands == ["follow", "turnAround", "leftWave", "stop"]
+    assert chan.stats()["acked"] == 4
+    assert chan.latency.count == 4
+
+def test_resends_unacknowledged():
+    master = channel.LocalMasterControl(drop_acks=[1])
+    chan = channel.CommandChannel(master.write, ack_timeout=0.05)
+    master.attach(chan)
+    chan.send("follow")
+    chan.send("turnAround")
+    assert chan.flush(timeout=5)
+    # The first command arrived, only its acknowledgement was lost, so it is not carried out twice
+    assert master.commands == ["follow", "turnAround"]
+    assert wait_until(master.idle)
+    assert (chan.resent, master.duplicates, chan.acked) == (1, 1, 2)
+
+def test_stop_cancels_unacknowledged_commands():
+    written = []
+    chan = channel.CommandChannel(written.append, ack_timeout=0.01)
+    chan.send("leftWave")
+    chan.pump()
+    chan.send("stop")
+    chan.pump()
+    assert chan.on_line("ack 2")
+    time.sleep(0.02)
+    chan.pump()
+    # The wave is not resent after the stop, even though it was never acknowledged
+    assert written == ["leftWave 1\n", "stop 2\n"]
+    assert chan.pending() == 0
+    assert not chan.on_line("ack 1")
+
+def test_gives_up():
+    written = []
+    chan = channel.CommandChannel(written.append, ack_timeout=0.0, max_retries=2)
+    chan.send("stop")
+    for i in range(4):
+        chan.pump()
+    assert written == ["stop 1\n"] * 3
+    assert (chan.lost, chan.pending()) == (1, 0)
+    assert not chan.on_line("ack 1")
@@ -0,0 +1,17 @@
+import os
+import extractor
+
+known_words_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "input_files", "known_words")
+
+def test_shown_index_objects():
+    shown_index = extractor.build_shown_index(os.path.join(known_words_dir, "shown_objects_small.txt"))
+    assert extractor.resolve_shown_word("hands", shown_index) == "hand"
+    assert extractor.resolve_shown_word("kittens", shown_index) == "cat"
+    assert extractor.resolve_shown_word("motorcar", shown_index) == "car"
+    assert extractor.resolve_shown_word("tennis", shown_index) == "tennis"
+
+def test_shown_index_actions():
+    shown_index = extractor.build_shown_index(os.path.join(known_words_dir, "known_shown_actions_small.txt"))
+    assert extractor.resolve_shown_word("washing", shown_index) == "wash"
+    assert extractor.resolve_shown_word("rinsed", shown_index) == "wash"
+    assert extractor.resolve_shown_word("kicks", shown_index) == "kick"
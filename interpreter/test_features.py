@@ -0,0 +1,36 @@
+import extractor
+import features
+
+def test_encode():
+    sent = features.encode([("Move", "VB"), ("to", "TO"), ("the", "DT"), ("LEFT", "NN"), ("about", "IN")])
+    assert sent.words == ["move", "to", "the", "left", "about"]
+    assert list(sent.tag_ids) == [features.tag_ids[tag] for tag in ("VB", "TO", "DT", "NN", "IN")]
+    assert sent.bits[0] == features.VB
+    assert sent.bits[1] == features.TO | features.PREPOSITION
+    assert sent.bits[3] == features.NOUN | features.DIRECTION | features.DIRECTION_TAG
+    assert sent.bits[4] & features.ABOUT
+    assert features.encode(sent) is sent
+
+def test_encoded_sentence_acts_like_a_list():
+    tagged = [("Move", "VB"), ("to", "TO"), ("the", "DT"), ("kitchen", "NN")]
+    sent = features.encode(tagged)
+    assert list(sent) == tagged
+    assert sent[0] == ("Move", "VB")
+    assert len(sent) == 4
+    trimmed = sent[1:]
+    assert trimmed == tagged[1:]
+    assert trimmed.words == ["to", "the", "kitchen"]
+    assert list(trimmed.bits) == list(sent.bits[1:])
+
+def test_new_tags():
+    assert features.token_bits("x", "NNX") == features.NOUN
+    assert extractor.is_noun("NNX")
+    assert extractor.is_preposition("IN")
+    assert not extractor.is_noun("VB")
+    assert extractor.is_direction("Forward")
+
+def test_extractors_accept_both():
+    tagged = [("with", "IN"), ("Brandon", "NNP"), ("about", "IN"), ("computers", "NNS")]
+    expected = {"person": "brandon", "topic": "computers"}
+    assert extractor.object_dict_talk(tagged) == expected
+    assert extractor.object_dict_talk(features.encode(tagged)) == expected
@@ -0,0 +1,46 @@
+import incremental
+
+# Tags given to the tokens by the stand-in tagger, since the tests do not depend on the NLTK models
+tags = {"to": "TO", "the": "DT", "kitchen": "NN", "left": "VBD", "lily": "NN", "now": "RB", "please": "VB"}
+
+def fake_pos_tag(tokens):
+    return [(token, tags.get(token.lower(), "NN")) for token in tokens]
+
+def test_stop_is_dispatched_early(monkeypatch):
+    monkeypatch.setattr(incremental.interpreter.nlp, "pos_tag", fake_pos_tag)
+    dispatched = []
+    inc = incremental.IncrementalInterpreter(on_dispatch=dispatched.append)
+    assert inc.feed("Lily") is None
+    assert inc.feed("stop") == {"action": "stop"}
+    assert dispatched == [{"action": "stop"}]
+    # Later tokens do not dispatch the command again
+    assert inc.feed("now") is None
+    assert inc.finish() == {"action": "stop"}
+    assert inc.dispatched == {"action": "stop"}
+    assert len(dispatched) == 1
+
+def test_objects_wait_for_the_end(monkeypatch):
+    monkeypatch.setattr(incremental.interpreter.nlp, "pos_tag", fake_pos_tag)
+    dispatched = []
+    inc = incremental.IncrementalInterpreter(on_dispatch=dispatched.append)
+    for token in ["move", "to", "the", "kitchen"]:
+        assert inc.feed(token) is None
+    assert inc.action_tuple == (0, 0)
+    assert inc.finish() == {"action": "move", "place": "kitchen"}
+    assert inc.dispatched is None
+    assert dispatched == []
+
+def test_turn_keeps_its_objects(monkeypatch):
+    monkeypatch.setattr(incremental.interpreter.nlp, "pos_tag", fake_pos_tag)
+    res = []
+    assert incremental.interpret_stream(["please", "rotate", "left"], on_dispatch=res.append) == {"action": "turn", "direction": "left"}
+    assert res == [{"action": "turn"}]
+
+def test_unknown_command():
+    inc = incremental.IncrementalInterpreter()
+    for token in ["blorg", "me"]:
+        inc.feed(token)
+    assert inc.finish() == {"error": "Main action not found"}
+    # The interpreter is ready for the next command
+    assert inc.tokens == []
+    assert inc.feed("stop") == {"action": "stop"}
@@ -0,0 +1,107 @@
+import lexicon
+
+def build():
+    return lexicon.Lexicon([("move", 0), ("go", 0), ("turn", 1), ("twist", 1), ("go", 1), ("stop", 2)], ["move", "turn", "stop"])
+
+def test_lookup():
+    lex = build()
+    assert lex.lookup("go") == 0
+    assert lex.lookup("twist") == 1
+    assert lex.lookup("stop") == 2
+    assert lex.first_word(lex.lookup("twist")) == "turn"
+
+def test_missing_word():
+    lex = build()
+    assert lex.lookup("blorg") == -1
+    assert lex.lookup("") == -1
+    assert "blorg" not in lex
+
+def test_first_set_index_kept():
+    lex = build()
+    assert len(lex) == 5
+    assert lex.lookup("go") == 0
+
+def test_items():
+    assert build().items() == [("go", 0), ("move", 0), ("stop", 2), ("turn", 1), ("twist", 1)]
+
+def test_many_words():
+    pairs = [("word%d" % i, i % 7) for i in range(5000)]
+    lex = lexicon.Lexicon(pairs)
+    assert all(lex.lookup(word) == set_index for word, set_index in pairs)
+    assert lex.lookup("word5000") == -1
+
+def test_compiled(tmpdir):
+    lex = build()
+    filename = str(tmpdir.join("actions.lex"))
+    lexicon.write_compiled(lex, filename)
+    mapped = lexicon.MappedLexicon(filename)
+    assert len(mapped) == len(lex)
+    assert mapped.items() == lex.items()
+    assert mapped.first_words == ["move", "turn", "stop"]
+    assert mapped.lookup("twist") == 1
+    assert mapped.lookup("blorg") == -1
+    mapped.close()
+
+def test_load_compiles_once(tmpdir):
+    source = tmpdir.join("known_actions.txt")
+    source.write("move,go\nturn\n")
+    builds = []
+    def build_from(filename):
+        builds.append(filename)
+        return lexicon.Lexicon([("move", 0), ("go", 0), ("turn", 1)], ["move", "turn"])
+
+    first = lexicon.load(str(source), build_from, "actions", str(tmpdir))
+    second = lexicon.load(str(source), build_from, "actions", str(tmpdir))
+    assert isinstance(second, lexicon.MappedLexicon)
+    assert second.lookup("go") == 0
+    assert len(builds) == 1
+
+    # Changing the known words file makes the compiled copy out of date
+    source.write("move,go\nturn,twist\n")
+    lexicon.load(str(source), build_from, "actions", str(tmpdir))
+    assert len(builds) == 2
+
+def test_unicode_words(tmpdir):
+    lex = lexicon.Lexicon([("move", 0), (u"caf\xe9", 1)], ["move", u"caf\xe9"])
+    assert lex.lookup(u"caf\xe9") == 1
+    assert lex.lookup("caf\xc3\xa9") == 1
+    assert lex.lookup(u"move") == 0
+    assert lex.lookup(u"na\xefve") == -1
+    filename = str(tmpdir.join("actions.lex"))
+    lexicon.write_compiled(lex, filename)
+    mapped = lexicon.MappedLexicon(filename)
+    assert mapped.lookup(u"caf\xe9") == 1
+    assert mapped.lookup(u"na\xefve") == -1
+    # Both kinds of lexicon give first words as UTF-8 bytes
+    assert mapped.first_words == lex.first_words == ["move", "caf\xc3\xa9"]
+    assert mapped.first_word(1) == lex.first_word(1)
+    mapped.close()
+
+def test_too_many_sets(tmpdir):
+    try:
+        lexicon.Lexicon([("word", lexicon.max_sets)])
+        assert False
+    except ValueError:
+        pass
+    lex = build()
+    lex.first_words = ["word%d" % i for i in range(lexicon.max_sets + 1)]
+    try:
+        lexicon.write_compiled(lex, str(tmpdir.join("actions.lex")))
+        assert False
+    except ValueError:
+        pass
+
+def test_load_checks_key(tmpdir):
+    source = tmpdir.join("known_actions.txt")
+    source.write("move,go\nturn\n")
+    builds = []
+    def build_from(filename):
+        builds.append(filename)
+        return build()
+
+    lexicon.load(str(source), build_from, "actions", str(tmpdir), key="turn")
+    assert isinstance(lexicon.load(str(source), build_from, "actions", str(tmpdir), key="turn"), lexicon.MappedLexicon)
+    assert len(builds) == 1
+    # A different key makes the compiled copy out of date even though the file is the same
+    lexicon.load(str(source), build_from, "actions", str(tmpdir), key="pick,turn")
+    assert len(builds) == 2
@@ -0,0 +1,112 @@
+import math
+import struct
+import time
+import wave
+import listener
+
+rate = 16000
+
+def write_wav(filename, segments):
+    # Each segment is (seconds, amplitude); speech is stood in for by a 440 Hz tone, background noise by a quiet tone
+    samples = []
+    for seconds, amplitude in segments:
+        samples.extend(int(amplitude * math.sin(2 * math.pi * 440 * i / rate)) for i in range(int(seconds * rate)))
+    wav = wave.open(filename, "wb")
+    wav.setnchannels(1)
+    wav.setsampwidth(2)
+    wav.setframerate(rate)
+    wav.writeframes(struct.pack("<%dh" % len(samples), *samples))
+    wav.close()
+
+def utterances(filename, **kwargs):
+    # Files are read faster than they are taken from the queue, so every utterance is kept
+    kwargs.setdefault("max_queued", 0)
+    background = listener.BackgroundListener(listener.FileAudioSource(filename, chunk=512), **kwargs).start()
+    res = []
+    while True:
+        utterance = background.get(timeout=10)
+        if utterance is None:
+            break
+        res.append(utterance)
+    background.stop()
+    return background, res
+
+def test_file_source(tmpdir):
+    filename = str(tmpdir.join("tone.wav"))
+    write_wav(filename, [(0.5, 1000)])
+    with listener.FileAudioSource(filename, chunk=1000) as source:
+        assert (source.SAMPLE_RATE, source.SAMPLE_WIDTH) == (rate, 2)
+        assert len(source.stream.read(1000)) == 2000
+        while source.stream.read(1000):
+            pass
+        assert source.stream.read(1000) == ""
+
+def test_detects_utterances(tmpdir):
+    filename = str(tmpdir.join("commands.wav"))
+    write_wav(filename, [(1.0, 100), (0.6, 8000), (1.2, 100), (1.0, 8000), (1.2, 100)])
+    background, res = utterances(filename, recalibrate_interval=0)
+    assert len(res) == 2
+    # Each utterance holds the speech, the pre-roll and the pause that ended it
+    assert 1.4 < res[0].duration() < 1.9
+    assert 1.8 < res[1].duration() < 2.3
+    assert background.calibrations == 1
+    # Calibrated from the background noise, not left at its lowest value
+    assert background.energy_threshold > 100
+
+def test_phrase_limit(tmpdir):
+    filename = str(tmpdir.join("long.wav"))
+    write_wav(filename, [(1.0, 100), (3.0, 8000)])
+    background, res = utterances(filename, phrase_limit=1.0, recalibrate_interval=0)
+    # The speech is split into utterances of at most a second, the last one is what was left when the file ended
+    assert [round(utterance.duration()) for utterance in res[:3]] == [1, 1, 1]
+    assert all(utterance.duration() <= 1.0 for utterance in res)
+
+def test_recalibrates(tmpdir):
+    filename = str(tmpdir.join("noise.wav"))
+    write_wav(filename, [(1.0, 500)])
+    background = listener.BackgroundListener(listener.FileAudioSource(filename, chunk=512, loop=True), min_threshold=0, recalibrate_interval=0.05).start()
+    try:
+        for i in range(100):
+            if background.calibrations > 2:
+                break
+            background._stopped.wait(0.05)
+        assert background.calibrations > 2
+    finally:
+        background.stop()
+
+def heard(filename, **kwargs):
+    # Listens to the whole file before any utterance is taken, like audio captured while a command runs
+    background = listener.BackgroundListener(listener.FileAudioSource(filename, chunk=512), recalibrate_interval=0, **kwargs).start()
+    background._threads[0].join()
+    return background
+
+def test_queue_keeps_newest(tmpdir):
+    filename = str(tmpdir.join("commands.wav"))
+    write_wav(filename, [(1.0, 100)] + [(0.4, 8000), (1.0, 100)] * 4)
+    background = heard(filename, max_queued=2)
+    assert background.utterances == 4
+    assert background.dropped == 2
+    # The end of the source does not push out either of the last two utterances
+    assert background.get(timeout=1) is not None
+    assert background.get(timeout=1) is not None
+    assert background.get(timeout=1) is None
+
+def test_drain(tmpdir):
+    filename = str(tmpdir.join("commands.wav"))
+    write_wav(filename, [(1.0, 100), (0.4, 8000), (1.0, 100), (0.4, 8000), (1.0, 100)])
+    background = heard(filename)
+    assert background.drain() == 2
+    assert background.dropped == 2
+    # The end of the source is still reported after draining
+    assert background.get(timeout=1) is None
+
+def test_drain_drops_utterance_being_heard(tmpdir):
+    filename = str(tmpdir.join("command.wav"))
+    write_wav(filename, [(1.0, 100), (0.4, 8000), (1.0, 100)])
+    background = listener.BackgroundListener(listener.FileAudioSource(filename, chunk=512), recalibrate_interval=0)
+    # Stands in for an utterance that started before the drain and was put in the queue after it
+    background.drain()
+    background.queue.put(listener.Utterance("\0\0", rate, 2, time.time() - 1.0))
+    background.queue.put(listener.Utterance("\0\0", rate, 2, time.time() + 1.0))
+    assert background.get(timeout=1).started > background._drained_at
+    assert background.dropped == 1
@@ -0,0 +1,63 @@
+import urllib2
+import metrics
+
+def test_quantiles():
+    hist = metrics.Histogram(100)
+    for i in range(1, 101):
+        hist.observe(i / 1000.0)
+    assert hist.count == 100
+    assert hist.quantiles((0.5, 0.95, 0.99)) == [0.051, 0.096, 0.1]
+
+def test_window_keeps_recent_samples():
+    hist = metrics.Histogram(10)
+    for i in range(100):
+        hist.observe(float(i))
+    assert hist.quantile(0.0) == 90.0
+    assert hist.total == sum(range(100))
+
+def test_disabled_is_noop():
+    metrics.reset()
+    metrics.enable(False)
+    assert metrics.start() is None
+    assert metrics.observe("tokenize", metrics.start()) is None
+    assert metrics.summary() == {}
+
+def test_export():
+    metrics.reset()
+    metrics.enable()
+    try:
+        metrics.observe("pos_tag", metrics.start())
+        text = metrics.export_text()
+        assert '# TYPE lili_stage_latency_seconds summary' in text
+        assert 'lili_stage_latency_seconds{stage="pos_tag",quantile="0.99"}' in text
+        assert 'lili_stage_latency_seconds_count{stage="pos_tag"} 1' in text
+
+        assert metrics.substage_metric_name not in text
+
+        server = metrics.serve(0)
+        url = "http://127.0.0.1:%d/metrics" % server.server_address[1]
+        assert urllib2.urlopen(url).read() == metrics.export_text()
+        server.shutdown()
+    finally:
+        metrics.enable(False)
+        metrics.reset()
+
+def test_substage_exported_separately():
+    metrics.reset()
+    metrics.enable()
+    try:
+        started = metrics.start()
+        metrics.observe("extractor.show_resolution", metrics.start())
+        metrics.observe("extractor", started)
+        summary = metrics.summary()
+        assert "parent" not in summary["extractor"]
+        assert summary["extractor.show_resolution"]["parent"] == "extractor"
+
+        # Summing the stage metric counts the extractor's time once
+        text = metrics.export_text()
+        assert 'lili_stage_latency_seconds_count{stage="extractor"} 1' in text
+        assert 'show_resolution' not in "".join(line for line in text.splitlines() if line.startswith("lili_stage_latency_seconds"))
+        assert 'lili_substage_latency_seconds_count{stage="extractor",substage="show_resolution"} 1' in text
+    finally:
+        metrics.enable(False)
+        metrics.reset()
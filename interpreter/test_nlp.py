@@ -0,0 +1,19 @@
+import os
+import subprocess
+import sys
+import nlp
+
+def test_import_does_not_load_nltk():
+    code = "import sys, interpreter.interpreter; print('nltk' in sys.modules)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.check_output([sys.executable, "-c", code], cwd=root).strip() == "False"
+
+def test_shared_stemmer():
+    assert nlp.stemmer() is nlp.stemmer()
+    assert nlp.is_loaded("stemmer")
+    assert nlp.stemmer().stem("hands") == "hand"
+
+def test_warm_up_in_background():
+    thread = nlp.warm_up()
+    thread.join()
+    assert nlp.is_loaded("stemmer")
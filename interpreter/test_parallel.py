@@ -0,0 +1,17 @@
+import parallel
+
+def square(x):
+    return x * x
+
+def test_chunked():
+    assert list(parallel.chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(parallel.chunked([], 3)) == []
+
+def test_imap_ordered():
+    res = parallel.imap_ordered(square, xrange(1000), workers=3, chunk_size=7, window=2, initializer=None)
+    assert list(res) == [x * x for x in range(1000)]
+
+def test_stop_early():
+    res = parallel.imap_ordered(square, xrange(1000), workers=2, chunk_size=5, initializer=None)
+    assert next(res) == 0
+    res.close()
@@ -0,0 +1,52 @@
+import time
+import channel
+import pump
+
+def make_pump(peer, on_line, **kwargs):
+    return pump.MessagePump(peer.executor_in, peer.executor_out, on_line, channel.CommandChannel(None, **kwargs))
+
+def test_waits_for_start():
+    peer = pump.PipePeer()
+    received = []
+    msg_pump = make_pump(peer, received.append)
+    peer.send_line("hello")
+    peer.send_line("start")
+    assert msg_pump.run_until(lambda: "start" in received, timeout=5)
+    assert received == ["hello", "start"]
+
+def test_sends_queued_commands():
+    peer = pump.PipePeer()
+    msg_pump = make_pump(peer, lambda line: None).start()
+    try:
+        # Queueing the commands wakes the pump, which writes them and handles their acknowledgements
+        msg_pump.channel.send("follow")
+        msg_pump.channel.send("turnAround")
+        assert peer.wait_for(2)
+        assert [line for received_at, line in peer.received] == ["follow 1", "turnAround 2"]
+        assert msg_pump.channel.flush(timeout=5)
+    finally:
+        msg_pump.close()
+
+def test_sleeps_while_idle():
+    peer = pump.PipePeer()
+    msg_pump = make_pump(peer, lambda line: None)
+    msg_pump.run_until(lambda: False, timeout=0.2)
+    # A polling loop would have woken up thousands of times
+    assert msg_pump.wakeups <= 2
+
+def test_resends_without_traffic():
+    peer = pump.PipePeer(acks=False)
+    msg_pump = make_pump(peer, lambda line: None, ack_timeout=0.05, max_retries=1)
+    msg_pump.channel.send("stop")
+    msg_pump.run_until(lambda: msg_pump.channel.lost, timeout=5)
+    assert peer.wait_for(2)
+    assert [line for received_at, line in peer.received] == ["stop 1", "stop 1"]
+
+def test_closed_by_peer():
+    peer = pump.PipePeer()
+    received = []
+    msg_pump = make_pump(peer, received.append)
+    peer.send_line("bye")
+    peer.close()
+    assert not msg_pump.run_until(lambda: False, timeout=5)
+    assert msg_pump.closed and received == ["bye"]
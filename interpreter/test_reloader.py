@@ -0,0 +1,88 @@
+import interpreter
+import reloader
+
+def write_files(tmpdir, actions):
+    tmpdir.join("actions.txt").write(actions)
+    tmpdir.join("shown_actions.txt").write("wash,clean\nkick")
+    tmpdir.join("objects.txt").write("cow,bovine\nhand")
+    return [str(tmpdir.join(name)) for name in ("actions.txt", "shown_actions.txt", "objects.txt")]
+
+def test_reload_swaps_snapshot(tmpdir):
+    original = interpreter.current_snapshot()
+    filenames = write_files(tmpdir, "move,go\nstop")
+    interpreter.install_snapshot(interpreter.build_snapshot(*filenames))
+    try:
+        watcher = reloader.LexiconWatcher()
+        assert not watcher.check()
+
+        in_flight = interpreter.current_snapshot()
+        tmpdir.join("actions.txt").write("move,go,walk\nstop,halt\n")
+        assert watcher.check()
+
+        new = interpreter.current_snapshot()
+        assert new.version == in_flight.version + 1
+        assert new.known_actions.lookup("walk") == 0
+        assert new.known_actions.lookup("halt") == 1
+        # A command that started before the reload keeps using its own version
+        assert in_flight.known_actions.lookup("walk") == -1
+        assert interpreter.known_actions is new.known_actions
+        assert not watcher.check()
+    finally:
+        interpreter.install_snapshot(original)
+
+def test_failed_reload_keeps_snapshot(tmpdir):
+    original = interpreter.current_snapshot()
+    filenames = write_files(tmpdir, "move,go\nstop")
+    interpreter.install_snapshot(interpreter.build_snapshot(*filenames))
+    try:
+        watcher = reloader.LexiconWatcher()
+        before = interpreter.current_snapshot()
+        tmpdir.join("objects.txt").remove()
+        assert not watcher.check()
+        assert interpreter.current_snapshot() is before
+        # The same broken files are not rebuilt on every check
+        assert watcher.failed_sources is not None
+        assert not watcher.check()
+    finally:
+        interpreter.install_snapshot(original)
+
+def test_reload_replaces_default_shown_words(tmpdir):
+    original = interpreter.current_snapshot()
+    filenames = write_files(tmpdir, "show,teach")
+    interpreter.install_snapshot(interpreter.build_snapshot(*filenames))
+    try:
+        watcher = reloader.LexiconWatcher()
+        tmpdir.join("objects.txt").write("cow,bovine,heifer\nhand")
+        assert watcher.check()
+        # Called without shown words, as by code that does not go through a snapshot
+        res = interpreter.extractor.object_dict_show([("the", "DT"), ("heifer", "NN")])
+        assert res == {"object": "cow"}
+    finally:
+        interpreter.install_snapshot(original)
+    assert interpreter.extractor.current_shown_words is original.shown_words
+
+def test_shown_words_bound_to_snapshot(tmpdir):
+    filenames = write_files(tmpdir, "show,teach")
+    snapshot = interpreter.build_snapshot(*filenames)
+    extract = snapshot.object_extractor_functions[0]
+    res = extract([("to", "TO"), ("clean", "VB"), ("the", "DT"), ("bovine", "NN")])
+    assert res == {"show_action": "wash", "object": "cow", "video_title": "wash-cow"}
+
+def test_rules_only_action_with_compiled_lexicon(tmpdir, monkeypatch):
+    monkeypatch.setenv("LILI_LEXICON_DIR", str(tmpdir.join("compiled")))
+    original = interpreter.current_snapshot()
+    filenames = write_files(tmpdir, "move,go\npick,grab\n")
+    rules_file = tmpdir.join("rules.txt")
+    rules_file.write("")
+    interpreter.install_snapshot(interpreter.build_snapshot(*filenames, rules_filename=str(rules_file)))
+    try:
+        # Without rules or an extractor function, the pick action set is skipped
+        assert interpreter.current_snapshot().known_actions.lookup("grab") == -1
+        watcher = reloader.LexiconWatcher()
+        rules_file.write("[pick]\nobject = first noun\n")
+        assert watcher.check()
+        new = interpreter.current_snapshot()
+        assert new.known_actions.lookup("grab") == 1
+        assert new.object_extractor_functions[1]([("the", "DT"), ("cup", "NN")]) == {"object": "cup"}
+    finally:
+        interpreter.install_snapshot(original)
@@ -0,0 +1,59 @@
+import extractor
+import rules
+
+# Part of speech tagged sentences, with the action already trimmed off as in generate_object_dict
+tagged_sents = [
+    [("me", "PRP")],
+    [("Jonathan", "NNP"), ("to", "TO"), ("the", "DT"), ("kitchen", "NN")],
+    [("to", "TO"), ("the", "DT"), ("bathroom", "NN")],
+    [("left", "VBD")],
+    [("to", "TO"), ("the", "DT"), ("right", "NN")],
+    [("around", "RB")],
+    [("to", "TO"), ("Jonathan", "NNP")],
+    [("about", "IN"), ("movies", "NNS")],
+    [("with", "IN"), ("Brandon", "NNP"), ("about", "IN"), ("computers", "NNS")],
+    [("the", "DT"), ("story", "NN")],
+    [("Story", "NNP"), ("mode", "NN")],
+    [("now", "RB")],
+    [],
+]
+
+def test_rules_match_extractor_functions():
+    extractors = rules.load(rules.rules_path)
+    assert sorted(extractors) == ["follow", "move", "start", "stop", "talk", "turn"]
+    for action, rule_extractor in sorted(extractors.items()):
+        func = getattr(extractor, "object_dict_" + action)
+        for sent in tagged_sents:
+            assert rule_extractor(sent) == func(sent), (action, sent)
+
+def test_new_action_from_rules():
+    extractors = rules.parse_rules([
+        "[pick]",
+        "flag from when word from|off",
+        "source = last noun if from keep case",
+        "object = first noun and not word me",
+    ])
+    sent = [("me", "PRP"), ("the", "DT"), ("Cup", "NN"), ("off", "IN"), ("the", "DT"), ("Table", "NN")]
+    assert extractors["pick"](sent) == {"object": "cup", "source": "Table"}
+
+def test_set_and_include():
+    extractors = rules.parse_rules([
+        "[a]",
+        "flag seen when tag DT",
+        "object = last noun if seen",
+        "verb = last tag VB then set seen",
+        "[b]",
+        "flag other when word other",
+        "include a",
+    ])
+    sent = [("go", "VB"), ("home", "NN")]
+    assert extractors["b"](sent) == {"verb": "go", "object": "home"}
+    assert extractors["b"].flag_names == {"other": 1, "seen": 2}
+
+def test_invalid_rules():
+    for lines in (["object = first noun"], ["[a]", "object = every noun"], ["[a]", "object = first nouns"], ["[a]", "include b"]):
+        try:
+            rules.parse_rules(lines, "rules.txt")
+            assert False, lines
+        except ValueError as err:
+            assert str(err).startswith("rules.txt line")
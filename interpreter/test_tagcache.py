@@ -0,0 +1,78 @@
+import os
+import tagcache
+
+class FakeModel:
+    def predict(self, features):
+        return ("VB" if features["prev"] == "-START-" else "NNP", 1.0)
+
+class FakePerceptron:
+    # Mimics the parts of nltk's PerceptronTagger used by CachedTagger
+    START = ["-START-", "-START2-"]
+    END = ["-END-", "-END2-"]
+
+    def __init__(self):
+        self.tagdict = {"the": "DT"}
+        self.model = FakeModel()
+        self.predicted = []
+        self.tagged = 0
+
+    def normalize(self, word):
+        return word.lower()
+
+    def _get_features(self, i, word, context, prev, prev2):
+        self.predicted.append(word)
+        return {"prev": prev}
+
+    def tag(self, tokens):
+        self.tagged += 1
+        return [(token, "NN") for token in tokens]
+
+def test_distributions_round_trip(tmpdir):
+    distributions = {}
+    tagcache.add_counts(distributions, "Move", "VB", 3)
+    tagcache.add_counts(distributions, "move", "NN")
+    tagcache.add_counts(distributions, "kitchen", "NN", 5)
+    filename = str(tmpdir.join("tags.tsv"))
+    tagcache.write_distributions(distributions, filename)
+    assert tagcache.read_distributions(filename) == {"move": {"VB": 3, "NN": 1}, "kitchen": {"NN": 5}}
+    assert tagcache.unambiguous_tags(distributions) == {"kitchen": "NN"}
+    assert tagcache.unambiguous_tags(distributions, 0.75) == {"kitchen": "NN", "move": "VB"}
+
+def test_wordlist_distributions():
+    tags = tagcache.unambiguous_tags(tagcache.wordlist_distributions(tagcache.taggers.nouns_path, tagcache.taggers.verbs_path))
+    assert tags["kitchen"] == "NN"
+    assert tags["to"] == "TO"
+    assert "move" not in tags
+
+def test_only_misses_use_the_model():
+    perceptron = FakePerceptron()
+    tagger = tagcache.CachedTagger({"to": "TO", "kitchen": "NN"}, lambda: perceptron, verify_every=0)
+    assert tagger.tag(["Move", "to", "the", "kitchen"]) == [("Move", "VB"), ("to", "TO"), ("the", "DT"), ("kitchen", "NN")]
+    assert perceptron.predicted == ["Move"]
+    assert tagger.tag(["to", "kitchen"]) == [("to", "TO"), ("kitchen", "NN")]
+    assert perceptron.predicted == ["Move"]
+    stats = tagger.stats()
+    assert (stats["hits"], stats["misses"]) == (4, 2)
+    assert stats["hit_rate"] == 4.0 / 6
+
+def test_checks_are_off_by_default():
+    perceptron = FakePerceptron()
+    tagger = tagcache.CachedTagger({"to": "TO", "kitchen": "NN"}, lambda: perceptron)
+    for i in range(200):
+        tagger.tag(["to", "kitchen"])
+    assert perceptron.tagged == 0
+    assert tagger.stats()["checked"] == 0
+
+def test_accuracy_checks():
+    perceptron = FakePerceptron()
+    tagger = tagcache.CachedTagger({"to": "TO", "kitchen": "NN"}, lambda: perceptron, verify_every=2)
+    tagger.tag(["to", "kitchen"])
+    tagger.wait_for_checks()
+    assert perceptron.tagged == 0
+    # The check runs on a background thread, not while the sentence is tagged
+    tagger.tag(["to", "kitchen"])
+    tagger.wait_for_checks()
+    assert perceptron.tagged == 1
+    # The fake perceptron tags everything NN, so only "kitchen" agrees
+    assert tagger.stats()["checked"] == 2
+    assert tagger.stats()["accuracy"] == 0.5
@@ -0,0 +1,68 @@
+import nlp
+import taggers
+
+class FakeTagger:
+    def __init__(self):
+        self.calls = 0
+
+    def tag(self, tokens):
+        self.calls += 1
+        return [(token, "NNP") for token in tokens]
+
+def test_tag_table():
+    table, verb_table = taggers.build_tag_tables(taggers.nouns_path, taggers.verbs_path)
+    assert table["kitchen"] == "NN"
+    assert table["kitchens"] == "NNS"
+    assert table["follows"] == "VBZ"
+    assert table["follow"] == "VB"
+    assert table["the"] == "DT"
+    assert table["to"] == "TO"
+    # Nouns that are also verbs, past forms and direction words are left to the fallback tagger
+    assert "walk" not in table
+    assert verb_table["walk"] == "VB"
+    assert "washed" not in table
+    assert "left" not in table
+
+def test_lexicon_tagger():
+    fallback = FakeTagger()
+    tagger = taggers.LexiconTagger({"move": "VB", "to": "TO", "the": "DT", "kitchen": "NN"}, lambda: fallback)
+    assert tagger.tag(["Move", "to", "the", "kitchen"]) == [("Move", "VB"), ("to", "TO"), ("the", "DT"), ("kitchen", "NN")]
+    assert fallback.calls == 0
+    assert tagger.tag(["Move", "to", "Jonathan"]) == [("Move", "VB"), ("to", "TO"), ("Jonathan", "NNP")]
+    assert fallback.calls == 1
+    assert (tagger.hits, tagger.fallbacks) == (1, 1)
+
+def test_verb_positions():
+    fallback = FakeTagger()
+    tagger = taggers.LexiconTagger({"how": "WRB", "to": "TO", "me": "PRP", "my": "PRP$", "hands": "NNS"}, lambda: fallback, {"show": "VB", "wash": "VB"})
+    assert tagger.tag(["Show", "me", "how", "to", "wash", "my", "hands"]) == [("Show", "VB"), ("me", "PRP"), ("how", "WRB"), ("to", "TO"), ("wash", "VB"), ("my", "PRP$"), ("hands", "NNS")]
+    # Only the first word and words after "to" can be resolved as verbs
+    assert tagger.tag(["Show", "me", "wash"])[2] == ("wash", "NNP")
+    assert fallback.calls == 1
+
+def test_set_tagger_backend(tmpdir, monkeypatch):
+    monkeypatch.setattr(taggers, "evaluations_path", str(tmpdir.join("evaluations.json")))
+    old = nlp.tagger_backend
+    try:
+        # Not enabled until it has passed its evaluation
+        try:
+            nlp.set_tagger_backend("lexicon")
+            assert False
+        except ValueError:
+            pass
+        taggers.record_evaluation({"backend": "lexicon", "sentences": 10, "tag_accuracy": 0.9, "mismatches": 1})
+        try:
+            nlp.set_tagger_backend("lexicon")
+            assert False
+        except ValueError:
+            pass
+        taggers.record_evaluation({"backend": "lexicon", "sentences": 10, "tag_accuracy": 0.99, "mismatches": 0})
+        nlp.set_tagger_backend("lexicon")
+        assert nlp.pos_tag(["the", "kitchen"]) == [("the", "DT"), ("kitchen", "NN")]
+    finally:
+        nlp.set_tagger_backend(old, force=True)
+    try:
+        nlp.set_tagger_backend("fast")
+        assert False
+    except ValueError:
+        pass
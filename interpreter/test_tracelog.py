@@ -0,0 +1,31 @@
+import json
+import StringIO
+import tracelog
+
+def logged_records(lvl, *records):
+    out = StringIO.StringIO()
+    old_level = tracelog.level
+    tracelog.configure(lvl, out)
+    try:
+        for rec in records:
+            tracelog.log(*rec[:2], **rec[2])
+        tracelog.flush()
+    finally:
+        tracelog.configure(old_level, tracelog.sys.stderr)
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+def test_json_lines():
+    res = logged_records("debug", (tracelog.DEBUG, "tokenized", {"tokens": ["Stop"]}))
+    assert len(res) == 1
+    assert res[0]["event"] == "tokenized"
+    assert res[0]["level"] == "debug"
+    assert res[0]["tokens"] == ["Stop"]
+
+def test_level_filter():
+    res = logged_records("warning", (tracelog.DEBUG, "tagged", {}), (tracelog.ERROR, "missing_extractor", {"function": "object_dict_x"}))
+    assert [r["event"] for r in res] == ["missing_extractor"]
+
+def test_unserializable_field():
+    res = logged_records("debug", (tracelog.INFO, "action", {"action_tuple": (1, 0), "obj": object()}))
+    assert res[0]["action_tuple"] == [1, 0]
+    assert res[0]["obj"].startswith("<object")
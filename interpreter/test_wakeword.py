@@ -0,0 +1,73 @@
+import math
+import random
+import struct
+import wave
+import listener
+import wakeword
+
+rate = 16000
+
+# The wake word and another word, each a list of (frequency, seconds) tones
+name_tones = [(300, 0.08), (2500, 0.06), (350, 0.10), (2200, 0.08)]
+other_tones = [(1500, 0.08), (500, 0.10), (3000, 0.06), (800, 0.08)]
+
+def samples(words, rng):
+    res = [0.0] * int(0.3 * rate)
+    for tones, stretch, gain in words:
+        for freq, seconds in tones:
+            res.extend(gain * 5000 * math.sin(2 * math.pi * freq * i / rate) for i in range(int(seconds * stretch * rate)))
+        res.extend([0.0] * int(0.05 * rate))
+    res.extend([0.0] * int(0.2 * rate))
+    return struct.pack("<%dh" % len(res), *[int(sample + rng.gauss(0, 100)) for sample in res])
+
+def write_wav(filename, frames):
+    wav = wave.open(filename, "wb")
+    wav.setnchannels(1)
+    wav.setsampwidth(2)
+    wav.setframerate(rate)
+    wav.writeframes(frames)
+    wav.close()
+
+def utterance(words, rng):
+    return listener.Utterance(samples(words, rng), rate, 2, 0.0)
+
+def detector(tmpdir, **kwargs):
+    rng = random.Random(0)
+    for i, stretch in enumerate([0.9, 1.0, 1.1]):
+        write_wav(str(tmpdir.join("lily%d.wav" % i)), samples([(name_tones, stretch, 1.0)], rng))
+    return wakeword.load(str(tmpdir), **kwargs)
+
+def test_frame_features_ignore_volume():
+    rng = random.Random(0)
+    quiet = wakeword.frame_features(samples([(name_tones, 1.0, 0.5)], rng), rate, 2, trim_end=True)
+    loud = wakeword.frame_features(samples([(name_tones, 1.0, 2.0)], rng), rate, 2, trim_end=True)
+    assert abs(len(quiet) - len(loud)) <= 1
+    assert wakeword.prefix_distance(quiet, loud) < 0.1
+
+def test_accepts_name_at_start(tmpdir):
+    det = detector(tmpdir)
+    rng = random.Random(1)
+    # Said faster or slower and louder or quieter than recorded, and followed by a command
+    assert det.check(utterance([(name_tones, 0.85, 1.3), (other_tones, 1.0, 1.0)], rng))
+    assert det.check(utterance([(name_tones, 1.2, 0.8), (other_tones[::-1], 1.0, 1.0)], rng))
+    assert not det.check(utterance([(other_tones, 1.0, 1.0), (name_tones, 1.0, 1.0)], rng))
+    assert not det.check(utterance([(other_tones[::-1], 1.0, 1.0)], rng))
+    assert (det.accepted, det.rejected) == (2, 2)
+
+def test_counts_errors(tmpdir):
+    det = detector(tmpdir, audit_every=2)
+    rng = random.Random(2)
+    assert not det.check(utterance([(other_tones, 1.0, 1.0)], rng))
+    assert not det.audit_due()
+    assert not det.check(utterance([(other_tones, 1.0, 1.0)], rng))
+    assert det.audit_due()
+    # The recognizer found the name in the audited utterance, and not in an accepted one
+    det.record(False, True)
+    det.record(True, False)
+    stats = det.stats()
+    assert (stats["false_rejects"], stats["audited"], stats["false_accepts"]) == (1, 1, 1)
+    assert stats["false_reject_rate"] == 1.0
+    assert stats["recognitions_saved"] == 0.5
+
+def test_no_templates(tmpdir):
+    assert wakeword.load(str(tmpdir)) is None
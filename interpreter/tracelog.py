@@ -0,0 +1,202 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import Queue
+
+# Logging levels - a record is only kept if its level is at or above the configured level
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+level_names = {DEBUG: "debug", INFO: "info", WARNING: "warning", ERROR: "error"}
+
+# Maximum number of records joined into a single write to the output stream
+batch_size = 256
+
+def parse_level(name):
+    """
+    Converts a level name such as ``"debug"`` (or a number) into one of the numeric logging levels.
+
+    Args:
+        name (str): The name or number of the level
+
+    Returns:
+        int: The numeric logging level
+
+           * Returns :data:`WARNING` if the name is not recognized
+    """
+    name = str(name).strip().lower()
+    for lvl, lvl_name in level_names.items():
+        if name == lvl_name:
+            return lvl
+    try:
+        return int(name)
+    except ValueError:
+        return WARNING
+
+# The debug trace is off by default - set LILI_LOG_LEVEL=debug to turn it on
+level = parse_level(os.environ.get("LILI_LOG_LEVEL", "warning"))
+
+_stream = sys.stderr
+_queue = Queue.Queue()
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+_STOP = object()
+
+def configure(new_level=None, stream=None):
+    """
+    Changes the logging level and/or the output stream of the interpreter log.
+
+    Args:
+        new_level (int or str): The minimum level of records that are written, ``None`` to keep the current level
+        stream (file): A file-like object that JSON lines are written to, ``None`` to keep the current stream
+    """
+    global level, _stream
+    if new_level is not None:
+        level = parse_level(new_level)
+    if stream is not None:
+        flush()
+        _stream = stream
+
+def enabled(lvl):
+    """
+    Checks if records of the given level are currently being written. Use this to skip building expensive log fields.
+
+    Args:
+        lvl (int): The logging level to check
+
+    Returns:
+        bool: ``True`` if records of this level are written, ``False`` if not
+    """
+    return lvl >= level
+
+def log(lvl, event, **fields):
+    """
+    Queues a structured log record to be written as a single JSON line.
+
+    Nothing is formatted on the caller's thread. The fields are handed to a background writer thread as they are, which converts them to JSON and writes them to the output stream in batches. Records below the configured level are dropped immediately.
+
+    Args:
+        lvl (int): The level of the record
+        event (str): A short name for what happened, e.g. ``"tokenized"``
+
+    Kwargs:
+        Any additional fields to include in the record. Values that are not JSON serializable are written using ``str``.
+
+    Note:
+        Field values are serialized later on another thread, so do not mutate an object after it has been logged.
+    """
+    if lvl < level:
+        return
+    if _writer_pid != os.getpid():
+        _start_writer()
+    _queue.put((time.time(), lvl, event, fields))
+
+def debug(event, **fields):
+    """
+    Queues a record at the :data:`DEBUG` level. See :meth:`log`.
+    """
+    if DEBUG >= level:
+        log(DEBUG, event, **fields)
+
+def info(event, **fields):
+    """
+    Queues a record at the :data:`INFO` level. See :meth:`log`.
+    """
+    if INFO >= level:
+        log(INFO, event, **fields)
+
+def warning(event, **fields):
+    """
+    Queues a record at the :data:`WARNING` level. See :meth:`log`.
+    """
+    if WARNING >= level:
+        log(WARNING, event, **fields)
+
+def error(event, **fields):
+    """
+    Queues a record at the :data:`ERROR` level. See :meth:`log`.
+    """
+    if ERROR >= level:
+        log(ERROR, event, **fields)
+
+def format_record(record):
+    """
+    Converts a queued record into a JSON line.
+
+    Args:
+        record (tuple): A tuple ``(timestamp, level, event, fields)`` as queued by :meth:`log`
+
+    Returns:
+        str: The JSON string of the record, ending with a newline
+    """
+    timestamp, lvl, event, fields = record
+    out = {"ts": round(timestamp, 6), "level": level_names.get(lvl, lvl), "event": event}
+    out.update(fields)
+    return json.dumps(out, default=str) + "\n"
+
+def flush():
+    """
+    Blocks until every record queued so far has been written to the output stream.
+    """
+    if _writer_pid == os.getpid():
+        _queue.join()
+
+def _start_writer():
+    global _writer, _writer_pid
+    with _writer_lock:
+        # A forked child process does not inherit the writer thread, so one is started per process
+        if _writer_pid == os.getpid():
+            return
+        _writer = threading.Thread(target=_write_records, name="lili-tracelog")
+        _writer.daemon = True
+        _writer_pid = os.getpid()
+        _writer.start()
+
+def _write_records():
+    while True:
+        record = _queue.get()
+        done = 1
+        records = [record]
+        # Join everything that is already waiting into one write to keep I/O calls low
+        while len(records) < batch_size:
+            try:
+                records.append(_queue.get_nowait())
+                done += 1
+            except Queue.Empty:
+                break
+
+        stop = False
+        lines = []
+        for rec in records:
+            if rec is _STOP:
+                stop = True
+            else:
+                try:
+                    lines.append(format_record(rec))
+                except Exception as err:
+                    lines.append(json.dumps({"level": "error", "event": "log_format_failed", "error": str(err)}) + "\n")
+        try:
+            if lines:
+                _stream.write("".join(lines))
+                _stream.flush()
+        except Exception:
+            pass
+
+        for i in range(done):
+            _queue.task_done()
+        if stop:
+            return
+
+def _shutdown():
+    # Write any records that are still queued when the interpreter exits
+    if _writer_pid == os.getpid() and _writer.is_alive():
+        _queue.put(_STOP)
+        _writer.join(1.0)
+
+atexit.register(_shutdown)
@@ -0,0 +1,290 @@
+"""
+Checks locally whether an utterance starts with LILI's name before it is sent to the speech recognizer.
+
+The executor used to recognize every utterance and only then check if it started with "lily", so every conversation LILI overheard cost a full recognition. A :class:`~interpreter.wakeword.WakeWordDetector` compares the start of each utterance with a few recordings of the name, and only utterances that match are recognized.
+
+Each utterance is cut into short frames, and each frame is described by three numbers that do not depend on how loud the speaker is: its energy compared with the rest of the utterance, its zero crossing rate and its spectral tilt (the energy of the differenced signal compared with the energy of the signal). The frames of the utterance are aligned with the frames of each recording of the name with dynamic time warping, so the name can be said faster or slower than it was recorded. The recordings are WAV files in ``input_files/wake_word``; without any, nothing is gated.
+
+Since a rejected utterance is never recognized, false rejects cannot be counted directly. Instead, one rejected utterance in every ``audit_every`` is recognized anyway, and the false reject rate is estimated from those.
+"""
+import audioop
+import glob
+import math
+import os
+import threading
+import wave
+
+import metrics
+import tracelog
+
+# The length of a frame and the distance between the starts of two frames
+frame_seconds = 0.025
+step_seconds = 0.010
+
+# Frames closer to the quietest frame than this share of the way to the loudest frame (on a log scale) are silence
+silence_share = 0.4
+
+# The lowest energy of a frame compared with the loudest frame, on a natural log scale
+energy_floor = math.log(10.0)
+
+# How much each feature counts in the distance between two frames
+feature_weights = (0.5, 8.0, 1.0)
+
+def frame_features(frames, sample_rate, sample_width, trim_start=True, trim_end=False):
+    """
+    Describes each frame of some audio by its relative energy, zero crossing rate and spectral tilt.
+
+    Args:
+        frames (str): The raw samples
+        sample_rate (int): The number of samples per second
+        sample_width (int): The number of bytes per sample
+        trim_start (bool): If ``True``, the silence before the first loud frame is left out
+        trim_end (bool): If ``True``, the silence after the last loud frame is left out
+
+    Returns:
+        list: A tuple ``(energy, zcr, tilt)`` for each frame, weighted by :data:`feature_weights`
+    """
+    frame_bytes = int(frame_seconds * sample_rate) * sample_width
+    step_bytes = int(step_seconds * sample_rate) * sample_width
+    raw = []
+    for start in xrange(0, len(frames) - frame_bytes + 1, step_bytes):
+        frame = frames[start:start + frame_bytes]
+        energy = math.log(audioop.rms(frame, sample_width) + 1.0)
+        zcr = float(audioop.cross(frame, sample_width)) / (frame_bytes / sample_width)
+        # The difference between each sample and the one before it, which boosts high frequencies
+        diff = audioop.add(frame[sample_width:], audioop.mul(frame[:-sample_width], sample_width, -1), sample_width)
+        tilt = math.log(audioop.rms(diff, sample_width) + 1.0) - energy
+        raw.append((energy, zcr, tilt))
+    if not raw:
+        return []
+
+    loudest = max(energy for energy, zcr, tilt in raw)
+    quietest = min(energy for energy, zcr, tilt in raw)
+    loud = [i for i, (energy, zcr, tilt) in enumerate(raw) if energy >= quietest + silence_share * (loudest - quietest)]
+    raw = raw[loud[0] if trim_start else 0:loud[-1] + 1 if trim_end else len(raw)]
+    # Energy is compared with the loudest frame, so the same word said louder or quieter has the same features
+    w_energy, w_zcr, w_tilt = feature_weights
+    return [(w_energy * (energy - loudest), w_zcr * zcr, w_tilt * tilt) for energy, zcr, tilt in raw]
+
+def read_wav_features(filename):
+    """
+    Reads a mono WAV file and describes its frames, leaving out the silence before and after the speech.
+
+    Args:
+        filename (str): The WAV file
+
+    Returns:
+        list: The features of each frame, see :meth:`frame_features`
+    """
+    wav = wave.open(filename, "rb")
+    try:
+        if wav.getnchannels() != 1:
+            raise ValueError(filename + " is not a mono WAV file")
+        return frame_features(wav.readframes(wav.getnframes()), wav.getframerate(), wav.getsampwidth(), trim_end=True)
+    finally:
+        wav.close()
+
+def prefix_distance(template, features, max_stretch=1.5):
+    """
+    Finds how closely the start of an utterance matches a template, using dynamic time warping.
+
+    The whole template is aligned with the start of the utterance, and the alignment may end anywhere within the first ``max_stretch`` times the template's length of the utterance, so what is said after the name does not count.
+
+    Args:
+        template (list): The frame features of a recording of the name
+        features (list): The frame features of the utterance
+        max_stretch (float): How much slower than the template the name can be said
+
+    Returns:
+        float: The average distance between aligned frames, lower is closer. Infinite if either has no frames
+    """
+    n = len(template)
+    m = min(len(features), int(n * max_stretch) + 1)
+    if n == 0 or m == 0:
+        return float("inf")
+    inf = float("inf")
+    # The energies are compared relative to the loudest frame of the part of the utterance that can be aligned, since the rest of the utterance may be louder or quieter than the name.
+    # Quiet frames are all given the same energy, so pauses look the same however loud the background noise is
+    template_loudest = max(frame[0] for frame in template)
+    features_loudest = max(frame[0] for frame in features[:m])
+    template = [(max(t0 - template_loudest, -energy_floor), t1, t2) for t0, t1, t2 in template]
+    features = [(max(f0 - features_loudest, -energy_floor), f1, f2) for f0, f1, f2 in features[:m]]
+    # prev[j] is the total distance of the best alignment of the template up to the previous frame with the utterance up to frame j
+    prev = [inf] * m
+    for i in xrange(n):
+        t0, t1, t2 = template[i]
+        cur = [inf] * m
+        left = inf
+        for j in xrange(m):
+            f0, f1, f2 = features[j]
+            cost = abs(t0 - f0) + abs(t1 - f1) + abs(t2 - f2)
+            if i == 0 and j == 0:
+                best = 0.0
+            else:
+                best = min(left, prev[j], prev[j - 1] if j else inf)
+            left = cur[j] = best + cost
+        prev = cur
+    # Each total is divided by the longest path that can end there, so ending later is not penalized
+    return min(total / (n + j) for j, total in enumerate(prev))
+
+class WakeWordDetector:
+    """ Decides whether utterances start with the wake word, by comparing them with recordings of it.
+
+    Attributes:
+        templates (list): The frame features of each recording of the wake word
+        threshold (float): Utterances whose distance to the closest template is at most this are accepted
+        accepted (int): The number of utterances accepted
+        rejected (int): The number of utterances rejected
+        audited (int): The number of rejected utterances that were recognized anyway to check the rejection
+        false_accepts (int): The number of accepted utterances that turned out not to start with the wake word
+        false_rejects (int): The number of audited utterances that turned out to start with the wake word
+    """
+    def __init__(self, templates, threshold=None, audit_every=20, margin=2.0):
+        """ Constructor for the :class:`~interpreter.wakeword.WakeWordDetector` class
+
+        Args:
+            templates (list): The frame features of each recording of the wake word, see :meth:`read_wav_features`
+            threshold (float): The largest accepted distance, see :meth:`calibrate` if left out
+            audit_every (int): One rejected utterance in this many is recognized anyway to count false rejects, 0 to never audit
+            margin (float): See :meth:`calibrate`
+        """
+        if not templates:
+            raise ValueError("at least one wake word recording is needed")
+        self.templates = templates
+        self.audit_every = audit_every
+        self.threshold = threshold if threshold is not None else self.calibrate(margin)
+        self.accepted = 0
+        self.rejected = 0
+        self.audited = 0
+        self.false_accepts = 0
+        self.false_rejects = 0
+        self._audit = False
+        self._lock = threading.Lock()
+
+    def calibrate(self, margin=2.0):
+        """
+        Picks a threshold from how different the recordings of the wake word are from each other.
+
+        Each recording is compared with the others, and the threshold is the largest of these distances multiplied by ``margin``. With a single recording, :data:`default_threshold` is used.
+
+        Args:
+            margin (float): How much further than the furthest recording an utterance can be
+
+        Returns:
+            float: The threshold
+        """
+        if len(self.templates) < 2:
+            return default_threshold
+        furthest = 0.0
+        for i, template in enumerate(self.templates):
+            others = [other for j, other in enumerate(self.templates) if j != i]
+            furthest = max(furthest, min(prefix_distance(other, template) for other in others))
+        return furthest * margin
+
+    def distance(self, features):
+        """
+        Finds how closely the start of an utterance matches the closest recording of the wake word.
+
+        Args:
+            features (list): The frame features of the utterance
+
+        Returns:
+            float: The distance to the closest template
+        """
+        return min(prefix_distance(template, features) for template in self.templates)
+
+    def check(self, utterance):
+        """
+        Decides whether an utterance starts with the wake word.
+
+        Args:
+            utterance (Utterance): The utterance, see :class:`~interpreter.listener.Utterance`
+
+        Returns:
+            bool: ``True`` if it should be recognized, ``False`` if not
+        """
+        started = metrics.start()
+        distance = self.distance(frame_features(utterance.frames, utterance.sample_rate, utterance.sample_width))
+        accepted = distance <= self.threshold
+        with self._lock:
+            if accepted:
+                self.accepted += 1
+                self._audit = False
+            else:
+                self.rejected += 1
+                self._audit = bool(self.audit_every) and self.rejected % self.audit_every == 0
+        metrics.observe("wake_word", started)
+        tracelog.debug("wake_word", distance=distance, accepted=accepted)
+        return accepted
+
+    def audit_due(self):
+        """
+        Checks if the utterance that was just rejected should be recognized anyway, to count false rejects.
+
+        Returns:
+            bool: ``True`` if the last utterance checked was rejected and picked for an audit
+        """
+        return self._audit
+
+    def record(self, accepted, addressed):
+        """
+        Records whether the recognizer found the wake word in an utterance that was checked.
+
+        Args:
+            accepted (bool): What :meth:`check` returned for the utterance
+            addressed (bool): ``True`` if the recognized sentence starts with the wake word
+        """
+        with self._lock:
+            if accepted and not addressed:
+                self.false_accepts += 1
+            elif not accepted:
+                self.audited += 1
+                self.false_rejects += addressed
+
+    def stats(self):
+        """
+        Summarizes how well the detector is working.
+
+        Returns:
+            dict: The counters, the ``false_accept_rate`` of the accepted utterances, the ``false_reject_rate`` estimated from the audited utterances, and the share of utterances that were not recognized, ``recognitions_saved``
+        """
+        with self._lock:
+            checked = self.accepted + self.rejected
+            return {
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "audited": self.audited,
+                "false_accepts": self.false_accepts,
+                "false_rejects": self.false_rejects,
+                "false_accept_rate": float(self.false_accepts) / self.accepted if self.accepted else None,
+                "false_reject_rate": float(self.false_rejects) / self.audited if self.audited else None,
+                "recognitions_saved": float(self.rejected - self.audited) / checked if checked else 0.0,
+            }
+
+# The threshold used with a single recording of the wake word
+default_threshold = 0.35
+
+def load(dirname=None, **kwargs):
+    """
+    Creates a detector from the recordings of the wake word.
+
+    Args:
+        dirname (str): The directory of WAV files, defaults to the ``LILI_WAKE_WORD_DIR`` environment variable or :data:`templates_path`
+        **kwargs: Passed on to :class:`~interpreter.wakeword.WakeWordDetector`
+
+    Returns:
+        WakeWordDetector: The detector, ``None`` if there are no recordings
+    """
+    dirname = dirname or os.environ.get("LILI_WAKE_WORD_DIR") or templates_path
+    filenames = sorted(glob.glob(os.path.join(dirname, "*.wav")))
+    if not filenames:
+        return None
+    return WakeWordDetector([read_wav_features(filename) for filename in filenames], **kwargs)
+
+templates_path = ""
+if "lili-interpreter" in os.listdir("."): # If this is true, code is being run in LSSWinRobot repo
+    templates_path = "lili-interpreter/"
+elif "source" in os.listdir("."): # If this is true, code is being run by make in Sphinx documentation generator
+    templates_path = "source/"
+
+templates_path = templates_path + "input_files/wake_word/"
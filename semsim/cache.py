@@ -0,0 +1,335 @@
+"""
+Keeps the answers to WordNet queries in a SQLite database, so later runs of semsim do not have to ask WordNet again.
+
+Mapping a word list onto the known words spends most of its time looking up the synsets of each word and scoring ``path_similarity`` between synsets, and every run asks the same questions again. A :class:`~semsim.cache.CachedWordNet` stands in for the WordNet corpus reader in :mod:`semsim.wntest` and answers from the database first:
+
+* The synsets of each word and part of speech
+* The part of speech, depths, definition and lemma names of each synset
+* The ``path_similarity`` of each pair of synsets
+
+Every answer is stored with the version of WordNet it came from, so a database can be shared between WordNet versions without mixing their answers. Answers from a snapshot, which only holds part of WordNet, are also stored with the snapshot's own ``cache_tag`` (see :meth:`~semsim.snapshot.Snapshot.cache_tag`), so they are never used for the whole corpus or another snapshot. The synsets it returns are :class:`~semsim.cache.CachedSynset` objects, which only ask WordNet for the real synset when the database cannot answer.
+
+Looking up each answer with its own query would be slow, so :meth:`~CachedWordNet.prefetch` loads everything the database has for a list of words and known synsets in a few queries, and new answers are written in batches.
+
+Set the ``LILI_WORDNET_CACHE`` environment variable to the database's path to have :mod:`semsim.wntest` use a cache. The cache works on top of a snapshot too, see :mod:`semsim.snapshot`.
+"""
+import sqlite3
+
+# SQLite allows at most 999 parameters in a query
+max_parameters = 900
+
+schema = [
+    "CREATE TABLE IF NOT EXISTS synsets (version TEXT, word TEXT, pos TEXT, names TEXT, PRIMARY KEY (version, word, pos))",
+    "CREATE TABLE IF NOT EXISTS synset_info (version TEXT, name TEXT, pos TEXT, min_depth INTEGER, max_depth INTEGER, definition TEXT, lemma_names TEXT, PRIMARY KEY (version, name))",
+    "CREATE TABLE IF NOT EXISTS similarities (version TEXT, first TEXT, second TEXT, score REAL, PRIMARY KEY (version, first, second))",
+]
+
+def text(value):
+    # Words read from files are byte strings, and SQLite stores text as Unicode
+    return value.decode("utf-8") if isinstance(value, str) else value
+
+def chunks(values, size=max_parameters):
+    # Splits a list so that each query stays under SQLite's limit on parameters
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+class CachedWordNet:
+    """ Answers the queries :mod:`semsim.wntest` makes to the WordNet corpus reader from a SQLite database, asking WordNet only for the answers the database does not have.
+
+    Attributes:
+        hits (int): The number of queries answered from the cache
+        misses (int): The number of queries WordNet had to answer
+        writes (int): The number of answers written to the database
+    """
+    def __init__(self, filename, wordnet, version=None, batch_size=500):
+        """ Constructor for the :class:`~semsim.cache.CachedWordNet` class
+
+        Args:
+            filename (str): The SQLite database, created if it does not exist
+            wordnet (object): The WordNet corpus reader or :class:`~semsim.snapshot.Snapshot` that answers what the cache cannot
+            version (str): The version of WordNet the answers are stored under, ``wordnet.get_version()`` if left out. It is only looked up when the first query needs it, since getting the version loads the WordNet corpus
+            batch_size (int): The number of new answers that are kept before they are written to the database
+        """
+        self.wordnet = wordnet
+        self._version = version
+        self._key = None
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.connection = sqlite3.connect(filename)
+        for statement in schema:
+            self.connection.execute(statement)
+        self.connection.commit()
+        # Answers loaded from the database or WordNet, and the new answers not written yet
+        self._synsets = {}
+        self._info = {}
+        self._scores = {}
+        # WordNet's own synsets, looked up by name only when a score is not in the cache
+        self._resolved = {}
+        # The words and synset names prefetched, whose answers are known not to be in the database if they were not loaded
+        self._prefetched_words = set()
+        self._prefetched_names = set()
+        self._prefetched_seconds = set()
+        self._pending = {"synsets": [], "synset_info": [], "similarities": []}
+
+    def __getattr__(self, name):
+        # Everything else, e.g. wn.VERB, comes from WordNet itself
+        return getattr(self.wordnet, name)
+
+    def get_version(self):
+        return self._version or self.wordnet.get_version()
+
+    def key(self):
+        """
+        Gets the key the answers are stored under: the WordNet version, followed by the backend's ``cache_tag()`` if it has one, e.g. a :class:`~semsim.snapshot.Snapshot`.
+
+        Returns:
+            unicode: The key
+        """
+        if self._key is None:
+            key = self.get_version()
+            cache_tag = getattr(self.wordnet, "cache_tag", None)
+            if cache_tag is not None:
+                key = "%s %s" % (key, cache_tag())
+            self._key = text(key)
+        return self._key
+
+    def synsets(self, lemma, pos=None):
+        """
+        Looks up the synsets of a word, like ``wn.synsets``.
+
+        Args:
+            lemma (str): The word
+            pos (str): The part of speech of the synsets, e.g. ``wn.VERB``. Synsets of every part of speech are returned if left out
+
+        Returns:
+            list: The :class:`~semsim.cache.CachedSynset` objects of the synsets, in the order WordNet gives them
+        """
+        key = (text(lemma), pos or "")
+        names = self._synsets.get(key)
+        if names is None and key[0] not in self._prefetched_words:
+            row = self.connection.execute("SELECT names FROM synsets WHERE version = ? AND word = ? AND pos = ?", (self.key(),) + key).fetchone()
+            if row is not None:
+                names = self._synsets[key] = tuple(name for name in row[0].split("\t") if name)
+        if names is not None:
+            self.hits += 1
+            return [self.synset(name) for name in names]
+
+        self.misses += 1
+        found = self.wordnet.synsets(lemma, pos)
+        names = self._synsets[key] = tuple(synset.name() for synset in found)
+        self._store("synsets", key + ("\t".join(names),))
+        for synset in found:
+            self._add_info(synset)
+        return [self.synset(name) for name in names]
+
+    def synset(self, name):
+        """
+        Looks up a synset by name, like ``wn.synset``.
+
+        Args:
+            name (str): The synset's name, e.g. ``"turn.v.01"``
+
+        Returns:
+            CachedSynset: The synset
+        """
+        name = text(name)
+        if name not in self._info:
+            row = None
+            if name not in self._prefetched_names:
+                row = self.connection.execute("SELECT name, pos, min_depth, max_depth, definition, lemma_names FROM synset_info WHERE version = ? AND name = ?", (self.key(), name)).fetchone()
+            if row is not None:
+                self._load_info(row)
+            else:
+                # WordNet raises an error here if there is no such synset
+                self.misses += 1
+                self._add_info(self.wordnet.synset(name))
+        return CachedSynset(self, name)
+
+    def path_similarity(self, first, second):
+        """
+        Scores the path similarity of two synsets, from the cache if it has the score.
+
+        Args:
+            first (str): The name of the synset whose ``path_similarity`` is called
+            second (str): The name of the other synset
+
+        Returns:
+            float: The score, ``None`` if WordNet gives ``None``
+        """
+        key = (first, second)
+        if key not in self._scores and second not in self._prefetched_seconds:
+            row = self.connection.execute("SELECT score FROM similarities WHERE version = ? AND first = ? AND second = ?", (self.key(),) + key).fetchone()
+            if row is not None:
+                self._scores[key] = row[0]
+        if key in self._scores:
+            self.hits += 1
+            return self._scores[key]
+
+        self.misses += 1
+        score = self._scores[key] = self._resolve(first).path_similarity(self._resolve(second))
+        self._store("similarities", key + (score,))
+        return score
+
+    def info(self, name):
+        """
+        Gets what the cache knows about a synset.
+
+        Args:
+            name (str): The synset's name
+
+        Returns:
+            tuple: The synset's part of speech, ``min_depth()``, ``max_depth()``, definition and lemma names
+        """
+        return self._info[name]
+
+    def prefetch(self, words=(), synset_names=()):
+        """
+        Loads everything the database has for a list of words and synsets in a few queries, instead of one query for each later lookup. Later lookups of these words and synsets that were not loaded go straight to WordNet.
+
+        Args:
+            words (list): Words whose synsets will be looked up, for every part of speech
+            synset_names (list): Names of synsets whose scores against other synsets will be looked up, e.g. the known synsets. Scores are loaded when the named synset is the second one
+
+        Returns:
+            int: The number of answers loaded
+        """
+        loaded = 0
+        words = set(text(word) for word in words)
+        names = set(text(name) for name in synset_names)
+        for chunk in chunks(words):
+            rows = self.connection.execute("SELECT word, pos, names FROM synsets WHERE version = ? AND word IN (%s)" % ",".join("?" * len(chunk)), [self.key()] + chunk).fetchall()
+            for word, pos, word_names in rows:
+                self._synsets[(word, pos)] = tuple(name for name in word_names.split("\t") if name)
+                names.update(self._synsets[(word, pos)])
+            loaded += len(rows)
+        for chunk in chunks(name for name in names if name not in self._info):
+            rows = self.connection.execute("SELECT name, pos, min_depth, max_depth, definition, lemma_names FROM synset_info WHERE version = ? AND name IN (%s)" % ",".join("?" * len(chunk)), [self.key()] + chunk).fetchall()
+            for row in rows:
+                self._load_info(row)
+            loaded += len(rows)
+        seconds = set(text(name) for name in synset_names)
+        for chunk in chunks(seconds):
+            rows = self.connection.execute("SELECT first, second, score FROM similarities WHERE version = ? AND second IN (%s)" % ",".join("?" * len(chunk)), [self.key()] + chunk).fetchall()
+            for first, second, score in rows:
+                self._scores[(first, second)] = score
+            loaded += len(rows)
+        self._prefetched_words.update(words)
+        self._prefetched_names.update(names)
+        self._prefetched_seconds.update(seconds)
+        return loaded
+
+    def flush(self):
+        """
+        Writes the new answers to the database in one transaction.
+
+        Returns:
+            int: The number of answers written
+        """
+        statements = {
+            "synsets": "INSERT OR REPLACE INTO synsets (version, word, pos, names) VALUES (?, ?, ?, ?)",
+            "synset_info": "INSERT OR REPLACE INTO synset_info (version, name, pos, min_depth, max_depth, definition, lemma_names) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            "similarities": "INSERT OR REPLACE INTO similarities (version, first, second, score) VALUES (?, ?, ?, ?)",
+        }
+        written = 0
+        with self.connection:
+            for table, rows in self._pending.items():
+                if rows:
+                    self.connection.executemany(statements[table], [(self.key(),) + row for row in rows])
+                    written += len(rows)
+                    del rows[:]
+        self.writes += written
+        return written
+
+    def close(self):
+        """
+        Writes the new answers and closes the database.
+        """
+        self.flush()
+        self.connection.close()
+
+    def stats(self):
+        """
+        Summarizes how the queries were answered.
+
+        Returns:
+            dict: The ``hits``, ``misses`` and ``writes``, and the ``hit_rate`` of the cache
+        """
+        queries = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "writes": self.writes, "hit_rate": float(self.hits) / queries if queries else 0.0}
+
+    def _resolve(self, name):
+        synset = self._resolved.get(name)
+        if synset is None:
+            synset = self._resolved[name] = self.wordnet.synset(name)
+        return synset
+
+    def _add_info(self, synset):
+        # Keeps what is needed to answer for a synset of WordNet's without asking WordNet again
+        name = synset.name()
+        if name not in self._info:
+            row = (name, synset.pos(), synset.min_depth(), synset.max_depth(), synset.definition(), "\t".join(synset.lemma_names()))
+            self._load_info(row)
+            self._store("synset_info", row)
+
+    def _load_info(self, row):
+        name, pos, min_depth, max_depth, definition, lemma_names = row
+        self._info[name] = (pos, min_depth, max_depth, definition, lemma_names.split("\t"))
+
+    def _store(self, table, row):
+        self._pending[table].append(row)
+        if sum(len(rows) for rows in self._pending.itervalues()) >= self.batch_size:
+            self.flush()
+
+class CachedSynset(object):
+    """ A synset whose details and scores are answered by a :class:`~semsim.cache.CachedWordNet`, with the methods of NLTK's ``Synset`` that semsim uses.
+
+    Attributes:
+        cache (CachedWordNet): The cache that answers for the synset
+    """
+    __slots__ = ("cache", "_name")
+
+    def __init__(self, cache, name):
+        """ Constructor for the :class:`~semsim.cache.CachedSynset` class. Synsets are made by :meth:`CachedWordNet.synset` and :meth:`CachedWordNet.synsets`
+
+        Args:
+            cache (CachedWordNet): The cache that answers for the synset
+            name (str): The synset's name
+        """
+        self.cache = cache
+        self._name = name
+
+    def name(self):
+        return self._name
+
+    def pos(self):
+        return self.cache.info(self._name)[0]
+
+    def min_depth(self):
+        return self.cache.info(self._name)[1]
+
+    def max_depth(self):
+        return self.cache.info(self._name)[2]
+
+    def definition(self):
+        return self.cache.info(self._name)[3]
+
+    def lemma_names(self):
+        return self.cache.info(self._name)[4]
+
+    def path_similarity(self, other):
+        return self.cache.path_similarity(self._name, other.name())
+
+    def __eq__(self, other):
+        return isinstance(other, CachedSynset) and self._name == other._name
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._name)
+
+    def __repr__(self):
+        return "Synset(%r)" % str(self._name)
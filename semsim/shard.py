@@ -0,0 +1,428 @@
+"""
+Splits a semsim run over a word list into units of work that any number of worker processes, on any number of machines, share through a directory.
+
+Mapping a whole word list onto the known words takes hours in one process, and a run that is stopped has to start over. :meth:`create` splits the word list into units of ``unit_size`` words in a directory that every worker can reach, e.g. on a network file system:
+
+* ``manifest.json`` with the part of speech and the number of units, next to copies of the known words and synset files, so every worker maps with the same input
+* ``units/<unit>.txt`` with the words of each unit
+* ``locks/<unit>.lock`` while a worker is mapping a unit
+* ``results/<unit>.csv`` with the words of a unit that were matched and the lines of their known words
+
+A :class:`~semsim.shard.ShardWorker` claims a unit by creating its lock file with ``O_CREAT | O_EXCL``, which only one worker can do, maps it, and writes the result to a temporary file that is then renamed into place, so a result is either complete or missing. The lock file holds a token unique to the claim. While it maps a unit, the worker touches the lock file every ``heartbeat`` seconds, as long as the lock still holds its token. A lock that has not been touched for ``lock_timeout`` seconds belongs to a worker that died, and the next worker that finds it breaks it. A worker only removes a lock that still holds its token, so a worker that stalled past the timeout does not remove the lock of the worker that took over. Units that have a result are skipped, so a stopped run is resumed by starting workers again. If two workers ever map the same unit, e.g. after a lock was broken too early, they write the same result.
+
+Once every unit has a result, :meth:`merge` combines the results in unit order into the known words file that :meth:`~semsim.wntest.build_known_file` would write for the whole word list in one process, whichever workers mapped which units.
+
+From the repository root::
+
+    python -m semsim.shard create /shared/verbs known_actions.txt input_files/wordlists/verbs.txt input_files/synsets/known-verbs.csv --pos verb
+    python -m semsim.shard work /shared/verbs --processes 4
+    python -m semsim.shard status /shared/verbs
+    python -m semsim.shard merge /shared/verbs known_actions_verbs.txt
+"""
+import argparse
+import csv
+import errno
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from cStringIO import StringIO
+
+def unit_filename(directory, kind, unit):
+    """
+    Gets the path of a unit's file.
+
+    Args:
+        directory (str): The shared directory
+        kind (str): ``"units"``, ``"locks"`` or ``"results"``
+        unit (int): The unit's number
+
+    Returns:
+        str: The path
+    """
+    extension = {"units": ".txt", "locks": ".lock", "results": ".csv"}[kind]
+    return os.path.join(directory, kind, "%05d%s" % (unit, extension))
+
+def unique_suffix():
+    # Tells apart the files of workers on different machines, processes and threads
+    return "%s.%d.%d" % (socket.gethostname(), os.getpid(), threading.current_thread().ident)
+
+def write_atomically(filename, data):
+    """
+    Writes a file so that other workers see either all of it or none of it.
+
+    Args:
+        filename (str): The file
+        data (str): What to write
+    """
+    temp_filename = "%s.%s.tmp" % (filename, unique_suffix())
+    with open(temp_filename, "wb") as temp_file:
+        temp_file.write(data)
+    try:
+        os.rename(temp_filename, filename)
+    except OSError:
+        # Windows does not rename over a file, which another worker has written already
+        os.remove(temp_filename)
+        if not os.path.exists(filename):
+            raise
+
+def create(directory, known_words_filename, wordlist_filename, synset_csv_filename, pos=None, unit_size=500):
+    """
+    Splits a word list into units of work in a shared directory. If the directory already holds a run, the run is left as it is, so it can be resumed.
+
+    Args:
+        directory (str): The shared directory, created if it does not exist
+        known_words_filename (str): The file of known words, see :meth:`~semsim.wntest.read_known_words`
+        wordlist_filename (str): The file of unknown words to map, one word per line
+        synset_csv_filename (str): The CSV file pairing the first known word of each line with its synset
+        pos (str): The part of speech of the words, see :meth:`~semsim.wntest.build_known_file`
+        unit_size (int): The number of words in each unit
+
+    Returns:
+        dict: The run's manifest
+    """
+    manifest_filename = os.path.join(directory, "manifest.json")
+    if os.path.exists(manifest_filename):
+        return read_manifest(directory)
+
+    for kind in ("units", "locks", "results"):
+        try:
+            os.makedirs(os.path.join(directory, kind))
+        except OSError as err:
+            if err.errno != errno.EEXIST:
+                raise
+    shutil.copyfile(known_words_filename, os.path.join(directory, "known.txt"))
+    shutil.copyfile(synset_csv_filename, os.path.join(directory, "synsets.csv"))
+
+    with open(wordlist_filename, "rb") as wordlist_file:
+        words = [line.strip() for line in wordlist_file if line.strip()]
+    units = (len(words) + unit_size - 1) // unit_size
+    for unit in range(units):
+        write_atomically(unit_filename(directory, "units", unit), "\n".join(words[unit * unit_size:(unit + 1) * unit_size]) + "\n")
+
+    # The manifest is written last, so a directory with a manifest has every unit
+    manifest = {"pos": pos, "unit_size": unit_size, "units": units, "words": len(words)}
+    write_atomically(manifest_filename, json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+    return manifest
+
+def read_manifest(directory):
+    """
+    Reads the manifest of a run.
+
+    Args:
+        directory (str): The shared directory
+
+    Returns:
+        dict: The ``pos``, ``unit_size`` and number of ``units`` and ``words`` of the run
+    """
+    with open(os.path.join(directory, "manifest.json"), "rb") as manifest_file:
+        return json.load(manifest_file)
+
+def default_mapper(directory, manifest):
+    """
+    Makes the function that maps a unit with :meth:`~semsim.wntest.map_unknown_words`.
+
+    Args:
+        directory (str): The shared directory
+        manifest (dict): The run's manifest
+
+    Returns:
+        function: Maps the unit in the given file, returning a list of the matched words paired with the line numbers of their known words
+    """
+    import wntest
+    known_words_dict = wntest.read_known_words(os.path.join(directory, "known.txt"), os.path.join(directory, "synsets.csv"))[0]
+    kwargs = {"pos": manifest["pos"]} if manifest["pos"] else {}
+    return lambda filename: wntest.map_unknown_words(known_words_dict, filename, **kwargs)
+
+class ShardWorker:
+    """ Maps the units of a run that no other worker has mapped or is mapping.
+
+    Attributes:
+        completed (list): The numbers of the units this worker mapped
+        broken (int): The number of stale locks this worker broke
+    """
+    def __init__(self, directory, mapper=None, lock_timeout=600.0, heartbeat=30.0):
+        """ Constructor for the :class:`~semsim.shard.ShardWorker` class
+
+        Args:
+            directory (str): The shared directory, set up by :meth:`create`
+            mapper (function): Maps the unit in the given file, returning a list of the matched words paired with the line numbers of their known words. :meth:`default_mapper` if left out
+            lock_timeout (float): The number of seconds after which a lock that has not been touched is taken to belong to a worker that died. Must be well above ``heartbeat``, and above the clock difference between machines
+            heartbeat (float): The number of seconds between touches of the lock of the unit being mapped
+        """
+        self.directory = directory
+        self.manifest = read_manifest(directory)
+        self.mapper = mapper
+        self.lock_timeout = lock_timeout
+        self.heartbeat = heartbeat
+        self.completed = []
+        self.broken = 0
+        # The token written into each lock this worker created, by unit
+        self._tokens = {}
+
+    def done(self, unit):
+        """
+        Checks if a unit has a result.
+
+        Args:
+            unit (int): The unit's number
+
+        Returns:
+            bool: ``True`` if the unit has been mapped
+        """
+        return os.path.exists(unit_filename(self.directory, "results", unit))
+
+    def claim(self, unit):
+        """
+        Tries to lock a unit for this worker, breaking its lock if the lock is stale.
+
+        Args:
+            unit (int): The unit's number
+
+        Returns:
+            bool: ``True`` if this worker holds the unit's lock
+        """
+        lock_filename = unit_filename(self.directory, "locks", unit)
+        for attempt in range(2):
+            try:
+                fd = os.open(lock_filename, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except OSError as err:
+                if err.errno != errno.EEXIST:
+                    raise
+                if attempt or not self._break_stale(lock_filename):
+                    return False
+                continue
+            # Unique to this claim, so a later claim of the unit by the same thread is told apart too
+            token = "%s.%s" % (unique_suffix(), uuid.uuid4().hex)
+            os.write(fd, "%s %.0f\n" % (token, time.time()))
+            os.close(fd)
+            self._tokens[unit] = token
+            return True
+        return False
+
+    def _break_stale(self, lock_filename):
+        # Renaming the lock away can only succeed for one worker, so only one worker breaks it
+        try:
+            age = time.time() - os.path.getmtime(lock_filename)
+        except OSError:
+            # The lock was released in the meantime
+            return True
+        if age < self.lock_timeout:
+            return False
+        stale_filename = "%s.%s.stale" % (lock_filename, unique_suffix())
+        try:
+            os.rename(lock_filename, stale_filename)
+        except OSError:
+            return False
+        os.remove(stale_filename)
+        self.broken += 1
+        return True
+
+    def holds(self, unit):
+        """
+        Checks if the unit's lock is still the one this worker created, and was not broken and claimed by another worker.
+
+        Args:
+            unit (int): The unit's number
+
+        Returns:
+            bool: ``True`` if the unit's lock holds this worker's token
+        """
+        token = self._tokens.get(unit)
+        if token is None:
+            return False
+        try:
+            with open(unit_filename(self.directory, "locks", unit), "rb") as lock_file:
+                return lock_file.read().split(" ", 1)[0] == token
+        except IOError as err:
+            if err.errno != errno.ENOENT:
+                raise
+            return False
+
+    def release(self, unit):
+        """
+        Unlocks a unit, unless its lock was broken and now belongs to another worker.
+
+        Args:
+            unit (int): The unit's number
+        """
+        try:
+            if self.holds(unit):
+                os.remove(unit_filename(self.directory, "locks", unit))
+        except OSError as err:
+            if err.errno != errno.ENOENT:
+                raise
+        finally:
+            self._tokens.pop(unit, None)
+
+    def map_unit(self, unit):
+        """
+        Maps a unit this worker holds the lock of and writes its result, touching the lock while the unit is mapped.
+
+        Args:
+            unit (int): The unit's number
+        """
+        lock_filename = unit_filename(self.directory, "locks", unit)
+        stop = threading.Event()
+        def beat():
+            while not stop.wait(self.heartbeat):
+                # A lock another worker claimed after breaking this one is not touched
+                try:
+                    if not self.holds(unit):
+                        return
+                    os.utime(lock_filename, None)
+                except (IOError, OSError):
+                    pass
+        beater = threading.Thread(target=beat, name="semsim-shard-heartbeat")
+        beater.daemon = True
+        beater.start()
+        try:
+            mapped = self.mapper(unit_filename(self.directory, "units", unit))
+        finally:
+            stop.set()
+            beater.join()
+
+        out = StringIO()
+        out_writer = csv.writer(out)
+        for word, line_num in mapped:
+            out_writer.writerow((word, line_num))
+        write_atomically(unit_filename(self.directory, "results", unit), out.getvalue())
+
+    def run(self, wait=False, poll=5.0):
+        """
+        Maps units until none is left that is neither mapped nor locked by another worker.
+
+        Args:
+            wait (bool): If ``True``, the worker keeps going until every unit has a result, waiting for the units other workers hold and taking over the ones whose locks go stale
+            poll (float): The number of seconds to wait between passes over the units when ``wait`` is ``True``
+
+        Returns:
+            int: The number of units this worker mapped
+        """
+        if self.mapper is None:
+            self.mapper = default_mapper(self.directory, self.manifest)
+        while True:
+            for unit in range(self.manifest["units"]):
+                if self.done(unit) or not self.claim(unit):
+                    continue
+                try:
+                    # Another worker may have finished the unit between the check and the claim
+                    if not self.done(unit):
+                        self.map_unit(unit)
+                        self.completed.append(unit)
+                finally:
+                    self.release(unit)
+            if not wait or all(self.done(unit) for unit in range(self.manifest["units"])):
+                return len(self.completed)
+            time.sleep(poll)
+
+def status(directory, lock_timeout=600.0):
+    """
+    Summarizes the progress of a run.
+
+    Args:
+        directory (str): The shared directory
+        lock_timeout (float): See :class:`~semsim.shard.ShardWorker`
+
+    Returns:
+        dict: The number of ``units``, and how many are ``done``, being mapped (``locked``), held by ``stale`` locks, and ``remaining``
+    """
+    manifest = read_manifest(directory)
+    res = {"units": manifest["units"], "done": 0, "locked": 0, "stale": 0, "remaining": 0}
+    now = time.time()
+    for unit in range(manifest["units"]):
+        lock_filename = unit_filename(directory, "locks", unit)
+        if os.path.exists(unit_filename(directory, "results", unit)):
+            res["done"] += 1
+            continue
+        res["remaining"] += 1
+        try:
+            age = now - os.path.getmtime(lock_filename)
+        except OSError:
+            continue
+        res["stale" if age >= lock_timeout else "locked"] += 1
+    return res
+
+def merge(directory, output_filename):
+    """
+    Combines the results of every unit, in unit order, into a known words file, like :meth:`~semsim.wntest.build_known_file` writes.
+
+    Args:
+        directory (str): The shared directory
+        output_filename (str): The known words file to write
+
+    Raises:
+        ValueError: If a unit has no result yet
+    """
+    import wntest
+    manifest = read_manifest(directory)
+    missing = [unit for unit in range(manifest["units"]) if not os.path.exists(unit_filename(directory, "results", unit))]
+    if missing:
+        raise ValueError("%d of %d units have not been mapped yet, the first is unit %d" % (len(missing), manifest["units"], missing[0]))
+
+    known_words_dict, final_word_list = wntest.read_known_words(os.path.join(directory, "known.txt"), os.path.join(directory, "synsets.csv"))
+    for unit in range(manifest["units"]):
+        with open(unit_filename(directory, "results", unit), "rb") as result_file:
+            final_word_list.extend((word, int(line_num)) for word, line_num in csv.reader(result_file))
+    wntest.write_known_file(known_words_dict, final_word_list, output_filename)
+
+def work(directory, lock_timeout=600.0, heartbeat=30.0, wait=False):
+    """
+    Runs a worker with the default mapper, e.g. in a process of its own.
+
+    Args:
+        directory (str): The shared directory
+        lock_timeout (float): See :class:`~semsim.shard.ShardWorker`
+        heartbeat (float): See :class:`~semsim.shard.ShardWorker`
+        wait (bool): See :meth:`ShardWorker.run`
+
+    Returns:
+        int: The number of units the worker mapped
+    """
+    return ShardWorker(directory, lock_timeout=lock_timeout, heartbeat=heartbeat).run(wait)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Share a semsim run over a word list between worker processes and machines")
+    commands = parser.add_subparsers(dest="command")
+    create_parser = commands.add_parser("create", help="split a word list into units in a shared directory")
+    create_parser.add_argument("directory")
+    create_parser.add_argument("known_words")
+    create_parser.add_argument("wordlist")
+    create_parser.add_argument("synsets")
+    create_parser.add_argument("--pos", help="part of speech of the words, e.g. verb")
+    create_parser.add_argument("--unit-size", type=int, default=500, help="number of words in each unit")
+    work_parser = commands.add_parser("work", help="map units until none is left")
+    work_parser.add_argument("directory")
+    work_parser.add_argument("--processes", type=int, default=1, help="number of worker processes to start on this machine")
+    work_parser.add_argument("--lock-timeout", type=float, default=600.0, help="seconds after which an untouched lock is stale")
+    work_parser.add_argument("--heartbeat", type=float, default=30.0, help="seconds between touches of a held lock")
+    work_parser.add_argument("--wait", action="store_true", help="keep going until every unit is mapped, taking over stale units")
+    status_parser = commands.add_parser("status", help="show the progress of a run")
+    status_parser.add_argument("directory")
+    status_parser.add_argument("--lock-timeout", type=float, default=600.0, help="seconds after which an untouched lock is stale")
+    merge_parser = commands.add_parser("merge", help="combine the results into a known words file")
+    merge_parser.add_argument("directory")
+    merge_parser.add_argument("output")
+    args = parser.parse_args(argv)
+
+    if args.command == "create":
+        manifest = create(args.directory, args.known_words, args.wordlist, args.synsets, args.pos, args.unit_size)
+        print ("%d words in %d units" % (manifest["words"], manifest["units"]))
+    elif args.command == "work":
+        workers = [multiprocessing.Process(target=work, args=(args.directory, args.lock_timeout, args.heartbeat, args.wait)) for i in range(args.processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        print (json.dumps(status(args.directory, args.lock_timeout), sort_keys=True))
+    elif args.command == "status":
+        print (json.dumps(status(args.directory, args.lock_timeout), sort_keys=True))
+    else:
+        merge(args.directory, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,451 @@
+"""
+Stores the part of WordNet that semsim uses in a compact file that loads in a fraction of the time of the WordNet corpus.
+
+The semsim mappers only look up the synsets of the words in the word lists and of the known words, and the hypernyms above them, but loading the WordNet corpus through NLTK reads the lemma index of every part of speech into memory first. :meth:`build` extracts the synsets of every word in the word lists and every synset in the synset CSV files, along with every hypernym above them, into a snapshot file:
+
+* The name, part of speech, definition and lemma names of each synset
+* The hypernyms and instance hypernyms of each synset, as synset numbers
+* The shortest and longest depth of each synset
+* A lemma index from each word and part of speech to its synsets, in the order WordNet gives them
+
+Every table in the file is either an array of 32-bit numbers or a sorted table of strings, so :class:`~semsim.snapshot.Snapshot` maps the file into memory and looks things up in place with binary search instead of reading it into Python objects. A :class:`~semsim.snapshot.Snapshot` answers the calls :mod:`semsim.wntest` makes to the WordNet corpus reader, and its synsets compute ``path_similarity`` the same way NLTK does, without importing NLTK.
+
+Build a snapshot from the word lists and synset files in ``input_files`` by running, from the repository root::
+
+    python -m semsim.snapshot wordnet.snapshot
+
+and set the ``LILI_WORDNET_SNAPSHOT`` environment variable to the snapshot's path to have :mod:`semsim.wntest` use it instead of the WordNet corpus. Words that are not in the word lists have no synsets in the snapshot.
+"""
+import argparse
+import array
+import csv
+import glob
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from collections import deque
+
+magic = "LILIWNS1"
+
+# The sections of a snapshot file, in the order their offsets and lengths are stored in the header
+section_names = [
+    "version",
+    "names", "name_offsets",
+    "pos",
+    "definitions", "definition_offsets",
+    "lemmas", "lemma_offsets",
+    "hypernyms", "hypernym_offsets",
+    "min_depths", "max_depths",
+    "keys", "key_offsets",
+    "key_synsets", "key_synset_offsets",
+]
+
+# The parts of speech looked up for each word, in the order WordNet looks them up when no part of speech is given
+pos_list = ["n", "v", "a", "r"]
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def pack_numbers(numbers):
+    """
+    Packs numbers into an array of little-endian, unsigned 32-bit numbers.
+
+    Args:
+        numbers (list): The numbers
+
+    Returns:
+        str: The packed array
+    """
+    packed = array.array("I", numbers)
+    assert packed.itemsize == 4
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tostring()
+
+def pack_strings(strings):
+    """
+    Packs strings into a table, stored as the strings one after another and the offset of each one.
+
+    Args:
+        strings (list): The strings, as UTF-8 encoded byte strings
+
+    Returns:
+        tuple: The strings and the packed offsets, which have one more entry than there are strings
+    """
+    offsets = [0]
+    for string in strings:
+        offsets.append(offsets[-1] + len(string))
+    return "".join(strings), pack_numbers(offsets)
+
+def encode(text):
+    # Names and words are stored as UTF-8
+    return text.encode("utf-8") if isinstance(text, unicode) else text
+
+def build(out_filename, wordlist_filenames, synset_csv_filenames, wordnet=None):
+    """
+    Extracts the synsets of the words in word lists and synset CSV files, with every hypernym above them, and writes them to a snapshot file.
+
+    Args:
+        out_filename (str): The snapshot file to write
+        wordlist_filenames (list): Text files with one word per line, like ``input_files/wordlists/verbs.txt``
+        synset_csv_filenames (list): CSV files with a header line and the name of a synset in the second column of every other line, like ``input_files/synsets/known-verbs.csv``
+        wordnet (object): The WordNet corpus reader to extract from, ``nltk.corpus.wordnet`` if left out
+
+    Returns:
+        dict: The number of ``synsets`` and ``words`` in the snapshot and its size in ``bytes``
+    """
+    if wordnet is None:
+        from nltk.corpus import wordnet
+
+    synsets = {}
+    def add_closure(synset):
+        # Adds a synset and every hypernym above it
+        queue = deque([synset])
+        while queue:
+            synset = queue.popleft()
+            if synset.name() not in synsets:
+                synsets[synset.name()] = synset
+                queue.extend(synset.hypernyms() + synset.instance_hypernyms())
+
+    keys = {}
+    for wordlist_filename in wordlist_filenames:
+        with open(wordlist_filename, "rb") as wordlist_file:
+            for line in wordlist_file:
+                word = line.strip().lower()
+                if not word:
+                    continue
+                for pos in pos_list:
+                    found = wordnet.synsets(word, pos)
+                    if found:
+                        keys[encode(word) + "\t" + pos] = found
+                        for synset in found:
+                            add_closure(synset)
+
+    for synset_csv_filename in synset_csv_filenames:
+        with open(synset_csv_filename, "rb") as synset_file:
+            synset_file_reader = csv.reader(synset_file)
+            # Assuming first line in CSV file is a header, so skip it
+            next(synset_file_reader, None)
+            for row in synset_file_reader:
+                if len(row) > 1 and row[1].strip():
+                    add_closure(wordnet.synset(row[1].strip()))
+
+    # Synsets are numbered in the order of their names, so a name can be found with binary search
+    names = sorted(synsets, key=encode)
+    numbers = dict((name, i) for i, name in enumerate(names))
+    ordered = [synsets[name] for name in names]
+    hypernyms = [[numbers[hypernym.name()] for hypernym in synset.hypernyms() + synset.instance_hypernyms()] for synset in ordered]
+    hypernym_offsets = [0]
+    for synset_hypernyms in hypernyms:
+        hypernym_offsets.append(hypernym_offsets[-1] + len(synset_hypernyms))
+    key_names = sorted(keys)
+    key_synset_offsets = [0]
+    for key in key_names:
+        key_synset_offsets.append(key_synset_offsets[-1] + len(keys[key]))
+
+    sections = {
+        "version": encode(wordnet.get_version()),
+        "pos": "".join(encode(synset.pos()) for synset in ordered),
+        "hypernyms": pack_numbers([hypernym for synset_hypernyms in hypernyms for hypernym in synset_hypernyms]),
+        "hypernym_offsets": pack_numbers(hypernym_offsets),
+        "min_depths": pack_numbers([synset.min_depth() for synset in ordered]),
+        "max_depths": pack_numbers([synset.max_depth() for synset in ordered]),
+        "key_synsets": pack_numbers([numbers[synset.name()] for key in key_names for synset in keys[key]]),
+        "key_synset_offsets": pack_numbers(key_synset_offsets),
+    }
+    sections["names"], sections["name_offsets"] = pack_strings([encode(name) for name in names])
+    sections["definitions"], sections["definition_offsets"] = pack_strings([encode(synset.definition()) for synset in ordered])
+    sections["lemmas"], sections["lemma_offsets"] = pack_strings(["\t".join(encode(lemma_name) for lemma_name in synset.lemma_names()) for synset in ordered])
+    sections["keys"], sections["key_offsets"] = pack_strings(key_names)
+
+    # The header is followed by each section, starting on a multiple of 4 bytes
+    header = [magic, struct.pack("<I", len(section_names))]
+    body = []
+    offset = len(magic) + 4 + 8 * len(section_names)
+    for name in section_names:
+        data = sections[name]
+        header.append(struct.pack("<II", offset, len(data)))
+        padding = "\0" * (-len(data) % 4)
+        body.extend((data, padding))
+        offset += len(data) + len(padding)
+
+    with open(out_filename, "wb") as out_file:
+        out_file.write("".join(header + body))
+
+    return {"synsets": len(names), "words": len(set(key.split("\t")[0] for key in key_names)), "bytes": offset}
+
+class Snapshot:
+    """ A snapshot of part of WordNet, mapped into memory, that answers the lookups :mod:`semsim.wntest` makes to the WordNet corpus reader.
+
+    Attributes:
+        count (int): The number of synsets in the snapshot
+    """
+    NOUN = "n"
+    VERB = "v"
+    ADJ = "a"
+    ADJ_SAT = "s"
+    ADV = "r"
+
+    def __init__(self, filename):
+        """ Constructor for the :class:`~semsim.snapshot.Snapshot` class
+
+        Args:
+            filename (str): The snapshot file, written by :meth:`~semsim.snapshot.build`
+
+        Raises:
+            ValueError: If the file is not a snapshot file
+        """
+        with open(filename, "rb") as snapshot_file:
+            self._map = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(magic)] != magic or struct.unpack_from("<I", self._map, len(magic))[0] != len(section_names):
+            raise ValueError("%s is not a WordNet snapshot" % filename)
+        self._sections = {}
+        for i, name in enumerate(section_names):
+            self._sections[name] = struct.unpack_from("<II", self._map, len(magic) + 4 + 8 * i)
+        self._version = self._section("version")
+        self._digest = None
+        self.count = self._sections["pos"][1]
+        self._key_count = self._sections["key_offsets"][1] // 4 - 1
+        # Each synset is made once, and the hypernym distances of each synset are found once
+        self._synsets = {}
+        self._paths = {}
+
+    def _section(self, name):
+        offset, length = self._sections[name]
+        return self._map[offset:offset + length]
+
+    def _numbers(self, name, start, end):
+        offset = self._sections[name][0]
+        return struct.unpack_from("<%dI" % (end - start), self._map, offset + 4 * start)
+
+    def _string(self, name, i):
+        # The offsets of the names table are in name_offsets, and so on
+        start, end = self._numbers(name[:-1] + "_offsets", i, i + 2)
+        offset = self._sections[name][0]
+        return self._map[offset + start:offset + end]
+
+    def _search(self, name, count, key):
+        # Binary search of a sorted table of strings
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if self._string(name, middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < count and self._string(name, low) == key:
+            return low
+        return None
+
+    def get_version(self):
+        """
+        Gets the version of the WordNet corpus the snapshot was extracted from.
+
+        Returns:
+            str: The version, e.g. ``"3.0"``
+        """
+        return self._version
+
+    def cache_tag(self):
+        """
+        Tells a query cache that answers come from this snapshot rather than the whole WordNet corpus, see :class:`~semsim.cache.CachedWordNet`. A snapshot only holds part of WordNet, so its answers must not be used for the corpus or for another snapshot.
+
+        Returns:
+            str: ``"snapshot"`` followed by the SHA-1 of the snapshot file
+        """
+        if self._digest is None:
+            digest = hashlib.sha1()
+            for start in xrange(0, len(self._map), 1 << 20):
+                digest.update(self._map[start:start + (1 << 20)])
+            self._digest = digest.hexdigest()
+        return "snapshot " + self._digest
+
+    def synset_of(self, number):
+        """
+        Gets a synset by its number in the snapshot.
+
+        Args:
+            number (int): The synset's number
+
+        Returns:
+            SnapshotSynset: The synset
+        """
+        synset = self._synsets.get(number)
+        if synset is None:
+            synset = self._synsets[number] = SnapshotSynset(self, number)
+        return synset
+
+    def synset(self, name):
+        """
+        Looks up a synset by name, like ``wn.synset``.
+
+        Args:
+            name (str): The synset's name, e.g. ``"turn.v.01"``
+
+        Returns:
+            SnapshotSynset: The synset
+
+        Raises:
+            KeyError: If the synset is not in the snapshot
+        """
+        number = self._search("names", self.count, encode(name))
+        if number is None:
+            raise KeyError(name)
+        return self.synset_of(number)
+
+    def synsets(self, lemma, pos=None):
+        """
+        Looks up the synsets of a word, like ``wn.synsets``.
+
+        Args:
+            lemma (str): The word
+            pos (str): The part of speech of the synsets, e.g. :attr:`VERB`. Synsets of every part of speech are returned if left out
+
+        Returns:
+            list: The synsets, in the order WordNet gives them. Empty if the word was not in a word list the snapshot was built from
+        """
+        res = []
+        for p in pos or pos_list:
+            i = self._search("keys", self._key_count, encode(lemma.lower()) + "\t" + p)
+            if i is not None:
+                start, end = self._numbers("key_synset_offsets", i, i + 2)
+                res.extend(self.synset_of(number) for number in self._numbers("key_synsets", start, end))
+        return res
+
+    def close(self):
+        """
+        Unmaps the snapshot file. The snapshot and its synsets cannot be used afterwards.
+        """
+        self._map.close()
+
+class SnapshotSynset(object):
+    """ A synset of a :class:`~semsim.snapshot.Snapshot`, with the methods of NLTK's ``Synset`` that semsim uses.
+
+    Attributes:
+        snapshot (Snapshot): The snapshot the synset belongs to
+        number (int): The synset's number in the snapshot
+    """
+    __slots__ = ("snapshot", "number")
+
+    def __init__(self, snapshot, number):
+        """ Constructor for the :class:`~semsim.snapshot.SnapshotSynset` class. Synsets are made by :meth:`Snapshot.synset_of`
+
+        Args:
+            snapshot (Snapshot): The snapshot the synset belongs to
+            number (int): The synset's number in the snapshot
+        """
+        self.snapshot = snapshot
+        self.number = number
+
+    def name(self):
+        return self.snapshot._string("names", self.number).decode("utf-8")
+
+    def pos(self):
+        return self.snapshot._map[self.snapshot._sections["pos"][0] + self.number]
+
+    def definition(self):
+        return self.snapshot._string("definitions", self.number).decode("utf-8")
+
+    def lemma_names(self):
+        return self.snapshot._string("lemmas", self.number).decode("utf-8").split("\t")
+
+    def hypernyms(self):
+        """
+        Gets the synsets directly above this one.
+
+        Returns:
+            list: The hypernyms followed by the instance hypernyms of the synset
+        """
+        start, end = self.snapshot._numbers("hypernym_offsets", self.number, self.number + 2)
+        return [self.snapshot.synset_of(number) for number in self.snapshot._numbers("hypernyms", start, end)]
+
+    def min_depth(self):
+        return self.snapshot._numbers("min_depths", self.number, self.number + 1)[0]
+
+    def max_depth(self):
+        return self.snapshot._numbers("max_depths", self.number, self.number + 1)[0]
+
+    def _needs_root(self):
+        # The verb hierarchies have no single root, and neither did the nouns before WordNet 2.0
+        return self.pos() == "v" or (self.pos() == "n" and self.snapshot.get_version() == "1.6")
+
+    def _hypernym_distances(self):
+        # The fewest edges from this synset up to each synset above it, found with a breadth-first search
+        distances = self.snapshot._paths.get(self.number)
+        if distances is None:
+            distances = {}
+            queue = deque([(self.number, 0)])
+            while queue:
+                number, distance = queue.popleft()
+                if number in distances:
+                    continue
+                distances[number] = distance
+                start, end = self.snapshot._numbers("hypernym_offsets", number, number + 2)
+                queue.extend((hypernym, distance + 1) for hypernym in self.snapshot._numbers("hypernyms", start, end))
+            self.snapshot._paths[self.number] = distances
+        return distances
+
+    def shortest_path_distance(self, other, simulate_root=False):
+        """
+        Finds the fewest edges between this synset and another one, going up to a hypernym they share, like NLTK's ``Synset.shortest_path_distance``.
+
+        Args:
+            other (SnapshotSynset): The other synset
+            simulate_root (bool): If ``True``, both synsets are taken to share a root above the highest hypernym of each
+
+        Returns:
+            int: The number of edges, ``None`` if the synsets share no hypernym
+        """
+        if self == other:
+            return 0
+        distances = self._hypernym_distances()
+        other_distances = other._hypernym_distances()
+        shared = [distance + other_distances[number] for number, distance in distances.iteritems() if number in other_distances]
+        if simulate_root:
+            # NLTK puts the simulated root one edge above the farthest hypernym of each synset
+            shared.append(max(distances.itervalues()) + 1 + max(other_distances.itervalues()) + 1)
+        return min(shared) if shared else None
+
+    def path_similarity(self, other, simulate_root=True):
+        """
+        Scores how similar this synset is to another one by the shortest path between them, like NLTK's ``Synset.path_similarity``.
+
+        Args:
+            other (SnapshotSynset): The other synset
+            simulate_root (bool): If ``True`` and this synset is a verb, both synsets are taken to share a root above their hierarchies
+
+        Returns:
+            float: The score, between 0 and 1, ``None`` if there is no path between the synsets
+        """
+        distance = self.shortest_path_distance(other, simulate_root=simulate_root and self._needs_root())
+        if distance is None or distance < 0:
+            return None
+        return 1.0 / (distance + 1)
+
+    def __eq__(self, other):
+        return isinstance(other, SnapshotSynset) and self.snapshot is other.snapshot and self.number == other.number
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return self.number
+
+    def __repr__(self):
+        return "Synset(%r)" % str(self.name())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract the part of WordNet that semsim uses into a snapshot file")
+    parser.add_argument("output", help="snapshot file to write")
+    parser.add_argument("--wordlist", action="append", help="word list to extract the synsets of (default: every file in input_files/wordlists)")
+    parser.add_argument("--synsets", action="append", help="synset CSV file to extract (default: every file in input_files/synsets)")
+    args = parser.parse_args(argv)
+
+    wordlist_filenames = args.wordlist or sorted(glob.glob(os.path.join(root, "input_files", "wordlists", "*.txt")))
+    synset_csv_filenames = args.synsets or sorted(glob.glob(os.path.join(root, "input_files", "synsets", "*.csv")))
+    res = build(args.output, wordlist_filenames, synset_csv_filenames)
+    print ("Wrote %d synsets and %d words to %s (%d bytes)" % (res["synsets"], res["words"], args.output, res["bytes"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import semsim.cache as cache
+import semsim.snapshot as snapshot
+from semsim.test_snapshot import build_fake
+
+class CountingWordNet:
+    # Counts the queries that reach WordNet
+    def __init__(self, wordnet):
+        self.wordnet = wordnet
+        self.queries = 0
+
+    def __getattr__(self, name):
+        return getattr(self.wordnet, name)
+
+    def synsets(self, lemma, pos=None):
+        self.queries += 1
+        return self.wordnet.synsets(lemma, pos)
+
+    def synset(self, name):
+        self.queries += 1
+        return self.wordnet.synset(name)
+
+def lookups(wordnet):
+    stroll = wordnet.synsets("stroll", wordnet.VERB)[0]
+    talk = wordnet.synset("talk.v.01")
+    return [
+        [synset.name() for synset in wordnet.synsets("walk")],
+        wordnet.synsets("saunter"),
+        (stroll.min_depth(), stroll.max_depth(), stroll.lemma_names(), stroll.definition()),
+        stroll.path_similarity(talk),
+        wordnet.synset("walk.n.01").path_similarity(stroll),
+    ]
+
+def test_answers_from_database(tmpdir):
+    snap = snapshot.Snapshot(build_fake(tmpdir)[0])
+    filename = str(tmpdir.join("cache.sqlite"))
+    expected = lookups(snap)
+
+    first = CountingWordNet(snap)
+    cached = cache.CachedWordNet(filename, first)
+    assert lookups(cached) == expected
+    assert first.queries > 0
+    cached.close()
+
+    # A later run gets every answer from the database, including the empty and None ones
+    second = CountingWordNet(snap)
+    cached = cache.CachedWordNet(filename, second)
+    assert cached.prefetch(["walk", "stroll", "saunter"], ["talk.v.01", "stroll.v.01"]) > 0
+    assert lookups(cached) == expected
+    assert second.queries == 0
+    assert cached.stats()["misses"] == 0
+    cached.close()
+
+def test_versions_kept_apart(tmpdir):
+    snap = snapshot.Snapshot(build_fake(tmpdir)[0])
+    filename = str(tmpdir.join("cache.sqlite"))
+    cached = cache.CachedWordNet(filename, snap)
+    lookups(cached)
+    cached.close()
+    other = CountingWordNet(snap)
+    cached = cache.CachedWordNet(filename, other, version="other")
+    lookups(cached)
+    assert other.queries > 0
+    cached.close()
+
+def test_batched_writes(tmpdir):
+    snap = snapshot.Snapshot(build_fake(tmpdir)[0])
+    cached = cache.CachedWordNet(str(tmpdir.join("cache.sqlite")), snap, batch_size=1000)
+    lookups(cached)
+    # Nothing is written until the batch is full or the cache is flushed
+    assert cached.writes == 0
+    assert cached.flush() > 0
+    assert cached.flush() == 0
+    cached.close()
+
+class CorpusWordNet(CountingWordNet):
+    # Stands in for the whole WordNet corpus: the same version as the snapshot, but not a snapshot
+    def __init__(self, wordnet):
+        CountingWordNet.__init__(self, wordnet)
+        self.version_lookups = 0
+
+    def __getattr__(self, name):
+        if name == "cache_tag":
+            raise AttributeError(name)
+        return getattr(self.wordnet, name)
+
+    def get_version(self):
+        self.version_lookups += 1
+        return self.wordnet.get_version()
+
+def test_snapshot_answers_kept_apart(tmpdir):
+    snap = snapshot.Snapshot(build_fake(tmpdir)[0])
+    filename = str(tmpdir.join("cache.sqlite"))
+    cached = cache.CachedWordNet(filename, snap)
+    lookups(cached)
+    cached.close()
+
+    # The corpus is not answered from what the snapshot stored, and its version is only looked up when it is needed
+    corpus = CorpusWordNet(snap)
+    cached = cache.CachedWordNet(filename, corpus)
+    assert corpus.version_lookups == 0
+    lookups(cached)
+    assert corpus.queries > 0
+    assert cached.key() == snap.get_version()
+    cached.close()
@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+import time
+import pytest
+import semsim.shard as shard
+import semsim.wntest as wntest
+
+words = ["walk", "run", "xylophone", "stroll", "spin", "twist", "chat", "speak", "whisper", "jog", "xenon", "roll", "shout"]
+
+def mapper(filename):
+    # Stands in for WordNet: words starting with x have no match, the rest go on the line given by their length
+    with open(filename, "rb") as unit_file:
+        unit_words = [line.strip() for line in unit_file if line.strip()]
+    return [(word, len(word) % 3) for word in unit_words if not word.startswith("x")]
+
+def set_up(tmpdir, unit_size=3):
+    known = tmpdir.join("known.txt")
+    known.write("move,go\nturn\ntalk,say\n")
+    synsets = tmpdir.join("known.csv")
+    synsets.write("verb,synset\nmove,move.v.01\nturn,turn.v.01\ntalk,talk.v.01\n")
+    wordlist = tmpdir.join("words.txt")
+    wordlist.write("\n".join(words) + "\n\n")
+    directory = str(tmpdir.join("run"))
+    shard.create(directory, str(known), str(wordlist), str(synsets), "verb", unit_size)
+    # The known words file one process would write for the whole word list
+    known_words_dict, final_word_list = wntest.read_known_words(str(known), str(synsets))
+    expected = str(tmpdir.join("expected.txt"))
+    wntest.write_known_file(known_words_dict, final_word_list + mapper(str(wordlist)), expected)
+    return directory, open(expected, "rb").read()
+
+def run_worker(directory):
+    shard.ShardWorker(directory, mapper).run()
+
+def test_workers_share_units(tmpdir):
+    directory, expected = set_up(tmpdir, unit_size=2)
+    assert shard.read_manifest(directory)["units"] == 7
+    workers = [multiprocessing.Process(target=run_worker, args=(directory,)) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert shard.status(directory) == {"units": 7, "done": 7, "locked": 0, "stale": 0, "remaining": 0}
+    assert os.listdir(os.path.join(directory, "locks")) == []
+    output = str(tmpdir.join("output.txt"))
+    shard.merge(directory, output)
+    assert open(output, "rb").read() == expected
+
+def test_resume_after_stale_lock(tmpdir):
+    directory, expected = set_up(tmpdir)
+    # A worker died holding unit 0, and another is still mapping unit 1
+    for unit in (0, 1):
+        open(shard.unit_filename(directory, "locks", unit), "wb").close()
+    old = time.time() - 120
+    os.utime(shard.unit_filename(directory, "locks", 0), (old, old))
+    assert shard.status(directory, lock_timeout=60) == {"units": 5, "done": 0, "locked": 1, "stale": 1, "remaining": 5}
+
+    worker = shard.ShardWorker(directory, mapper, lock_timeout=60)
+    assert worker.run() == 4
+    assert (worker.broken, 1 in worker.completed) == (1, False)
+    with pytest.raises(ValueError):
+        shard.merge(directory, str(tmpdir.join("output.txt")))
+
+    # Once unit 1 is free, a new worker maps only that unit
+    os.remove(shard.unit_filename(directory, "locks", 1))
+    worker = shard.ShardWorker(directory, mapper)
+    assert worker.run() == 1
+    assert worker.completed == [1]
+    output = str(tmpdir.join("output.txt"))
+    shard.merge(directory, output)
+    assert open(output, "rb").read() == expected
+
+def test_release_keeps_lock_of_new_holder(tmpdir):
+    directory, expected = set_up(tmpdir)
+    first = shard.ShardWorker(directory, mapper, lock_timeout=60)
+    assert first.claim(0)
+    # The first worker stalls long enough for its lock to go stale, and a second worker takes over the unit
+    lock_filename = shard.unit_filename(directory, "locks", 0)
+    old = time.time() - 120
+    os.utime(lock_filename, (old, old))
+    second = shard.ShardWorker(directory, mapper, lock_timeout=60)
+    assert second.claim(0)
+    assert (second.broken, first.holds(0), second.holds(0)) == (1, False, True)
+
+    first.release(0)
+    assert os.path.exists(lock_filename)
+    assert not shard.ShardWorker(directory, mapper, lock_timeout=60).claim(0)
+    second.release(0)
+    assert not os.path.exists(lock_filename)
+
+def test_create_keeps_existing_run(tmpdir):
+    directory, expected = set_up(tmpdir)
+    manifest = shard.create(directory, "missing.txt", "missing.txt", "missing.csv", unit_size=100)
+    assert (manifest["units"], manifest["unit_size"], manifest["words"]) == (5, 3, 13)
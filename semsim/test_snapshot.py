@@ -0,0 +1,111 @@
+import os
+import subprocess
+import sys
+import semsim.snapshot as snapshot
+from semsim.test_wntest import requires_wordnet, root
+
+class FakeSynset:
+    # Stands in for a synset of a hierarchy small enough to score by hand
+    def __init__(self, name, hypernyms=(), lemma_names=()):
+        self._name = name
+        self._hypernyms = list(hypernyms)
+        self._lemma_names = list(lemma_names) or [name.split(".")[0]]
+
+    def name(self):
+        return self._name
+
+    def pos(self):
+        return self._name.split(".")[1]
+
+    def definition(self):
+        return "the meaning of " + self._name
+
+    def lemma_names(self):
+        return self._lemma_names
+
+    def hypernyms(self):
+        return self._hypernyms
+
+    def instance_hypernyms(self):
+        return []
+
+    def min_depth(self):
+        return 1 + min(hypernym.min_depth() for hypernym in self._hypernyms) if self._hypernyms else 0
+
+    def max_depth(self):
+        return 1 + max(hypernym.max_depth() for hypernym in self._hypernyms) if self._hypernyms else 0
+
+class FakeWordNet:
+    def __init__(self):
+        move = FakeSynset("move.v.01")
+        walk = FakeSynset("walk.v.01", [move])
+        talk = FakeSynset("talk.v.01", [], ["talk", "speak"])
+        self.all = [
+            move, walk, talk,
+            FakeSynset("turn.v.01", [move], ["turn", "rotate"]),
+            FakeSynset("stroll.v.01", [walk], ["stroll", "saunter"]),
+            FakeSynset("walk.n.01"),
+        ]
+
+    def synsets(self, word, pos):
+        return [synset for synset in self.all if word in synset.lemma_names() and synset.pos() == pos]
+
+    def synset(self, name):
+        return [synset for synset in self.all if synset.name() == name][0]
+
+    def get_version(self):
+        return "fake"
+
+def build_fake(tmpdir):
+    wordlist = tmpdir.join("verbs.txt")
+    wordlist.write("Stroll\nwalk\n\nrotate\n")
+    synset_csv = tmpdir.join("known.csv")
+    synset_csv.write("verb,synset\ntalk,talk.v.01\n")
+    filename = str(tmpdir.join("wordnet.snapshot"))
+    res = snapshot.build(filename, [str(wordlist)], [str(synset_csv)], FakeWordNet())
+    return filename, res
+
+def test_lookups(tmpdir):
+    filename, res = build_fake(tmpdir)
+    # move.v.01 is only there as a hypernym, and saunter was not in the word list
+    assert (res["synsets"], res["words"]) == (6, 3)
+    snap = snapshot.Snapshot(filename)
+    assert snap.get_version() == "fake"
+    assert [synset.name() for synset in snap.synsets("walk")] == ["walk.n.01", "walk.v.01"]
+    assert snap.synsets("walk", snap.VERB) == [snap.synset("walk.v.01")]
+    assert snap.synsets("saunter") == []
+    stroll = snap.synsets("stroll", snap.VERB)[0]
+    assert stroll.lemma_names() == ["stroll", "saunter"]
+    assert stroll.definition() == "the meaning of stroll.v.01"
+    assert (stroll.min_depth(), stroll.max_depth()) == (2, 2)
+    assert stroll.hypernyms() == [snap.synset("walk.v.01")]
+    snap.close()
+
+def test_path_similarity(tmpdir):
+    snap = snapshot.Snapshot(build_fake(tmpdir)[0])
+    stroll = snap.synset("stroll.v.01")
+    assert stroll.path_similarity(stroll) == 1.0
+    assert stroll.path_similarity(snap.synset("turn.v.01")) == 1.0 / 4
+    # The verb hierarchies meet at a root simulated above both, as they do in NLTK
+    assert stroll.path_similarity(snap.synset("talk.v.01")) == 1.0 / 5
+    # No root is simulated for nouns
+    assert snap.synset("walk.n.01").path_similarity(stroll) is None
+
+def test_wntest_uses_snapshot_without_nltk(tmpdir):
+    env = dict(os.environ, LILI_WORDNET_SNAPSHOT=build_fake(tmpdir)[0])
+    script = "import sys, semsim.wntest as wntest; assert wntest.wn.synsets('walk'); assert 'nltk' not in sys.modules"
+    assert subprocess.call([sys.executable, "-c", script], cwd=root, env=env) == 0
+
+@requires_wordnet
+def test_matches_wordnet(tmpdir):
+    from nltk.corpus import wordnet as wn
+    wordlist = tmpdir.join("words.txt")
+    wordlist.write("dog\nrun\nturn\ncar\nquickly\ngreen\n")
+    filename = str(tmpdir.join("wordnet.snapshot"))
+    snapshot.build(filename, [str(wordlist)], [os.path.join(root, "input_files", "synsets", "known-verbs.csv")])
+    snap = snapshot.Snapshot(filename)
+    for word in ["dog", "run", "turn", "car", "quickly", "green"]:
+        assert [synset.name() for synset in snap.synsets(word)] == [synset.name() for synset in wn.synsets(word)]
+    pairs = [(a, b) for a in snap.synsets("run") + snap.synsets("dog") for b in snap.synsets("turn") + snap.synsets("car")]
+    for a, b in pairs:
+        assert a.path_similarity(b) == wn.synset(a.name()).path_similarity(wn.synset(b.name()))
@@ -0,0 +1,97 @@
+import os
+import pytest
+import semsim.wntest as wntest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+known_verbs_csv = os.path.join(root, "input_files", "synsets", "known-verbs.csv")
+shown_objects_csv = os.path.join(root, "input_files", "synsets", "shown_objects.csv")
+
+def wordnet_available():
+    try:
+        wntest.wn.get_version()
+        return True
+    except LookupError:
+        return False
+
+requires_wordnet = pytest.mark.skipif(not wordnet_available(), reason="the WordNet corpus is not installed")
+
+def write_words(tmpdir, words):
+    filename = str(tmpdir.join("unknown.txt"))
+    with open(filename, "wb") as out_file:
+        out_file.write("\n".join(words) + "\n")
+    return filename
+
+class FakeSynset:
+    # Stands in for a synset in a hierarchy small enough to score by hand
+    def __init__(self, name, depth, scores):
+        self._name = name
+        self.depth = depth
+        self.scores = scores
+
+    def pos(self):
+        return "v"
+
+    def min_depth(self):
+        return self.depth
+
+    def max_depth(self):
+        return self.depth
+
+    def path_similarity(self, other):
+        return self.scores.get(other._name)
+
+def read_words(filename, count):
+    with open(filename, "rb") as inp_file:
+        return [line.strip() for line in inp_file if line.strip()][:count]
+
+def test_path_similarity_bound():
+    # Synsets four levels apart are at least four edges apart
+    assert wntest.path_similarity_bound((6, 6), (2, 2)) == 1.0 / 5
+    # A synset with a longer path to the root can meet the other synset higher up
+    assert wntest.path_similarity_bound((3, 6), (3, 3)) == 1.0 / 2
+    assert wntest.path_similarity_bound((0, 0), (0, 0)) == 1.0 / 2
+
+def test_best_match_breaks_ties_like_exhaustive_search():
+    walk = FakeSynset("walk", 2, {})
+    talk = FakeSynset("talk", 1, {})
+    stroll = FakeSynset("stroll", 3, {"walk": 0.5, "talk": 0.25})
+    mutter = FakeSynset("mutter", 2, {"walk": 0.25, "talk": 0.5})
+    known = wntest.KnownSynsets([walk, talk])
+    stats = wntest.MappingStats()
+    # Both unknown synsets score 0.5 against one known synset, and the pair with the first known synset wins
+    assert known.best_match([mutter, stroll], stats) == known.best_match([mutter, stroll], exhaustive=True) == (0.5, 0, stroll)
+    assert stats.pairs_pruned == 2
+    assert known.best_match([stroll, talk]) == (1.0, 1, talk)
+    assert known.best_match([]) == (-1, None, None)
+
+@requires_wordnet
+def test_lemma_index():
+    synsets = [wntest.wn.synset("turn.v.01"), wntest.wn.synset("talk.v.01")]
+    index = wntest.build_lemma_index(synsets)
+    assert index["speak"] == [1]
+    assert index["turn"] == [0]
+    assert "chat" not in index
+
+@requires_wordnet
+def test_synonyms_skip_path_similarity(tmpdir):
+    stats = wntest.MappingStats()
+    results = wntest.sem_sim_test2(known_verbs_csv, write_words(tmpdir, ["speak", "chat"]), pos="verb", stats=stats, exhaustive=True)
+    assert (results[0].known, results[0].known_synset, results[0].sem_sim_score) == ("talk", "talk.v.01", 1)
+    assert results[1].known != "No match found"
+    assert (stats.words, stats.lemma_hits) == (2, 1)
+    # Only the word that is not a synonym was compared with the known synsets
+    assert stats.path_similarity_calls == len(wntest.wn.synsets("chat", wntest.wn.VERB)) * 6
+
+@requires_wordnet
+@pytest.mark.parametrize("synset_csv, wordlist, pos", [
+    (known_verbs_csv, "verbs.txt", "verb"),
+    (shown_objects_csv, "nouns.txt", "noun"),
+])
+def test_pruned_search_matches_exhaustive_search(tmpdir, synset_csv, wordlist, pos):
+    unknown_filename = write_words(tmpdir, read_words(os.path.join(root, "input_files", "wordlists", wordlist), 300))
+    pruned_stats = wntest.MappingStats()
+    pruned = wntest.sem_sim_test2(synset_csv, unknown_filename, pos=pos, stats=pruned_stats)
+    exhaustive_stats = wntest.MappingStats()
+    exhaustive = wntest.sem_sim_test2(synset_csv, unknown_filename, pos=pos, stats=exhaustive_stats, exhaustive=True)
+    assert [vars(res) for res in pruned] == [vars(res) for res in exhaustive]
+    assert pruned_stats.path_similarity_calls < exhaustive_stats.path_similarity_calls
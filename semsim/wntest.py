@@ -1,8 +1,38 @@
 # This code will be used to test WordNet's ability to match words based on semantic similarity
-from nltk.corpus import wordnet as wn
 import csv
+import os
+
+import cache
+
+# A snapshot of the part of WordNet that semsim uses loads much faster than the WordNet corpus, see semsim.snapshot
+if os.environ.get("LILI_WORDNET_SNAPSHOT"):
+    import snapshot
+    wn = snapshot.Snapshot(os.environ["LILI_WORDNET_SNAPSHOT"])
+else:
+    from nltk.corpus import wordnet as wn
+
+# Answers to WordNet queries can be kept in a database between runs, see semsim.cache
+if os.environ.get("LILI_WORDNET_CACHE"):
+    import atexit
+    wn = cache.CachedWordNet(os.environ["LILI_WORDNET_CACHE"], wn)
+    atexit.register(wn.close)
 
 def build_known_file(known_words_filename, unknown_words_filename, synset_csv_filename, output_filename, **kwargs):
+    known_words_dict, final_word_list = read_known_words(known_words_filename, synset_csv_filename)
+    final_word_list.extend(map_unknown_words(known_words_dict, unknown_words_filename, **kwargs))
+    write_known_file(known_words_dict, final_word_list, output_filename)
+
+def read_known_words(known_words_filename, synset_csv_filename):
+    """
+    Reads the known words file and the synsets of its known words, the first two steps of :meth:`build_known_file`.
+
+    Args:
+        known_words_filename (str): The file of known words, one line of comma separated words for each action set, e.g. ``input_files/known_words/known_actions_small.txt``
+        synset_csv_filename (str): The CSV file pairing the first known word of each line with its synset
+
+    Returns:
+        tuple: The dictionary from the first known word of each line to its line number and synset name, and the list of the other known words paired with their line numbers
+    """
     # Build needed data structures
     known_words_file = open(known_words_filename, "rb")
 
@@ -36,6 +66,30 @@ def build_known_file(known_words_filename, unknown_words_filename, synset_csv_fi
             # Change the known word tuple's synset value
             known_words_dict[row[0].lower()] = (known_words_dict[row[0].lower()][0], row[1])
 
+    return known_words_dict, final_word_list
+
+def map_unknown_words(known_words_dict, unknown_words_filename, **kwargs):
+    """
+    Maps each unknown word to the line of the known word it is most semantically similar to, the middle step of :meth:`build_known_file`.
+
+    Args:
+        known_words_dict (dict): The known words, as returned by :meth:`read_known_words`
+        unknown_words_filename (str): The filename of the text file containing unknown words
+
+    Kwargs:
+        The keyword arguments of :meth:`build_known_file`, ``pos``, ``stats`` and ``exhaustive``
+
+    Returns:
+        list: The unknown words that were matched, paired with the line numbers of their known words, in the order of the unknown words file
+    """
+    # Look up each known word's synset once, in the order the known words are compared in
+    known_synsets = [(known_tuple[0], wn.synset(known_tuple[1])) for known, known_tuple in known_words_dict.iteritems()]
+    known = KnownSynsets([known_synset for known_line_num, known_synset in known_synsets])
+    lemma_index = build_lemma_index(known.synsets)
+    stats = kwargs.get("stats") or MappingStats()
+    prefetch_queries(unknown_words_filename, known.synsets)
+
+    mapped_word_list = []
     unknown_words_file = open(unknown_words_filename, "rb")
 
     # Process unknown words and map them to known ones
@@ -44,60 +98,61 @@ def build_known_file(known_words_filename, unknown_words_filename, synset_csv_fi
 
         if unknown_word:
 
+            stats.words += 1
             max_sem_sim_score = -1 # If words are not semantically similar, this value will not be changed
             max_unknown_synset = None
             max_known_synset = None
             known_choice = "No match found"
             match_found = False
 
-            for known, known_tuple in known_words_dict.iteritems():
-
-                known_line_num = known_tuple[0]
-                known_synset = wn.synset(known_tuple[1])
-
-                # If the unknown word is a lemma of the known sysnset, then the unknown word is a synonym
-                if unknown_word in known_synset.lemma_names():
-                    sem_sim_score = 1
-
-                    if sem_sim_score > max_sem_sim_score:
-
-                        max_sem_sim_score = sem_sim_score
-                        match_line_num = known_line_num
-                        match_found = True
-
-                else:
-                    # Check if the pos argument has been provided
-                    if 'pos' in kwargs:
-                        pos = kwargs['pos']
-                    else:
-                        pos = "none"
-
-                    if pos.lower() == "verb":
-                        unknown_synsets = wn.synsets(unknown_word, wn.VERB)
-                    elif pos.lower() == "noun":
-                        unknown_synsets = wn.synsets(unknown_word, wn.NOUN)
-                    elif pos.lower() == "adj":
-                        unknown_synsets = wn.synsets(unknown_word, wn.ADJ)
-                    elif pos.lower() == "adv":
-                        unknown_synsets = wn.synsets(unknown_word, wn.ADV)
-                    else:
-                        unknown_synsets = wn.synsets(unknown_word)
+            # If the unknown word is a lemma of a known sysnset, then the unknown word is a synonym, and no other known word can score higher
+            synonym_of = lemma_index.get(unknown_word)
+            if synonym_of:
+                stats.lemma_hits += 1
+                mapped_word_list.append((unknown_word, known_synsets[synonym_of[0]][0]))
+                continue
 
-                    for unknown_synset in unknown_synsets:
-
-                        sem_sim_score = unknown_synset.path_similarity(known_synset)
-
-                        if sem_sim_score > max_sem_sim_score:
+            # Check if the pos argument has been provided
+            if 'pos' in kwargs:
+                pos = kwargs['pos']
+            else:
+                pos = "none"
+
+            if pos.lower() == "verb":
+                unknown_synsets = wn.synsets(unknown_word, wn.VERB)
+            elif pos.lower() == "noun":
+                unknown_synsets = wn.synsets(unknown_word, wn.NOUN)
+            elif pos.lower() == "adj":
+                unknown_synsets = wn.synsets(unknown_word, wn.ADJ)
+            elif pos.lower() == "adv":
+                unknown_synsets = wn.synsets(unknown_word, wn.ADV)
+            else:
+                unknown_synsets = wn.synsets(unknown_word)
 
-                            max_sem_sim_score = sem_sim_score
-                            match_line_num = known_line_num
-                            match_found = True
+            # Find the known synset most similar to any of the unknown word's synsets
+            max_sem_sim_score, match_position, max_unknown_synset = known.best_match(unknown_synsets, stats, kwargs.get("exhaustive", False))
+            if match_position is not None:
+                match_line_num = known_synsets[match_position][0]
+                match_found = True
 
             # If a match was found, then add the unknown word to the final word list
             if match_found:
-                final_word_list.append((unknown_word, match_line_num))
+                mapped_word_list.append((unknown_word, match_line_num))
 
+    print ("Synonyms found in the lemma index: %d of %d words (%.1f%%)" % (stats.lemma_hits, stats.words, 100 * stats.hit_rate()))
+    if isinstance(wn, cache.CachedWordNet):
+        wn.flush()
+    return mapped_word_list
 
+def write_known_file(known_words_dict, final_word_list, output_filename):
+    """
+    Writes a known words file with the mapped words added to the lines of their known words, the last step of :meth:`build_known_file`.
+
+    Args:
+        known_words_dict (dict): The known words, as returned by :meth:`read_known_words`
+        final_word_list (list): The words paired with the line numbers they go on, in the order they are written within a line
+        output_filename (str): The file to write
+    """
     # The final word list has been built, so put all matching words into the input file at specified lines
 
     # Sort the final word list by line number, so each word can be written in sequence
@@ -129,6 +184,7 @@ def build_known_file(known_words_filename, unknown_words_filename, synset_csv_fi
         out_file.write("," + word_tuple[0])
 
 
+
 def sem_sim_test2(known_words_filename, unknown_words_filename, **kwargs):
     """
     Tests semantic similarity mapping from unknown words to known words. Synsets of the unknown words are not known in advance and those of the known words are determined in advance.
@@ -141,6 +197,8 @@ def sem_sim_test2(known_words_filename, unknown_words_filename, **kwargs):
 
     Kwargs:
         pos (str): The part of speech of the words to be evaluated. Can have the values "verb", "noun", "adj", or "adv". If neither of these values are used or no value is provided, searching the synsets of the unknown word will not be filtered by part of speech, resulting in more processing time and potentially less accurate results
+        stats (MappingStats): Filled in with the counts of the run, see :class:`~semsim.wntest.MappingStats`
+        exhaustive (bool): If ``True``, every pair of synsets is scored instead of pruning the search, see :meth:`~semsim.wntest.KnownSynsets.best_match`. Used to check the pruned search
 
     Returns:
         list: The sorted list of :class:`~wntest.SemanticSimilarityResult` objects
@@ -161,6 +219,13 @@ def sem_sim_test2(known_words_filename, unknown_words_filename, **kwargs):
             # Add to the list of known verbs
             known_words.append((row[0].lower(), row[1]))
 
+    # Look up each known word's synset once, instead of once for every unknown word
+    known_synsets = [(known, wn.synset(synset_name)) for known, synset_name in known_words]
+    known_index = KnownSynsets([known_synset for known, known_synset in known_synsets])
+    lemma_index = build_lemma_index(known_index.synsets)
+    stats = kwargs.get("stats") or MappingStats()
+    prefetch_queries(unknown_words_filename, known_index.synsets)
+
     # Open the file of unknown words and begin processing
     unknown_words_file = open(unknown_words_filename, "rb")
     for line in unknown_words_file:
@@ -171,52 +236,40 @@ def sem_sim_test2(known_words_filename, unknown_words_filename, **kwargs):
         known_choice = "No match found"
         match_found = False
         unknown = line.lower().strip()
+        stats.words += 1
 
-        for known_tuple in known_words:
-
-            known = known_tuple[0]
-            known_synset = wn.synset(known_tuple[1])
-
-            if unknown in known_synset.lemma_names():
-                sem_sim_score = 1
-
-                if sem_sim_score > max_sem_sim_score:
-
-                    max_sem_sim_score = sem_sim_score
-                    max_unknown_synset = unknown_synset
-                    max_known_synset = known_synset
-                    known_choice = known
-                    match_found = True
+        # If the unknown word is a lemma of a known synset, it is a synonym of that known word and shares its synset, and no other known word can score higher
+        synonym_of = lemma_index.get(unknown)
+        if synonym_of:
+            stats.lemma_hits += 1
+            known_choice, max_known_synset = known_synsets[synonym_of[0]]
+            max_unknown_synset = max_known_synset
+            max_sem_sim_score = 1
+            match_found = True
 
+        else:
+            # Check if the pos argument has been provided
+            if 'pos' in kwargs:
+                pos = kwargs['pos']
+            else:
+                pos = "none"
+
+            if pos.lower() == "verb":
+                unknown_synsets = wn.synsets(unknown, wn.VERB)
+            elif pos.lower() == "noun":
+                unknown_synsets = wn.synsets(unknown, wn.NOUN)
+            elif pos.lower() == "adj":
+                unknown_synsets = wn.synsets(unknown, wn.ADJ)
+            elif pos.lower() == "adv":
+                unknown_synsets = wn.synsets(unknown, wn.ADV)
             else:
-                # Check if the pos argument has been provided
-                if 'pos' in kwargs:
-                    pos = kwargs['pos']
-                else:
-                    pos = "none"
-
-                if pos.lower() == "verb":
-                    unknown_synsets = wn.synsets(unknown, wn.VERB)
-                elif pos.lower() == "noun":
-                    unknown_synsets = wn.synsets(unknown, wn.NOUN)
-                elif pos.lower() == "adj":
-                    unknown_synsets = wn.synsets(unknown, wn.ADJ)
-                elif pos.lower() == "adv":
-                    unknown_synsets = wn.synsets(unknown, wn.ADV)
-                else:
-                    unknown_synsets = wn.synsets(unknown)
-
-                for unknown_synset in unknown_synsets:
-
-                    sem_sim_score = unknown_synset.path_similarity(known_synset)
-
-                    if sem_sim_score > max_sem_sim_score:
-
-                        max_sem_sim_score = sem_sim_score
-                        max_unknown_synset = unknown_synset
-                        max_known_synset = known_synset
-                        known_choice = known
-                        match_found = True
+                unknown_synsets = wn.synsets(unknown)
+
+            # Find the known synset most similar to any of the unknown word's synsets
+            max_sem_sim_score, match_position, max_unknown_synset = known_index.best_match(unknown_synsets, stats, kwargs.get("exhaustive", False))
+            if match_position is not None:
+                known_choice, max_known_synset = known_synsets[match_position]
+                match_found = True
 
         if match_found:
             results.append(SemanticSimilarityResult(unknown, known_choice, max_unknown_synset.name(), max_known_synset.name(), max_unknown_synset.definition(), max_known_synset.definition(), max_sem_sim_score))
@@ -225,8 +278,233 @@ def sem_sim_test2(known_words_filename, unknown_words_filename, **kwargs):
 
         print ("Finished processing " + unknown)
 
+    print ("Synonyms found in the lemma index: %d of %d words (%.1f%%)" % (stats.lemma_hits, stats.words, 100 * stats.hit_rate()))
+    if isinstance(wn, cache.CachedWordNet):
+        wn.flush()
     return results
 
+def build_lemma_index(known_synsets):
+    """
+    Builds an index from each lemma name of the known synsets to the positions of the synsets it belongs to.
+
+    An unknown word that is a lemma of a known synset is a synonym of that known word. With the index, this is found with one dictionary lookup per unknown word, instead of building and scanning the list of lemma names of every known synset for every unknown word.
+
+    Args:
+        known_synsets (list): The synsets of the known words, in the order they are compared in
+
+    Returns:
+        dict: The positions in ``known_synsets`` of the synsets that have each lemma name, in order, keyed by lemma name
+    """
+    lemma_index = {}
+    for i, known_synset in enumerate(known_synsets):
+        for lemma_name in known_synset.lemma_names():
+            positions = lemma_index.setdefault(lemma_name, [])
+            if i not in positions:
+                positions.append(i)
+    return lemma_index
+
+def prefetch_queries(unknown_words_filename, known_synsets):
+    """
+    Loads what the query cache has for the unknown words and the known synsets in a few queries, if WordNet queries are cached, see :class:`~semsim.cache.CachedWordNet`.
+
+    Args:
+        unknown_words_filename (str): The filename of the text file containing unknown words
+        known_synsets (list): The synsets of the known words
+    """
+    if isinstance(wn, cache.CachedWordNet):
+        with open(unknown_words_filename, "rb") as unknown_words_file:
+            words = [line.strip().lower() for line in unknown_words_file if line.strip()]
+        wn.prefetch(words, [known_synset.name() for known_synset in known_synsets])
+
+# Parts of speech whose synsets are compared with each other, satellite adjectives are compared with adjectives
+pos_groups = {"s": "a"}
+
+def path_similarity_bound(depths, other_depths):
+    """
+    Finds the highest path similarity that two different synsets could have, from their depths alone.
+
+    The path between two synsets goes up from each of them to a hypernym they share. A path from a synset up to one of its hypernyms is at least as long as the difference of their shortest depths, and no hypernym of a synset is deeper than the synset's longest depth, so the path between the synsets is at least ``min_depth + other_min_depth - 2 * min(max_depth, other_max_depth)`` edges long. This also holds for the root that ``path_similarity`` adds above the verb hierarchies. The path between different synsets is at least one edge long.
+
+    Args:
+        depths (tuple): The ``min_depth()`` and ``max_depth()`` of one synset
+        other_depths (tuple): The ``min_depth()`` and ``max_depth()`` of the other synset
+
+    Returns:
+        float: The highest score ``path_similarity`` can give the pair, computed the same way ``path_similarity`` computes its scores
+    """
+    distance = max(1, depths[0] + other_depths[0] - 2 * min(depths[1], other_depths[1]))
+    return 1.0 / (distance + 1)
+
+class KnownSynsets:
+    """ The synsets of the known words, arranged so that the known synset most similar to an unknown word can be found without scoring every pair of synsets.
+
+    The known synsets are grouped by part of speech once, and the depths of every synset are looked up once and kept. See :meth:`best_match` for how the search is pruned.
+
+    Attributes:
+        synsets (list): The known synsets, in the order they are compared in
+        by_pos (dict): The positions and synsets of the known synsets of each part of speech, in order
+        first_position (dict): The position of the first occurrence of each known synset
+    """
+    def __init__(self, synsets):
+        """ Constructor for the :class:`~semsim.wntest.KnownSynsets` class
+
+        Args:
+            synsets (list): The known synsets, in the order they are compared in. Among pairs with the same score, the pair with the earlier known synset wins
+        """
+        self.synsets = list(synsets)
+        self.by_pos = {}
+        self.first_position = {}
+        self._depths = {}
+        for position, synset in enumerate(self.synsets):
+            self.by_pos.setdefault(self.pos_group(synset), []).append((position, synset, self.depths(synset)))
+            self.first_position.setdefault(synset, position)
+
+    def pos_group(self, synset):
+        """
+        Gets the part of speech that a synset is compared within.
+
+        Args:
+            synset (wn.Synset): The synset
+
+        Returns:
+            str: The synset's part of speech, with satellite adjectives counted as adjectives
+        """
+        pos = synset.pos()
+        return pos_groups.get(pos, pos)
+
+    def depths(self, synset):
+        """
+        Gets the shortest and longest depth of a synset, looking them up only the first time.
+
+        Args:
+            synset (wn.Synset): The synset
+
+        Returns:
+            tuple: The ``min_depth()`` and ``max_depth()`` of the synset
+        """
+        depths = self._depths.get(synset)
+        if depths is None:
+            depths = self._depths[synset] = (synset.min_depth(), synset.max_depth())
+        return depths
+
+    def best_match(self, unknown_synsets, stats=None, exhaustive=False):
+        """
+        Finds the pair of an unknown synset and a known synset with the highest path similarity.
+
+        The pairs are compared as if every known synset were scored against every unknown synset in order, keeping the first pair with the highest score, but most pairs are never scored:
+
+        * An unknown synset is only compared with the known synsets of its own part of speech. Between parts of speech, ``path_similarity`` gives ``None``, or for verbs a score through the root it adds above the verb hierarchies, which says nothing about the meaning of the words
+        * An unknown synset that is itself a known synset scores 1, the highest score there is, so the search stops without scoring anything
+        * The other pairs are scored from the highest :meth:`~semsim.wntest.path_similarity_bound` down, and the search stops once no remaining pair can beat the best score found
+
+        Args:
+            unknown_synsets (list): The synsets of the unknown word
+            stats (MappingStats): Counts the pairs scored and pruned, if given
+            exhaustive (bool): If ``True``, every pair of synsets is scored, regardless of part of speech. Used to check the pruned search
+
+        Returns:
+            tuple: The score, the position of the known synset in :attr:`synsets` and the unknown synset of the best pair, or ``(-1, None, None)`` if no pair could be scored
+        """
+        if exhaustive:
+            return self._exhaustive_match(unknown_synsets, stats)
+
+        count = len(unknown_synsets)
+        # Each pair is ordered by where the exhaustive search would reach it, to break ties the same way
+        same = [(self.first_position[unknown_synset] * count + u, unknown_synset) for u, unknown_synset in enumerate(unknown_synsets) if unknown_synset in self.first_position]
+        if same:
+            order, unknown_synset = min(same)
+            if stats is not None:
+                stats.early_exits += 1
+            return 1.0, order // count, unknown_synset
+
+        candidates = []
+        for u, unknown_synset in enumerate(unknown_synsets):
+            depths = self.depths(unknown_synset)
+            for position, known_synset, known_depths in self.by_pos.get(self.pos_group(unknown_synset), ()):
+                candidates.append((-path_similarity_bound(depths, known_depths), position * count + u, unknown_synset, known_synset))
+        candidates.sort(key=lambda candidate: candidate[:2])
+
+        max_score = -1
+        max_order = None
+        max_unknown_synset = None
+        scored = 0
+        for negative_bound, order, unknown_synset, known_synset in candidates:
+            # Candidates are sorted by bound and then by order, so none of the rest can beat the best pair
+            if -negative_bound < max_score or (-negative_bound == max_score and order > max_order):
+                break
+            scored += 1
+            score = unknown_synset.path_similarity(known_synset)
+            if score is None:
+                continue
+            if score > max_score or (score == max_score and order < max_order):
+                max_score = score
+                max_order = order
+                max_unknown_synset = unknown_synset
+
+        if stats is not None:
+            stats.path_similarity_calls += scored
+            stats.pairs_pruned += len(candidates) - scored
+        if max_order is None:
+            return -1, None, None
+        return max_score, max_order // count, max_unknown_synset
+
+    def _exhaustive_match(self, unknown_synsets, stats):
+        max_score = -1
+        max_position = None
+        max_unknown_synset = None
+        for position, known_synset in enumerate(self.synsets):
+            for unknown_synset in unknown_synsets:
+                if stats is not None:
+                    stats.path_similarity_calls += 1
+                score = unknown_synset.path_similarity(known_synset)
+                if score > max_score:
+                    max_score = score
+                    max_position = position
+                    max_unknown_synset = unknown_synset
+        return max_score, max_position, max_unknown_synset
+
+class MappingStats:
+    """ Counts how the unknown words of a run of :meth:`build_known_file` or :meth:`sem_sim_test2` were matched. Pass an object of this class as the ``stats`` keyword argument to get the counts of a run.
+
+    Attributes:
+        words (int): The number of unknown words processed
+        lemma_hits (int): The number of unknown words found in the lemma index, which were matched without calling ``path_similarity``
+        path_similarity_calls (int): The number of times ``path_similarity`` was called
+        pairs_pruned (int): The number of pairs of synsets that were not scored because they could not beat the best pair, see :meth:`~semsim.wntest.KnownSynsets.best_match`
+        early_exits (int): The number of unknown words with a synset that is one of the known synsets, which were matched without scoring any pair
+    """
+    def __init__(self):
+        self.words = 0
+        self.lemma_hits = 0
+        self.path_similarity_calls = 0
+        self.pairs_pruned = 0
+        self.early_exits = 0
+
+    def hit_rate(self):
+        """
+        Calculates the share of unknown words found in the lemma index.
+
+        Returns:
+            float: The hit rate, between 0 and 1
+        """
+        return float(self.lemma_hits) / self.words if self.words else 0.0
+
+    def as_dict(self):
+        """
+        Gets the counts for reporting, e.g. as JSON.
+
+        Returns:
+            dict: The counts and the ``lemma_hit_rate``
+        """
+        return {
+            "words": self.words,
+            "lemma_hits": self.lemma_hits,
+            "lemma_hit_rate": self.hit_rate(),
+            "path_similarity_calls": self.path_similarity_calls,
+            "pairs_pruned": self.pairs_pruned,
+            "early_exits": self.early_exits,
+        }
+
 def process_results(results_list):
     """
     Sorts a list of :class:`~wntest.SemanticSimilarityResult` objects in descsending order by semantic similarity score